@@ -1,3 +1,4 @@
+import json
 import streamlit as st
 import requests
 
@@ -16,11 +17,32 @@ if "conversation_started" not in st.session_state:
     st.session_state.conversation_started = False
 
 # API Functions
+def stream_chat(path, payload, result):
+    """Yield response text from a streaming endpoint as it arrives; the final payload is stored in ``result``."""
+    streamed = ""
+    with requests.post(f"{API_URL}{path}", json=payload, stream=True, timeout=60) as resp:
+        resp.raise_for_status()
+        event = None
+        for line in resp.iter_lines(chunk_size=None, decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+                if event == "token":
+                    streamed += data["text"]
+                    yield data["text"]
+                elif event == "done":
+                    result.update(data)
+                    # Show whatever was not streamed token by token (sources, or a templated reply)
+                    if data["response"].startswith(streamed.strip()):
+                        yield data["response"][len(streamed.strip()):]
+                elif event == "error":
+                    raise RuntimeError(data["detail"])
+
 def receptionist_chat(user_input):
     try:
-        resp = requests.post(f"{API_URL}/chat/receptionist", json={"user_input": user_input, "session_id": "web-session"}, timeout=30)
-        resp.raise_for_status()
-        data = resp.json()
+        data = {}
+        st.write_stream(stream_chat("/chat/receptionist/stream", {"user_input": user_input, "session_id": "web-session"}, data))
         if data.get("patient_report"):
             st.session_state.patient_report = data["patient_report"]
             st.session_state.patient_name = st.session_state.patient_report.get("patient_name", "")
@@ -30,9 +52,9 @@ def receptionist_chat(user_input):
 
 def clinical_chat(user_input):
     try:
-        resp = requests.post(f"{API_URL}/chat/clinical", json={"user_input": user_input, "patient_report": st.session_state.patient_report}, timeout=30)
-        resp.raise_for_status()
-        return resp.json()["response"]
+        data = {}
+        st.write_stream(stream_chat("/chat/clinical/stream", {"user_input": user_input, "patient_report": st.session_state.patient_report}, data))
+        return data["response"]
     except Exception:
         return "Clinical system error. Please try again."
 
@@ -101,9 +123,13 @@ for message in st.session_state.chat_history:
 prompt = st.chat_input("Type your message here...")
 if prompt:
     st.session_state.chat_history.append({"role": "user", "message": prompt})
+    with st.chat_message("user", avatar="🧑‍💼"):
+        st.markdown(prompt)
+    # Replies render token by token as they stream in; the full history is redrawn on rerun
     with st.spinner("Assistant is typing..."):
         if st.session_state.agent == "receptionist":
-            response, status = receptionist_chat(prompt)
+            with st.chat_message("assistant", avatar="👩‍💼"):
+                response, status = receptionist_chat(prompt)
             st.session_state.chat_history.append({"role": "assistant", "agent": "maria", "message": response})
             if status == "route_clinical":
                 st.session_state.agent = "clinical"
@@ -111,7 +137,8 @@ if prompt:
                 greeting = f"Hi {st.session_state.patient_name or 'there'}, I'm Dr. Sarah. What can I help you with today?"
                 st.session_state.chat_history.append({"role": "assistant", "agent": "sarah", "message": greeting})
         else:
-            response = clinical_chat(prompt)
+            with st.chat_message("assistant", avatar="👩‍⚕️"):
+                response = clinical_chat(prompt)
             st.session_state.chat_history.append({"role": "assistant", "agent": "sarah", "message": response})
             if any(keyword in prompt.lower() for keyword in ["receptionist", "maria", "admin", "appointment", "schedule"]):
                 st.session_state.agent = "receptionist"
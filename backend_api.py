@@ -1,15 +1,23 @@
 from fastapi import FastAPI, HTTPException
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, validator
-import json
+import asyncio
 import os
+import json
 import logging
 from typing import Optional, Dict, Any
 from datetime import datetime
 
 # Import your improved agents
 from receptionist_agent import ReceptionistAgent
-from clinical_agent import ClinicalAgent
+from clinical_agent import ClinicalAgent, WARMUP_RESOURCES, embed_batcher, rerank_batcher, response_cache, retrieval_timings, fusion_stats
+from patient_store import get_patient_store
+from resources import registry
+from embedding_cache import get_embedding_cache
+from session_manager import SessionManager
+from session_backend import SessionConflictError, get_session_backend
 
 # --- Logging Setup ---
 def setup_logging():
@@ -51,17 +59,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load patient data
-try:
-    with open(os.path.join("data", "patients.json"), encoding="utf-8") as f:
-        PATIENTS = json.load(f)
-    logging.info(f"Loaded {len(PATIENTS)} patient records")
-except Exception as e:
-    logging.error(f"Failed to load patient data: {e}")
-    PATIENTS = []
+# Shared patient repository (same instance the receptionist uses via db.get_patient_report)
+patient_store = get_patient_store()
+logging.info(f"Loaded {len(patient_store)} patient records")
+
+# Models and indexes load lazily on first use; by default start loading them in the
+# background so the first clinical request does not pay the full cold-start cost.
+WARM_RESOURCES_ON_STARTUP = os.getenv("WARM_RESOURCES_ON_STARTUP", "1") != "0"
+
+@app.on_event("startup")
+def warm_resources():
+    if WARM_RESOURCES_ON_STARTUP:
+        registry.warm_up(WARMUP_RESOURCES, background=True)
+
+@app.on_event("startup")
+def start_session_sweeper():
+    sessions.start_sweeper()
 
-# Initialize agents - using session-based storage for better conversation handling
-agents_storage = {}
+@app.on_event("shutdown")
+def stop_session_sweeper():
+    sessions.stop_sweeper()
 
 class ChatRequest(BaseModel):
     user_input: Any
@@ -80,33 +97,51 @@ class ChatResponse(BaseModel):
     patient_report: Optional[Dict[Any, Any]] = None
     agent_info: Optional[Dict[str, Any]] = None
 
+def new_session() -> Dict[str, Any]:
+    """Per-session agents; the clinical agent is created on the first /chat/clinical call."""
+    return {"receptionist": ReceptionistAgent(), "clinical": None}
+
+def serialize_session(session: Dict[str, Any]) -> Dict[str, Any]:
+    clinical = session["clinical"]
+    return {
+        "receptionist": session["receptionist"].to_state(),
+        "clinical": clinical.to_state() if clinical is not None else None,
+    }
+
+def restore_session(state: Dict[str, Any]) -> Dict[str, Any]:
+    clinical = state.get("clinical")
+    return {
+        "receptionist": ReceptionistAgent.from_state(state["receptionist"]),
+        "clinical": ClinicalAgent.from_state(clinical) if clinical is not None else None,
+    }
+
+# Session-based agent storage, bounded by count, estimated bytes and idle TTL. With
+# SESSION_BACKEND=sqlite the state is also written through to a store shared by all
+# workers, so any worker can continue a conversation started on another.
+sessions = SessionManager(
+    new_session,
+    backend=get_session_backend(),
+    serialize=serialize_session,
+    restore=restore_session,
+)
+
+# Session access may read and write the shared backend under the manager's lock, so the
+# async endpoints call these helpers (and sessions.touch) through asyncio.to_thread.
 def get_or_create_receptionist_agent(session_id: str) -> ReceptionistAgent:
-    if session_id not in agents_storage:
-        agents_storage[session_id] = {
-            "receptionist": ReceptionistAgent(),
-            "clinical": ClinicalAgent()
-        }
-    return agents_storage[session_id]["receptionist"]
+    return sessions.get_or_create(session_id)["receptionist"]
 
 def reset_receptionist_agent(session_id: str) -> ReceptionistAgent:
     """Reset the receptionist agent for a new conversation"""
-    if session_id not in agents_storage:
-        agents_storage[session_id] = {
-            "receptionist": ReceptionistAgent(),
-            "clinical": ClinicalAgent()
-        }
-    else:
-        agents_storage[session_id]["receptionist"] = ReceptionistAgent()
+    session = sessions.get_or_create(session_id)
+    session["receptionist"] = ReceptionistAgent()
     logging.info(f"Reset receptionist agent for session {session_id}")
-    return agents_storage[session_id]["receptionist"]
+    return session["receptionist"]
 
 def get_or_create_clinical_agent(session_id: str) -> ClinicalAgent:
-    if session_id not in agents_storage:
-        agents_storage[session_id] = {
-            "receptionist": ReceptionistAgent(),
-            "clinical": ClinicalAgent()
-        }
-    return agents_storage[session_id]["clinical"]
+    session = sessions.get_or_create(session_id)
+    if session["clinical"] is None:
+        session["clinical"] = ClinicalAgent()
+    return session["clinical"]
 
 @app.get("/")
 def root():
@@ -116,12 +151,16 @@ def root():
             "Context-aware conversations",
             "Session-based agent management",
             "Source referencing in clinical responses",
+            "Token streaming (server-sent events)",
             "Natural conversation flow"
         ],
         "endpoints": {
             "receptionist": "/chat/receptionist",
             "clinical": "/chat/clinical",
+            "receptionist_stream": "/chat/receptionist/stream",
+            "clinical_stream": "/chat/clinical/stream",
             "patient_lookup": "/patients/{name}",
+            "patient_lookup_by_id": "/patients/id/{patient_id}",
             "health_check": "/health",
             "clear_session": "/session/{session_id}",
             "reset_conversation": "/session/{session_id}/reset"
@@ -132,14 +171,22 @@ def root():
 def health_check():
     return {
         "status": "healthy",
-        "active_sessions": len(agents_storage),
-        "patients_loaded": len(PATIENTS)
+        "active_sessions": len(sessions),
+        "sessions": sessions.stats(),
+        "patients_loaded": len(patient_store),
+        "patient_store": patient_store.stats(),
+        "resources": registry.status(),
+        "batching": {"embed": embed_batcher.stats(), "rerank": rerank_batcher.stats()},
+        "retrieval": retrieval_timings.stats(),
+        "fusion": fusion_stats(),
+        "embedding_cache": cache.stats() if (cache := get_embedding_cache()) is not None else None,
+        "response_cache": response_cache.stats() if response_cache is not None else None
     }
 
 @app.get("/patients/{name}")
 def get_patient(name: str):
     try:
-        matches = [p for p in PATIENTS if p["patient_name"].lower() == name.lower()]
+        matches = patient_store.find_exact(name)
         if not matches:
             raise HTTPException(status_code=404, detail="Patient not found")
         if len(matches) > 1:
@@ -149,76 +196,150 @@ def get_patient(name: str):
                 "patients": [{"name": p["patient_name"], "id": p.get("patient_id")} for p in matches]
             }
         return {"status": "found", "patient": matches[0]}
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error retrieving patient {name}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/patients/id/{patient_id}")
+def get_patient_by_id(patient_id: str):
+    patient = patient_store.find_by_id(patient_id)
+    if patient is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return {"status": "found", "patient": patient}
+
+async def finish_receptionist_turn(req: ChatRequest, receptionist_agent: ReceptionistAgent, response: str, status) -> ChatResponse:
+    # If conversation ended, reset the agent for the next user
+    if status == 'conversation_ended':
+        # Reset the receptionist agent for new conversation
+        await asyncio.to_thread(reset_receptionist_agent, req.session_id)
+        logging.info(f"Reset receptionist agent for session {req.session_id} after conversation ended")
+    
+    # Also reset if a new conversation started mid-way (detected by the agent)
+    elif receptionist_agent.state == 'ask_name' and receptionist_agent.conversation_stage == 'initial':
+        logging.info(f"Detected agent was reset during interaction for session {req.session_id}")
+
+    await asyncio.to_thread(sessions.touch, req.session_id)
+
+    return ChatResponse(
+        response=response,
+        status=str(status),
+        patient_report=receptionist_agent.patient_report,
+        agent_info={
+            "agent_type": "receptionist",
+            "agent_name": "Maria",
+            "conversation_stage": getattr(receptionist_agent, 'conversation_stage', 'unknown'),
+            "patient_identified": bool(receptionist_agent.patient_report)
+        }
+    )
+
+async def finish_clinical_turn(req: ChatRequest, clinical_agent: ClinicalAgent, response: str) -> ChatResponse:
+    await asyncio.to_thread(sessions.touch, req.session_id)
+    return ChatResponse(
+        response=response,
+        status="success",
+        patient_report=req.patient_report,
+        agent_info={
+            "agent_type": "clinical",
+            "agent_name": "Dr. Sarah",
+            "conversation_history_length": len(getattr(clinical_agent, 'conversation_history', [])),
+            "patient_name": req.patient_report.get("patient_name", "Unknown")
+        }
+    )
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+SESSION_CONFLICT_DETAIL = "Session was updated by another request; please retry"
+
+def sse_response(events) -> StreamingResponse:
+    # Disable proxy buffering so tokens reach the client as they are produced
+    return StreamingResponse(events, media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.post("/chat/receptionist", response_model=ChatResponse)
-def chat_receptionist(req: ChatRequest):
+async def chat_receptionist(req: ChatRequest):
     try:
-        receptionist_agent = get_or_create_receptionist_agent(req.session_id)
-        response, status = receptionist_agent.interact(req.user_input, session_id=req.session_id)
-
-        # If conversation ended, reset the agent for the next user
-        if status == 'conversation_ended':
-            # Reset the receptionist agent for new conversation
-            agents_storage[req.session_id]["receptionist"] = ReceptionistAgent()
-            logging.info(f"Reset receptionist agent for session {req.session_id} after conversation ended")
-        
-        # Also reset if a new conversation started mid-way (detected by the agent)
-        elif receptionist_agent.state == 'ask_name' and receptionist_agent.conversation_stage == 'initial':
-            logging.info(f"Detected agent was reset during interaction for session {req.session_id}")
-
-        chat_response = ChatResponse(
-            response=response,
-            status=str(status),
-            patient_report=receptionist_agent.patient_report,
-            agent_info={
-                "agent_type": "receptionist",
-                "agent_name": "Maria",
-                "conversation_stage": getattr(receptionist_agent, 'conversation_stage', 'unknown'),
-                "patient_identified": bool(receptionist_agent.patient_report)
-            }
-        )
-
-        return chat_response
+        receptionist_agent = await asyncio.to_thread(get_or_create_receptionist_agent, req.session_id)
+        response, status = await receptionist_agent.ainteract(req.user_input, session_id=req.session_id)
+        return await finish_receptionist_turn(req, receptionist_agent, response, status)
 
+    except SessionConflictError:
+        raise HTTPException(status_code=409, detail=SESSION_CONFLICT_DETAIL)
     except Exception as e:
         logging.error(f"Error in receptionist chat: {e}")
         raise HTTPException(status_code=500, detail="Internal server error in receptionist chat")
 
+@app.post("/chat/receptionist/stream")
+async def chat_receptionist_stream(req: ChatRequest):
+    """
+    Server-sent events: ``token`` events carry answer text as it is generated and a
+    final ``done`` event carries the same payload as /chat/receptionist.
+    """
+    receptionist_agent = await asyncio.to_thread(get_or_create_receptionist_agent, req.session_id)
+
+    async def events():
+        try:
+            async for kind, value in receptionist_agent.astream(req.user_input, session_id=req.session_id):
+                if kind == "token":
+                    yield sse_event("token", {"text": value})
+                else:
+                    response, status = value
+                    yield sse_event("done", await finish_receptionist_turn(req, receptionist_agent, response, status))
+        except SessionConflictError:
+            yield sse_event("error", {"detail": SESSION_CONFLICT_DETAIL, "status_code": 409})
+        except Exception as e:
+            logging.error(f"Error in receptionist stream: {e}")
+            yield sse_event("error", {"detail": "Internal server error in receptionist chat"})
+
+    return sse_response(events())
+
 @app.post("/chat/clinical", response_model=ChatResponse)
-def chat_clinical(req: ChatRequest):
+async def chat_clinical(req: ChatRequest):
     try:
         if not req.patient_report:
             raise HTTPException(status_code=400, detail="Patient report is required for clinical consultation")
 
-        clinical_agent = get_or_create_clinical_agent(req.session_id)
+        clinical_agent = await asyncio.to_thread(get_or_create_clinical_agent, req.session_id)
         clinical_agent.set_patient_report(req.patient_report)
-        response = clinical_agent.interact(req.user_input)
-
-        chat_response = ChatResponse(
-            response=response,
-            status="success",
-            patient_report=req.patient_report,
-            agent_info={
-                "agent_type": "clinical",
-                "agent_name": "Dr. Sarah",
-                "conversation_history_length": len(getattr(clinical_agent, 'conversation_history', [])),
-                "patient_name": req.patient_report.get("patient_name", "Unknown")
-            }
-        )
-
-        return chat_response
+        response = await clinical_agent.ainteract(req.user_input)
+        return await finish_clinical_turn(req, clinical_agent, response)
 
+    except SessionConflictError:
+        raise HTTPException(status_code=409, detail=SESSION_CONFLICT_DETAIL)
     except Exception as e:
         logging.error(f"Error in clinical chat: {e}")
         raise HTTPException(status_code=500, detail="Internal server error in clinical chat")
 
+@app.post("/chat/clinical/stream")
+async def chat_clinical_stream(req: ChatRequest):
+    """
+    Server-sent events: retrieval runs first, then ``token`` events stream the answer
+    and a final ``done`` event carries the full response with sources appended.
+    """
+    if not req.patient_report:
+        raise HTTPException(status_code=400, detail="Patient report is required for clinical consultation")
+    clinical_agent = await asyncio.to_thread(get_or_create_clinical_agent, req.session_id)
+    clinical_agent.set_patient_report(req.patient_report)
+
+    async def events():
+        try:
+            async for kind, value in clinical_agent.astream(req.user_input):
+                if kind == "token":
+                    yield sse_event("token", {"text": value})
+                else:
+                    yield sse_event("done", await finish_clinical_turn(req, clinical_agent, value))
+        except SessionConflictError:
+            yield sse_event("error", {"detail": SESSION_CONFLICT_DETAIL, "status_code": 409})
+        except Exception as e:
+            logging.error(f"Error in clinical stream: {e}")
+            yield sse_event("error", {"detail": "Internal server error in clinical chat"})
+
+    return sse_response(events())
+
 @app.delete("/session/{session_id}")
 def clear_session(session_id: str):
-    if session_id in agents_storage:
-        del agents_storage[session_id]
+    if sessions.delete(session_id):
         return {"message": f"Session {session_id} cleared successfully"}
     else:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -228,17 +349,19 @@ def reset_session_conversation(session_id: str):
     """Reset the conversation for a new patient while keeping the session alive"""
     try:
         reset_receptionist_agent(session_id)
-        # Also reset clinical agent if needed
-        if session_id in agents_storage:
-            agents_storage[session_id]["clinical"] = ClinicalAgent()
+        # Drop the clinical agent; a fresh one is created on the next clinical message
+        sessions.get_or_create(session_id)["clinical"] = None
+        sessions.touch(session_id)
         return {"message": f"Conversation reset for session {session_id}. Ready for new patient."}
+    except SessionConflictError:
+        raise HTTPException(status_code=409, detail=SESSION_CONFLICT_DETAIL)
     except Exception as e:
         logging.error(f"Error resetting session {session_id}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error during reset")
 
 @app.get("/sessions")
 def list_sessions():
-    return {"active_sessions": list(agents_storage.keys()), "total_sessions": len(agents_storage)}
+    return {"active_sessions": sessions.keys(), "total_sessions": len(sessions), "stats": sessions.stats()}
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent calls to a batch-capable function (model encode or
+    predict) into one call.
+
+    Callers ``submit()`` a list of items and get a future for the matching slice
+    of results. A single worker thread takes every pending request, runs
+    ``batch_fn`` once on all of their items, and fans the results back out.
+    While requests are overlapping (the previous batch coalesced more than one),
+    it also holds the batch open for up to ``max_wait_ms`` or until
+    ``max_batch_size`` items are queued; a lone caller is never delayed. Besides
+    batching, this serializes access to the model, so concurrent requests no
+    longer contend for it.
+
+    With ``enabled=False`` every request runs ``batch_fn`` on its own on the
+    shared CPU executor instead: lower latency per request, less throughput
+    when many requests overlap (see benchmarks/query_batching.py).
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Sequence[Any]], max_batch_size: int = 32,
+                 max_wait_ms: float = 2.0, name: str = "batcher", enabled: bool = True):
+        self.batch_fn = batch_fn
+        self.enabled = enabled
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self._queue: "queue.Queue[Tuple[List[Any], Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._last_batch_requests = 0
+        self._counters = {"requests": 0, "items": 0, "batches": 0, "max_batch_items": 0}
+
+    def submit(self, items: List[Any]) -> Future:
+        future: Future = Future()
+        if not items:
+            future.set_result([])
+            return future
+        if not self.enabled:
+            from resources import get_cpu_executor
+            return get_cpu_executor().submit(self.batch_fn, list(items))
+        self._ensure_worker()
+        self._queue.put((list(items), future))
+        return future
+
+    def __call__(self, items: List[Any]) -> Sequence[Any]:
+        """Blocking submit; returns the results for ``items`` in order."""
+        return self.submit(items).result()
+
+    async def acall(self, items: List[Any]) -> Sequence[Any]:
+        """Awaitable submit; the event loop is free while the batch runs."""
+        return await asyncio.wrap_future(self.submit(items))
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name=f"{self.name}-batcher", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            # A caller that timed out may have cancelled its future while it was queued
+            if not request[1].set_running_or_notify_cancel():
+                continue
+            batch = [request]
+            size = len(request[0])
+            # Waiting only pays off when requests are actually overlapping
+            deadline = time.monotonic() + (self.max_wait if self._last_batch_requests > 1 else 0.0)
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if not request[1].set_running_or_notify_cancel():
+                    continue
+                batch.append(request)
+                size += len(request[0])
+            self._last_batch_requests = len(batch)
+            self._execute(batch)
+
+    def _execute(self, batch: List[Tuple[List[Any], Future]]):
+        items = [item for request_items, _ in batch for item in request_items]
+        try:
+            results = self.batch_fn(items)
+        except Exception as e:
+            logging.error(f"{self.name} batch of {len(items)} failed: {e}")
+            for _, future in batch:
+                self._deliver(future.set_exception, e)
+            return
+        offset = 0
+        for request_items, future in batch:
+            self._deliver(future.set_result, results[offset:offset + len(request_items)])
+            offset += len(request_items)
+        self._counters["requests"] += len(batch)
+        self._counters["items"] += len(items)
+        self._counters["batches"] += 1
+        self._counters["max_batch_items"] = max(self._counters["max_batch_items"], len(items))
+
+    def _deliver(self, setter: Callable[[Any], None], value: Any):
+        # The worker must survive a future that can no longer take a result
+        try:
+            setter(value)
+        except Exception as e:
+            logging.warning(f"{self.name} could not deliver a batch result: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self._counters["batches"]
+        return {
+            "enabled": self.enabled,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            **self._counters,
+            "mean_batch_items": round(self._counters["items"] / batches, 2) if batches else 0.0,
+        }
@@ -0,0 +1,109 @@
+"""
+Recall and latency of the FAISS index types ingestion.py can build, against
+the exact ``IndexFlatL2`` baseline: IVF-Flat and IVF-PQ over a range of
+``nprobe`` values and HNSW over a range of ``efSearch`` values.
+
+recall@5 is the overlap of each index's top 5 with the flat index's top 5.
+Latency is per single-query search, as ``hybrid_search`` issues them.
+
+Vectors are the real knowledge-base embeddings when sentence-transformers and
+data/nephro.txt are available (``--source real``); otherwise synthetic
+384-d unit vectors from a topic mixture in a 32-d latent space, which, like
+sentence embeddings, cluster without falling into cleanly separated cells.
+
+    python -m benchmarks.ann --vectors 50000
+"""
+import argparse
+import os
+import time
+
+import faiss
+import numpy as np
+
+from benchmarks.common import print_table, summarize, time_calls
+from vector_index import build_faiss_index, configure_search, factory_string
+
+DIM = 384
+
+
+def synthetic_vectors(n: int, n_queries: int, dim: int = DIM, latent: int = 32, topics: int = 200, noise: float = 0.1, seed: int = 0):
+    """Unit vectors from a Gaussian topic mixture in a low-dimensional space, projected up to ``dim``."""
+    rng = np.random.default_rng(seed)
+    centres = 2 * rng.standard_normal((topics, latent))
+    projection = rng.standard_normal((latent, dim)) / np.sqrt(latent)
+
+    def sample(count):
+        z = centres[rng.integers(0, topics, count)] + rng.standard_normal((count, latent))
+        points = (z @ projection + noise * rng.standard_normal((count, dim))).astype(np.float32)
+        return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+    return sample(n), sample(n_queries)
+
+
+def real_vectors(n_queries: int, seed: int = 0):
+    from sentence_transformers import SentenceTransformer
+    from clinical_agent import EMBEDDING_MODEL, NEPHRO_TXT_PATH
+    with open(NEPHRO_TXT_PATH, encoding="utf-8") as f:
+        chunks = [c.strip() for c in f.read().split("\n\n") if c.strip()]
+    vectors = np.asarray(SentenceTransformer(EMBEDDING_MODEL).encode(chunks), dtype=np.float32)
+    # Queries are held-out chunks: index the rest, search with these
+    order = np.random.default_rng(seed).permutation(len(vectors))
+    return vectors[order[n_queries:]], vectors[order[:n_queries]]
+
+
+def load_vectors(kind: str, n: int, n_queries: int):
+    if kind in ("auto", "real"):
+        try:
+            return (*real_vectors(n_queries), "real")
+        except (ImportError, FileNotFoundError):
+            if kind == "real":
+                raise
+    return (*synthetic_vectors(n, n_queries), "synthetic")
+
+
+def recall_at(index, queries: np.ndarray, truth: np.ndarray, k: int) -> float:
+    _, found = index.search(queries, k)
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found.tolist(), truth.tolist())]))
+
+
+def measure(name, index, setting, queries, truth, k, build_s):
+    latency = summarize(time_calls(lambda q: index.search(q, k), [queries[i:i + 1] for i in range(len(queries))]))
+    return {"index": name, "setting": setting, f"recall@{k}": recall_at(index, queries, truth, k),
+            "p50_ms": latency["p50_ms"], "p95_ms": latency["p95_ms"], "build_s": build_s,
+            "size_mb": faiss.serialize_index(index).nbytes / 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--source", choices=["auto", "real", "synthetic"], default="auto")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    vectors, queries, source = load_vectors(args.source, args.vectors, args.queries)
+    n, k = len(vectors), args.k
+    rows = []
+    for index_type in ("flat", "ivf_flat", "ivf_pq", "hnsw"):
+        start = time.perf_counter()
+        index = build_faiss_index(vectors, index_type)
+        build_s = time.perf_counter() - start
+        name = factory_string(index_type, n, vectors.shape[1])
+        if index_type == "flat":
+            _, truth = index.search(queries, k)
+            rows.append(measure(name, index, "exact", queries, truth, k, build_s))
+        elif index_type == "hnsw":
+            for ef in args.ef_search:
+                rows.append(measure(name, configure_search(index, ef_search=ef), f"efSearch={ef}", queries, truth, k, build_s))
+        else:
+            for nprobe in args.nprobe:
+                rows.append(measure(name, configure_search(index, nprobe=nprobe), f"nprobe={nprobe}", queries, truth, k, build_s))
+
+    print(f"vectors={n} ({source}, dim={vectors.shape[1]}) queries={len(queries)} threads={faiss.omp_get_max_threads()} cpus={os.cpu_count()}")
+    print_table(rows, ["index", "setting", f"recall@{k}", "p50_ms", "p95_ms", "build_s", "size_mb"])
+
+
+if __name__ == "__main__":
+    main()
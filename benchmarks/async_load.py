@@ -0,0 +1,134 @@
+"""
+Concurrent-session throughput of the chat request path: the sync agents run on
+a bounded threadpool (what FastAPI does for ``def`` endpoints) against the
+async agents awaited on the event loop (the current ``async def`` endpoints).
+
+Each simulated session sends a name to the receptionist, one follow-up, and
+one clinical question. The Groq model is replaced by ``llm_provider.FakeChatModel``
+answering after ``--llm-latency-ms`` (the network wait that dominates a real
+call), and the retrieval resources by small synthetic ones whose embedding and
+reranking do real numpy work, so FAISS, BM25 and the CPU executor are all
+exercised.
+
+    python -m benchmarks.async_load --sessions 400 --concurrency 200
+
+On a single core both modes end up CPU-bound; with spare cores the threadpool
+mode stays capped near ``threads / session latency`` while the async mode is not.
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from typing import List
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+
+import anyio  # noqa: E402
+import numpy as np  # noqa: E402
+
+import clinical_agent  # noqa: E402
+import receptionist_agent  # noqa: E402
+from benchmarks.common import SyntheticEncoder, SyntheticReranker, print_table, summarize  # noqa: E402
+from db import load_patient_data  # noqa: E402
+from llm_provider import FakeChatModel  # noqa: E402
+from resources import registry  # noqa: E402
+
+DIM = 384
+
+
+def install_stubs(llm_latency_s: float, cpu_work: int, n_chunks: int):
+    stub = FakeChatModel(latency_ms=llm_latency_s * 1000, tokens_per_s=0)
+    receptionist_agent.llm = stub
+    receptionist_agent.name_extraction_chain = (
+        receptionist_agent.name_extraction_prompt | stub | receptionist_agent.name_extraction_parser
+    )
+    clinical_agent.llm = stub
+    install_synthetic_resources(cpu_work, n_chunks)
+
+
+def install_synthetic_resources(cpu_work: int, n_chunks: int):
+    """Register a small synthetic knowledge base and models in place of the real ones, and load them."""
+    import faiss
+    from bm25_index import BM25Index
+    from tokenizer import config as tokenizer_config, tokenize
+
+    rng = random.Random(0)
+    vocab = ["kidney", "renal", "dialysis", "creatinine", "potassium", "fluid", "diet", "swelling", "pressure", "urine"]
+    chunks = [" ".join(rng.choice(vocab) for _ in range(40)) for _ in range(n_chunks)]
+    index = faiss.IndexFlatL2(DIM)
+    index.add(np.random.default_rng(1).standard_normal((n_chunks, DIM)).astype("float32"))
+    registry.register("chunks", lambda: chunks)
+    registry.register("faiss_index", lambda: index)
+    registry.register("bm25", lambda: BM25Index.build((tokenize(c) for c in chunks), tokenizer=tokenizer_config()))
+    registry.register("embedder", lambda: SyntheticEncoder(cpu_work, DIM))
+    registry.register("reranker", lambda: SyntheticReranker(cpu_work, DIM))
+    registry.warm_up(["chunks", "faiss_index", "bm25", "embedder", "reranker", "clinical_graph"], background=False)
+
+
+def unique_names() -> List[str]:
+    counts = {}
+    for record in load_patient_data():
+        counts[record["patient_name"]] = counts.get(record["patient_name"], 0) + 1
+    return [name for name, count in counts.items() if count == 1]
+
+
+def sync_session(name: str, session_id: str):
+    receptionist = receptionist_agent.ReceptionistAgent()
+    receptionist.interact(name, session_id=session_id)
+    receptionist.interact("okay", session_id=session_id)
+    clinical = clinical_agent.ClinicalAgent()
+    clinical.set_patient_report(receptionist.patient_report)
+    clinical.interact("Is some swelling in my legs normal for my kidney condition?")
+
+
+async def async_session(name: str, session_id: str):
+    receptionist = receptionist_agent.ReceptionistAgent()
+    await receptionist.ainteract(name, session_id=session_id)
+    await receptionist.ainteract("okay", session_id=session_id)
+    clinical = clinical_agent.ClinicalAgent()
+    clinical.set_patient_report(receptionist.patient_report)
+    await clinical.ainteract("Is some swelling in my legs normal for my kidney condition?")
+
+
+async def run(mode: str, names: List[str], sessions: int, concurrency: int, threads: int):
+    limiter = anyio.CapacityLimiter(threads)
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with gate:
+            # Latency includes any wait for a free threadpool slot, as a client would see it
+            name, session_id = names[i % len(names)], f"{mode}-{i}"
+            start = time.perf_counter()
+            if mode == "threadpool":
+                await anyio.to_thread.run_sync(sync_session, name, session_id, limiter=limiter)
+            else:
+                await async_session(name, session_id)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+    return {"mode": mode, "sessions_per_s": sessions / elapsed, **summarize(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=40, help="threadpool size for sync endpoints (Starlette default: 40)")
+    parser.add_argument("--llm-latency-ms", type=float, default=500)
+    parser.add_argument("--cpu-work", type=int, default=1024, help="synthetic model width; larger means more CPU per encode/rerank")
+    parser.add_argument("--chunks", type=int, default=500, help="synthetic knowledge-base size")
+    args = parser.parse_args()
+
+    install_stubs(args.llm_latency_ms / 1000, args.cpu_work, args.chunks)
+    names = unique_names()
+    rows = [asyncio.run(run(mode, names, args.sessions, args.concurrency, args.threads)) for mode in ("threadpool", "async")]
+    print(f"sessions={args.sessions} concurrency={args.concurrency} threads={args.threads} llm_latency_ms={args.llm_latency_ms}")
+    print_table(rows, ["mode", "sessions_per_s", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+
+
+if __name__ == "__main__":
+    main()
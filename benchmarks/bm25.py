@@ -0,0 +1,117 @@
+"""
+BM25 cold start and top-5 query latency at several corpus sizes:
+
+* ``BM25Okapi`` - rebuilt from the chunk texts on every process start (the old
+  ``_load_bm25``) and scoring the full corpus per query;
+* ``BM25Index dense`` - the persisted, memory-mapped index, still scoring every
+  document (``get_scores`` + sort);
+* ``BM25Index top_n`` - the same index, reading only query-term postings with
+  MaxScore pruning (what ``hybrid_search`` uses).
+
+Chunks are synthetic ~80-word passages over a Zipf-distributed vocabulary.
+Tokenization is ``str.split``; the old path also paid for NLTK
+``word_tokenize`` on top of the build time reported here. BM25Okapi is only
+run up to ``--okapi-max`` chunks (its build is pure Python and slow); above
+that, top_n is checked against the dense scores instead.
+
+    python -m benchmarks.bm25 --chunks 10000 100000 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from benchmarks.common import print_table, summarize, time_calls
+from bm25_index import BM25Index
+
+
+def synthetic_token_ids(n_chunks: int, vocab_size: int = 50000, words_per_chunk: int = 80, seed: int = 0):
+    """Per-chunk arrays of Zipf-distributed term ids, plus the sampling weights."""
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, vocab_size + 1)
+    weights /= weights.sum()
+    ids = rng.choice(vocab_size, size=(n_chunks, words_per_chunk), p=weights).astype(np.int32)
+    return ids, weights
+
+
+def make_queries(n: int, vocab_size: int, weights: np.ndarray):
+    rng = np.random.default_rng(1)
+    return [[f"term{t}" for t in rng.choice(vocab_size, size=rng.integers(2, 9), p=weights)] for _ in range(n)]
+
+
+def build_index(ids: np.ndarray, vocab_size: int) -> BM25Index:
+    # Renumber terms in first-seen order, as build() does, so the negative-IDF floor sums in the same order
+    seen, first = np.unique(ids, return_index=True)
+    seen = seen[np.argsort(first)]
+    remap = np.zeros(vocab_size, dtype=np.int32)
+    remap[seen] = np.arange(len(seen), dtype=np.int32)
+    vocabulary = {f"term{t}": i for i, t in enumerate(seen.tolist())}
+    return BM25Index.from_token_ids(iter(remap[ids]), vocabulary)
+
+
+def dense_top_n(index: BM25Index, query, n: int = 5):
+    scores = index.get_scores(query)
+    return np.argsort(-scores, kind="stable")[:n]
+
+
+def run(n_chunks: int, n_queries: int, okapi_max: int, vocab_size: int):
+    ids, weights = synthetic_token_ids(n_chunks, vocab_size)
+    queries = make_queries(n_queries, vocab_size, weights)
+    rows = []
+
+    okapi = None
+    if n_chunks <= okapi_max:
+        texts = [" ".join(f"term{t}" for t in row) for row in ids.tolist()]
+        start = time.perf_counter()
+        okapi = BM25Okapi([t.split() for t in texts])
+        rows.append({"impl": "BM25Okapi", "startup_ms": (time.perf_counter() - start) * 1000,
+                     **summarize(time_calls(lambda q: okapi.get_top_n(q, texts, n=5), queries))})
+        del texts
+
+    with tempfile.TemporaryDirectory() as path:
+        start = time.perf_counter()
+        build_index(ids, vocab_size).save(path)
+        build_s = time.perf_counter() - start
+        del ids
+        size_mb = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1e6
+        start = time.perf_counter()
+        index = BM25Index.load(path)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        if okapi is not None:
+            reference = [okapi.get_scores(q) for q in queries]
+        else:
+            reference = [index.get_scores(q) for q in queries]
+        mismatches = 0
+        for q, scores in zip(queries, reference):
+            expected = np.lexsort((np.arange(len(scores)), -scores))[:5]
+            got = index.top_n(q, 5)
+            mismatches += [d for d, _ in got] != expected.tolist() or any(s != scores[d] for d, s in got)
+
+        rows.append({"impl": "BM25Index dense", "startup_ms": load_ms,
+                     **summarize(time_calls(lambda q: dense_top_n(index, q), queries))})
+        rows.append({"impl": "BM25Index top_n", "startup_ms": load_ms,
+                     **summarize(time_calls(lambda q: index.top_n(q, 5), queries))})
+
+    reference_name = "BM25Okapi" if okapi is not None else "dense scores"
+    print(f"\nchunks={n_chunks} queries={n_queries} index_build_s={build_s:.1f} index_size_mb={size_mb:.1f} "
+          f"top5_mismatches_vs_{reference_name.replace(' ', '_')}={mismatches}")
+    print_table(rows, ["impl", "startup_ms", "p50_ms", "p95_ms", "p99_ms"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--okapi-max", type=int, default=100000)
+    parser.add_argument("--vocab-size", type=int, default=50000)
+    args = parser.parse_args()
+    for n_chunks in args.chunks:
+        run(n_chunks, args.queries, args.okapi_max, args.vocab_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import os
+import statistics
+import time
+import zlib
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``values`` (``pct`` in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def private_mb() -> float:
+    """Resident memory this process does not share (resident minus file-backed shared pages), in MB."""
+    pages = open("/proc/self/statm").read().split()
+    return (int(pages[1]) - int(pages[2])) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def summarize(latencies_s: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    ms = [v * 1000 for v in latencies_s]
+    return {
+        "count": len(ms),
+        "mean_ms": statistics.fmean(ms) if ms else 0.0,
+        "p50_ms": percentile(ms, 50),
+        "p95_ms": percentile(ms, 95),
+        "p99_ms": percentile(ms, 99),
+        "max_ms": max(ms) if ms else 0.0,
+    }
+
+
+def time_calls(fn: Callable, inputs: Iterable) -> List[float]:
+    """Call ``fn`` on each input and return per-call wall-clock seconds."""
+    latencies = []
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def print_table(rows: List[Dict], columns: List[str]):
+    widths = {c: max(len(c), *(len(_fmt(r.get(c))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(_fmt(row.get(c)).ljust(widths[c]) for c in columns))
+
+
+def _fmt(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+
+class SyntheticEncoder:
+    """
+    Stand-in for a sentence-transformer when the real model is not available:
+    each text becomes ``tokens`` rows of a fixed feature bank (picked by word
+    hashes), goes through one dense layer and is mean-pooled. Output depends
+    only on the text, and cost grows with batch size like a real model's.
+    """
+
+    def __init__(self, width: int = 1024, dim: int = 384, tokens: int = 32, bank_size: int = 4096):
+        rng = np.random.default_rng(0)
+        self.bank = rng.standard_normal((bank_size, width)).astype("float32")
+        self.weights = rng.standard_normal((width, dim)).astype("float32") / np.sqrt(width)
+        self.tokens = tokens
+
+    def _token_ids(self, text: str) -> List[int]:
+        words = text.lower().split() or [""]
+        ids = [zlib.crc32(w.encode()) % len(self.bank) for w in words[:self.tokens]]
+        return (ids * (self.tokens // len(ids) + 1))[:self.tokens]
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        ids = np.array([self._token_ids(t) for t in texts])
+        hidden = np.maximum(self.bank[ids.ravel()] @ self.weights, 0)
+        return hidden.reshape(len(texts), self.tokens, -1).mean(axis=1)
+
+
+class SyntheticReranker:
+    """Cross-encoder stand-in: encodes each joined (query, passage) pair and applies a linear head."""
+
+    def __init__(self, width: int = 1024, dim: int = 384):
+        self.encoder = SyntheticEncoder(width, dim)
+        self.head = np.random.default_rng(1).standard_normal(dim).astype("float32")
+
+    def predict(self, pairs: List[tuple], **kwargs) -> np.ndarray:
+        return self.encoder.encode([f"{q} {p}" for q, p in pairs]) @ self.head
@@ -0,0 +1,125 @@
+"""
+PyTorch against ONNX Runtime (int8 dynamic quantization by default) for the
+embedding model and the cross-encoder, on CPU.
+
+Each backend runs in a fresh process, as a uvicorn worker would, and reports
+load time, private memory after loading and after the queries (see
+benchmarks/mmap_load.py), and latency of one query embedding and of
+reranking one query's candidates. The accuracy check compares the ONNX
+outputs with the PyTorch ones: cosine similarity of the embeddings, and for
+reranking, how often the top three candidates (as a set and in order) and
+the best candidate agree, plus the mean Spearman correlation of the scores.
+
+Needs sentence-transformers, onnxruntime and transformers (the export also
+needs torch); there is no synthetic stand-in, since the point is to compare
+the real models.
+
+    python -m benchmarks.inference_backend --queries 200 --threads 1 4
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import print_table, private_mb, summarize
+from benchmarks.query_batching import PASSAGES_PER_QUERY, WORDS
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+
+def make_queries(n: int):
+    rng = random.Random(0)
+    sentence = lambda k: " ".join(rng.choice(WORDS) for _ in range(k))  # noqa: E731
+    return [(sentence(8), [sentence(60) for _ in range(PASSAGES_PER_QUERY)]) for _ in range(n)]
+
+
+def child(backend: str, threads: int, queries: int, out_path: str) -> dict:
+    from inference_backend import load_embedder, load_reranker
+
+    base = private_mb()
+    start = time.perf_counter()
+    embedder = load_embedder(EMBEDDING_MODEL, backend=backend, threads=threads)
+    reranker = load_reranker(RERANKER_MODEL, backend=backend, threads=threads)
+    load_ms = (time.perf_counter() - start) * 1000
+    loaded = private_mb() - base
+
+    data = make_queries(queries)
+    embedder.encode([q for q, _ in data[:8]])  # warm-up
+    reranker.predict([(data[0][0], p) for p in data[0][1]])
+    embed_latencies, rerank_latencies, vectors, scores = [], [], [], []
+    for query, passages in data:
+        t0 = time.perf_counter()
+        vectors.append(np.asarray(embedder.encode([query]))[0])
+        t1 = time.perf_counter()
+        scores.append(np.asarray(reranker.predict([(query, p) for p in passages])))
+        t2 = time.perf_counter()
+        embed_latencies.append(t1 - t0)
+        rerank_latencies.append(t2 - t1)
+    np.savez(out_path, vectors=np.stack(vectors), scores=np.stack(scores))
+    embed, rerank = summarize(embed_latencies), summarize(rerank_latencies)
+    return {"backend": backend, "threads": threads, "load_ms": load_ms, "private_mb_loaded": loaded,
+            "private_mb_after_queries": private_mb() - base, "embed_p50_ms": embed["p50_ms"],
+            "embed_p95_ms": embed["p95_ms"], "rerank_p50_ms": rerank["p50_ms"], "rerank_p95_ms": rerank["p95_ms"]}
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    return np.argsort(np.argsort(values, axis=1), axis=1).astype(np.float64)
+
+
+def accuracy(reference: dict, candidate: dict) -> dict:
+    a, b = reference["vectors"], candidate["vectors"]
+    cosine = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    ref_order, cand_order = np.argsort(-reference["scores"], axis=1), np.argsort(-candidate["scores"], axis=1)
+    ra, rb = _ranks(reference["scores"]), _ranks(candidate["scores"])
+    ra -= ra.mean(axis=1, keepdims=True)
+    rb -= rb.mean(axis=1, keepdims=True)
+    spearman = (ra * rb).sum(axis=1) / np.sqrt((ra ** 2).sum(axis=1) * (rb ** 2).sum(axis=1))
+    return {
+        "embed_cosine_min": float(cosine.min()),
+        "embed_cosine_mean": float(cosine.mean()),
+        "rerank_top1_match": float((ref_order[:, 0] == cand_order[:, 0]).mean()),
+        "rerank_top3_set_match": float(np.mean([set(r[:3]) == set(c[:3]) for r, c in zip(ref_order, cand_order)])),
+        "rerank_top3_order_match": float((ref_order[:, :3] == cand_order[:, :3]).all(axis=1).mean()),
+        "rerank_spearman_mean": float(spearman.mean()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    parser.add_argument("--child", nargs=3, metavar=("BACKEND", "THREADS", "OUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(child(args.child[0], int(args.child[1]), args.queries, args.child[2])))
+        return
+
+    rows, accuracy_rows = [], []
+    with tempfile.TemporaryDirectory() as path:
+        for threads in dict.fromkeys(args.threads):
+            outputs = {}
+            for backend in ("torch", "onnx"):
+                out_path = os.path.join(path, f"{backend}-{threads}.npz")
+                out = subprocess.run([sys.executable, "-m", "benchmarks.inference_backend", "--child", backend, str(threads),
+                                      out_path, "--queries", str(args.queries)], check=True, capture_output=True, text=True).stdout
+                rows.append(json.loads(out.strip().splitlines()[-1]))
+                outputs[backend] = dict(np.load(out_path))
+            accuracy_rows.append({"threads": threads, **accuracy(outputs["torch"], outputs["onnx"])})
+
+    print(f"queries={args.queries} passages_per_query={PASSAGES_PER_QUERY} onnx_quantize={os.getenv('ONNX_QUANTIZE', '1')}")
+    print_table(rows, ["backend", "threads", "load_ms", "private_mb_loaded", "private_mb_after_queries",
+                       "embed_p50_ms", "embed_p95_ms", "rerank_p50_ms", "rerank_p95_ms"])
+    print()
+    print_table(accuracy_rows, ["threads", "embed_cosine_min", "embed_cosine_mean", "rerank_top1_match",
+                                "rerank_top3_set_match", "rerank_top3_order_match", "rerank_spearman_mean"])
+
+
+if __name__ == "__main__":
+    main()
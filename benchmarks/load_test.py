@@ -0,0 +1,223 @@
+"""
+End-to-end load test of the FastAPI app: many concurrent patients each replay
+a multi-turn conversation (name to the receptionist, a follow-up, then
+``--clinical-turns`` questions to the clinical agent with the patient report
+the receptionist returned) over HTTP.
+
+By default the app is served in this process by uvicorn with
+``LLM_PROVIDER=fake`` (see llm_provider.py), paced by ``--llm-latency-ms``
+and ``--tokens-per-s``, and a synthetic knowledge base unless
+``--real-resources`` is given, so the whole request path runs without network
+access. ``--url`` targets an already running server instead (start it with
+``LLM_PROVIDER=fake`` to keep Groq out of the measurement).
+
+Reports sessions and requests per second, per-endpoint latency percentiles
+(time to first token too with ``--stream``), the error rate, and memory per
+session: the session manager's own estimate from ``/health`` and, in-process
+only, the growth of private memory divided by the number of sessions.
+
+    python -m benchmarks.load_test --sessions 200 --concurrency 50 --stream
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+os.environ.setdefault("LLM_PROVIDER", "fake")
+os.environ.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+
+import httpx  # noqa: E402
+
+from benchmarks.common import print_table, private_mb, summarize  # noqa: E402
+
+FOLLOW_UP = "I have been feeling a bit tired since I got home."
+CLINICAL_QUESTIONS = [
+    "Is some swelling in my legs normal for my kidney condition?",
+    "How much fluid should I drink each day?",
+    "Can I take ibuprofen for a headache with my medications?",
+    "What should my blood pressure be after discharge?",
+]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.first_token: Dict[str, List[float]] = {}
+        self.requests = 0
+        self.errors: Dict[str, int] = {}
+
+    def error(self, endpoint: str):
+        self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+
+async def post_turn(client: httpx.AsyncClient, recorder: Recorder, endpoint: str, payload: dict, stream: bool) -> Optional[dict]:
+    """One chat turn; returns the response payload, or None (and counts an error) if it failed."""
+    recorder.requests += 1
+    start = time.perf_counter()
+    try:
+        if not stream:
+            resp = await client.post(f"/chat/{endpoint}", json=payload)
+            body = resp.json() if resp.status_code == 200 else None
+        else:
+            body, event, first_token = None, None, None
+            async with client.stream("POST", f"/chat/{endpoint}/stream", json=payload) as resp:
+                async for line in resp.aiter_lines():
+                    if line.startswith("event: "):
+                        event = line[7:]
+                        if event == "token" and first_token is None:
+                            first_token = time.perf_counter() - start
+                    elif line.startswith("data: ") and event == "done":
+                        body = json.loads(line[6:])
+            if body is not None and first_token is not None:
+                recorder.first_token.setdefault(endpoint, []).append(first_token)
+    except httpx.HTTPError:
+        body = None
+    if body is None:
+        recorder.error(endpoint)
+        return None
+    recorder.latencies.setdefault(endpoint, []).append(time.perf_counter() - start)
+    return body
+
+
+async def conversation(client: httpx.AsyncClient, recorder: Recorder, name: str, session_id: str,
+                       clinical_turns: int, stream: bool) -> bool:
+    report = None
+    for text in (name, FOLLOW_UP):
+        body = await post_turn(client, recorder, "receptionist", {"user_input": text, "session_id": session_id}, stream)
+        if body is None:
+            return False
+        report = body.get("patient_report") or report
+    if not report:
+        recorder.error("patient_not_identified")
+        return False
+    for turn in range(clinical_turns):
+        question = CLINICAL_QUESTIONS[turn % len(CLINICAL_QUESTIONS)]
+        payload = {"user_input": question, "session_id": session_id, "patient_report": report}
+        if await post_turn(client, recorder, "clinical", payload, stream) is None:
+            return False
+    return True
+
+
+async def run(url: str, names: List[str], sessions: int, concurrency: int, clinical_turns: int, stream: bool, tag: str):
+    recorder = Recorder()
+    gate = asyncio.Semaphore(concurrency)
+    session_latencies, completed = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        async def one(i: int):
+            nonlocal completed
+            async with gate:
+                start = time.perf_counter()
+                if await conversation(client, recorder, names[i % len(names)], f"{tag}-{i}", clinical_turns, stream):
+                    completed += 1
+                    session_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(sessions)))
+        elapsed = time.perf_counter() - start
+        health = (await client.get("/health")).json()
+    return recorder, session_latencies, completed, elapsed, health
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_in_process(args) -> str:
+    """Start backend_api on a local port with the fake LLM, and load its resources before measuring."""
+    import uvicorn
+
+    from llm_provider import get_llm
+
+    llm = get_llm()
+    if hasattr(llm, "latency_ms"):
+        llm.latency_ms, llm.tokens_per_s = args.llm_latency_ms, args.tokens_per_s
+    if args.real_resources:
+        from clinical_agent import WARMUP_RESOURCES
+        from resources import registry
+        registry.warm_up(WARMUP_RESOURCES, background=False)
+    else:
+        from benchmarks.async_load import install_synthetic_resources
+        install_synthetic_resources(args.cpu_work, args.chunks)
+
+    from backend_api import app
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--clinical-turns", type=int, default=2)
+    parser.add_argument("--stream", action="store_true", help="use the SSE endpoints and report time to first token")
+    parser.add_argument("--url", help="load an already running server instead of starting one in this process")
+    parser.add_argument("--llm-latency-ms", type=float, default=300, help="fake LLM wait before the first token")
+    parser.add_argument("--tokens-per-s", type=float, default=200, help="fake LLM token rate; 0 answers at once")
+    parser.add_argument("--real-resources", action="store_true", help="load the real models and indexes instead of synthetic ones")
+    parser.add_argument("--cpu-work", type=int, default=1024, help="synthetic model width; larger means more CPU per encode/rerank")
+    parser.add_argument("--chunks", type=int, default=500, help="synthetic knowledge-base size")
+    parser.add_argument("--output", help="also write the results as JSON to this path")
+    args = parser.parse_args()
+
+    from benchmarks.async_load import unique_names
+
+    url = args.url or serve_in_process(args)
+    names = unique_names()
+    # One short conversation first, so lazy imports and connection setup are not measured
+    asyncio.run(run(url, names, 1, 1, 1, args.stream, "warmup"))
+    base_mb = private_mb()
+    recorder, session_latencies, completed, elapsed, health = asyncio.run(
+        run(url, names, args.sessions, args.concurrency, args.clinical_turns, args.stream, f"load{os.getpid()}"))
+    grown_mb = private_mb() - base_mb
+
+    session_stats = health.get("sessions", {})
+    cached = session_stats.get("cached_sessions") or 0
+    errors = sum(recorder.errors.values())
+    summary = {
+        "sessions": args.sessions,
+        "completed": completed,
+        "concurrency": args.concurrency,
+        "sessions_per_s": completed / elapsed,
+        "requests_per_s": recorder.requests / elapsed,
+        "error_rate": errors / max(recorder.requests, 1),
+        "errors": recorder.errors,
+        "session_state_bytes": session_stats.get("total_bytes", 0) / cached if cached else None,
+        "private_kb_per_session": None if args.url else grown_mb * 1000 / args.sessions,
+        "session": summarize(session_latencies),
+        "endpoints": {e: summarize(v) for e, v in recorder.latencies.items()},
+        "first_token": {e: summarize(v) for e, v in recorder.first_token.items()},
+        "health": health,
+    }
+
+    print(f"sessions={args.sessions} concurrency={args.concurrency} clinical_turns={args.clinical_turns} "
+          f"stream={args.stream} llm_latency_ms={args.llm_latency_ms} tokens_per_s={args.tokens_per_s}"
+          + (f" url={args.url}" if args.url else ""))
+    print_table([summary], ["completed", "sessions_per_s", "requests_per_s", "error_rate",
+                            "session_state_bytes", "private_kb_per_session"])
+    print()
+    rows = [{"stage": "session", **summary["session"]}]
+    rows += [{"stage": e, **s} for e, s in summary["endpoints"].items()]
+    rows += [{"stage": f"{e} first token", **s} for e, s in summary["first_token"].items()]
+    print_table(rows, ["stage", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+    if recorder.errors:
+        print(f"\nerrors: {recorder.errors}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Per-worker cost of loading the knowledge base: reading nephro.txt and the
+FAISS index onto the heap (the old loaders) against opening the offset-indexed
+chunk store and the FAISS index memory-mapped.
+
+Each mode runs in a fresh process, as a uvicorn worker would. "private_mb" is
+resident memory the process does not share (resident minus file-backed shared
+pages, from /proc/self/statm): what every extra worker adds on top of the
+page cache. Measured after loading and again after a round of queries.
+
+    python -m benchmarks.mmap_load --chunks 100000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import faiss
+import numpy as np
+
+from benchmarks.common import print_table, private_mb
+from chunk_store import ChunkStore
+from vector_index import build_faiss_index, read_faiss_index
+
+DIM = 384
+
+
+def write_corpus(path: str, n_chunks: int, index_type: str):
+    rng = np.random.default_rng(0)
+    words = np.array([f"word{i}" for i in range(20000)])
+    chunks = [" ".join(rng.choice(words, 70)) for _ in range(n_chunks)]
+    with open(os.path.join(path, "nephro.txt"), "w", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(chunk + "\n\n")
+    ChunkStore.write(chunks, os.path.join(path, "chunks"))
+    vectors = rng.standard_normal((n_chunks, DIM)).astype(np.float32)
+    faiss.write_index(build_faiss_index(vectors, index_type), os.path.join(path, "index.faiss"))
+
+
+def child(mode: str, path: str, queries: int) -> dict:
+    base = private_mb()
+    start = time.perf_counter()
+    if mode == "heap":
+        with open(os.path.join(path, "nephro.txt"), encoding="utf-8") as f:
+            chunks = [chunk.strip() for chunk in f.read().split("\n\n") if chunk.strip()]
+        index = faiss.read_index(os.path.join(path, "index.faiss"))
+    else:
+        chunks = ChunkStore.open(os.path.join(path, "chunks"))
+        index = read_faiss_index(os.path.join(path, "index.faiss"))
+    startup_ms = (time.perf_counter() - start) * 1000
+    loaded = private_mb() - base
+
+    rng = np.random.default_rng(1)
+    for _ in range(queries):
+        _, ids = index.search(rng.standard_normal((1, DIM)).astype(np.float32), 5)
+        [chunks[i] for i in ids[0] if i >= 0]
+    return {"mode": mode, "chunks": len(chunks), "startup_ms": startup_ms, "private_mb_loaded": loaded,
+            "private_mb_after_queries": private_mb() - base}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(child(*args.child, args.queries)))
+        return
+
+    with tempfile.TemporaryDirectory() as path:
+        write_corpus(path, args.chunks, args.index_type)
+        sizes = {name: sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(os.path.join(path, name)) for f in files)
+                 if os.path.isdir(os.path.join(path, name)) else os.path.getsize(os.path.join(path, name))
+                 for name in ("nephro.txt", "chunks", "index.faiss")}
+        rows = []
+        for mode in ("heap", "mmap"):
+            out = subprocess.run([sys.executable, "-m", "benchmarks.mmap_load", "--child", mode, path, "--queries", str(args.queries)],
+                                 check=True, capture_output=True, text=True).stdout
+            rows.append(json.loads(out.strip().splitlines()[-1]))
+
+    print(f"chunks={args.chunks} index={args.index_type} " + " ".join(f"{k}_mb={v / 1e6:.0f}" for k, v in sizes.items()))
+    print_table(rows, ["mode", "chunks", "startup_ms", "private_mb_loaded", "private_mb_after_queries"])
+
+
+if __name__ == "__main__":
+    main()
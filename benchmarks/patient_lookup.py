@@ -0,0 +1,103 @@
+"""
+Patient name lookup benchmark: the original per-call linear scan vs the
+indexed PatientStore and the fuzzy matcher.
+
+    python -m benchmarks.patient_lookup --records 500000
+"""
+import argparse
+import json
+import os
+import random
+import string
+import tempfile
+import time
+
+from benchmarks.common import print_table, summarize, time_calls
+from patient_store import PatientStore, normalize_name
+
+FIRST_NAMES = ["john", "alice", "michael", "sarah", "robert", "emily", "david", "maria", "james", "linda",
+               "william", "susan", "richard", "karen", "joseph", "nancy", "thomas", "lisa", "charles", "betty",
+               "omar", "priya", "chen", "fatima", "ivan", "lucia", "kwame", "aiko", "noah", "zoe",
+               "mateo", "amara", "yusuf", "ingrid", "ravi", "elena", "tariq", "mei", "diego", "olga"]
+SYLLABLES = ["son", "ber", "man", "ton", "ley", "ford", "wick", "ara", "ell", "ino", "ski", "gar", "dal", "ven", "rod",
+             "mir", "kat", "pol", "zan", "tre", "gus", "hol", "bry", "ste", "lin", "dor", "fen", "qui", "mar", "nel"]
+
+
+def synthetic_names(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    for _ in range(n):
+        last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+        yield f"{rng.choice(FIRST_NAMES).title()} {last.title()}"
+
+
+def typo(name: str, rng: random.Random) -> str:
+    chars = list(name)
+    i = rng.randrange(len(chars))
+    if chars[i] == " ":
+        return name
+    op = rng.choice(["drop", "swap", "replace"])
+    if op == "drop":
+        del chars[i]
+    elif op == "swap" and i + 1 < len(chars) and chars[i + 1] != " ":
+        chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    else:
+        chars[i] = rng.choice(string.ascii_lowercase)
+    return "".join(chars)
+
+
+def linear_scan(patients, patient_name):
+    """The pre-index implementation of get_patient_report, minus the file parse."""
+    exact = [p for p in patients if p["patient_name"].lower() == patient_name.lower()]
+    if exact:
+        return exact
+    return [p for p in patients if patient_name.lower() in p["patient_name"].lower()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--scan-queries", type=int, default=20, help="queries for the (slow) linear baseline")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    patients = [{"patient_id": f"P{i:07d}", "patient_name": name} for i, name in enumerate(synthetic_names(args.records))]
+    targets = [rng.choice(patients)["patient_name"] for _ in range(args.queries)]
+    partial = [t.split()[1][:6] for t in targets]
+    typos = [typo(t.lower(), rng) for t in targets]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "patients.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(patients, f)
+
+        start = time.perf_counter()
+        # Fuzzy matcher built on demand below, so load and matcher build are timed separately
+        store = PatientStore(path, fuzzy_matching=False)
+        store.reload()
+        load_s = time.perf_counter() - start
+        start = time.perf_counter()
+        store.find_fuzzy("warmup")
+        matcher_s = time.perf_counter() - start
+
+        rows = []
+        scan = summarize(time_calls(lambda q: linear_scan(patients, q), targets[:args.scan_queries]))
+        rows.append({"lookup": "linear scan (exact)", **scan})
+        scan = summarize(time_calls(lambda q: linear_scan(patients, q), partial[:args.scan_queries]))
+        rows.append({"lookup": "linear scan (partial)", **scan})
+        rows.append({"lookup": "indexed exact", **summarize(time_calls(store.find_exact, targets))})
+        rows.append({"lookup": "indexed partial", **summarize(time_calls(store.find_partial, partial))})
+        rows.append({"lookup": "fuzzy (typo)", **summarize(time_calls(store.find_fuzzy, typos))})
+
+        hits = sum(
+            any(normalize_name(r["patient_name"]) == normalize_name(t) for _, recs in store.find_fuzzy(q, limit=5) for r in recs)
+            for q, t in zip(typos, targets)
+        )
+
+    print(f"records={args.records}  store load={load_s:.2f}s  fuzzy index build={matcher_s:.2f}s")
+    print_table(rows, ["lookup", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+    print(f"fuzzy recall@5 on single-typo queries: {hits / len(typos):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Retrieval quality and latency of the clinical agent's hybrid search over the
+knowledge base, for comparing changes to retrieval, query expansion,
+chunking or the FAISS index type.
+
+Queries come from benchmarks/nephro_queries.json. Each one lists phrases,
+and a chunk is relevant if it contains one of them (case-insensitive), so the
+labels survive re-chunking. Queries with no relevant chunk in the corpus are
+skipped and counted as unjudged. Four rankings are scored:
+- dense: the FAISS top ``FUSION_DEPTH``;
+- bm25: the BM25 top ``FUSION_DEPTH``;
+- fused: reciprocal-rank fusion of the two;
+- final: the three chunks ``hybrid_search`` returns.
+
+Each ranking reports recall@k (relevant chunks found over min(k, relevant
+chunks)), MRR and binary nDCG@k.
+
+Latency goes through the real ``hybrid_search`` code path, with the models
+and indexes wrapped to time each stage (embed, faiss, bm25, rerank and the
+whole search). The report gives p50/p95/p99 per stage, the number of stages
+dropped for exceeding their budget, and private memory after building the
+indexes and after the queries (see benchmarks/mmap_load.py).
+
+Runs offline:
+- The corpus is data/nephro.txt when it exists (``--corpus real``);
+  otherwise a synthetic corpus with relevant chunks planted for each query.
+- The models are the local embedding model and cross-encoder when
+  sentence-transformers (or ``INFERENCE_BACKEND=onnx``) is available
+  (``--models real``); otherwise the synthetic stand-ins.
+
+``--output`` writes everything as JSON, keyed and sorted so that results
+from two commits can be diffed directly.
+
+    python -m benchmarks.retrieval_eval --index-type flat --output retrieval.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import time
+from typing import Dict, List, Sequence
+
+import faiss
+import numpy as np
+
+from benchmarks.common import SyntheticEncoder, SyntheticReranker, print_table, private_mb
+from benchmarks.query_batching import WORDS
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), "nephro_queries.json")
+KS = (1, 3, 5, 10)
+
+
+def load_queries(path: str = QUERIES_PATH) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def real_corpus(path: str, chunk_size: int = 0) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        chunks = [c.strip() for c in f.read().split("\n\n") if c.strip()]
+    if chunk_size:
+        from ingestion import chunk_text
+        chunks = chunk_text("\n".join(chunks), chunk_size)
+    return chunks
+
+
+def synthetic_corpus(queries: List[Dict], n_chunks: int, planted: int = 3, seed: int = 0) -> List[str]:
+    """Filler chunks, plus ``planted`` chunks per query holding one of its phrases and some of its words."""
+    rng = random.Random(seed)
+    vocabulary = WORDS + ["patient", "clinical", "renal", "tubule", "glomerulus", "nephron", "plasma", "blood",
+                          "hormone", "transport", "filtration", "excretion", "concentration", "membrane", "cell"]
+    sentence = lambda k: " ".join(rng.choice(vocabulary) for _ in range(k))  # noqa: E731
+    chunks = [sentence(70) for _ in range(n_chunks)]
+    for q in queries:
+        query_words = [w.strip("?.,").lower() for w in q["query"].split() if len(w) > 3]
+        for _ in range(planted):
+            words = sentence(50).split() + rng.sample(query_words, min(4, len(query_words)))
+            rng.shuffle(words)
+            words.insert(rng.randrange(len(words) + 1), rng.choice(q["relevant"]))  # kept whole so it still matches
+            chunks.insert(rng.randrange(len(chunks) + 1), " ".join(words))
+    return chunks
+
+
+def load_corpus(kind: str, queries: List[Dict], chunk_size: int, synthetic_chunks: int):
+    from clinical_agent import NEPHRO_TXT_PATH
+    if kind in ("auto", "real"):
+        try:
+            return real_corpus(NEPHRO_TXT_PATH, chunk_size), "real"
+        except FileNotFoundError:
+            if kind == "real":
+                raise
+    return synthetic_corpus(queries, synthetic_chunks), "synthetic"
+
+
+def load_models(kind: str):
+    from inference_backend import EMBEDDING_MODEL, RERANKER_MODEL
+    if kind in ("auto", "real"):
+        try:
+            from inference_backend import load_embedder, load_reranker
+            return load_embedder(EMBEDDING_MODEL), load_reranker(RERANKER_MODEL), "real"
+        except ImportError:
+            if kind == "real":
+                raise
+    return SyntheticEncoder(), SyntheticReranker(), "synthetic"
+
+
+# --- Metrics ---
+def relevant_positions(chunks: Sequence[str], phrases: Sequence[str]) -> set:
+    phrases = [_normalize(p) for p in phrases]
+    return {i for i, chunk in enumerate(chunks) if any(p in _normalize(chunk) for p in phrases)}
+
+
+def recall_at(ranking: List[int], relevant: set, k: int) -> float:
+    return len(set(ranking[:k]) & relevant) / min(k, len(relevant))
+
+
+def reciprocal_rank(ranking: List[int], relevant: set) -> float:
+    return next((1.0 / (rank + 1) for rank, position in enumerate(ranking) if position in relevant), 0.0)
+
+
+def ndcg_at(ranking: List[int], relevant: set, k: int) -> float:
+    dcg = sum(1.0 / np.log2(rank + 2) for rank, position in enumerate(ranking[:k]) if position in relevant)
+    ideal = sum(1.0 / np.log2(rank + 2) for rank in range(min(k, len(relevant))))
+    return dcg / ideal
+
+
+def score_rankings(rankings: Dict[str, List[List[int]]], relevant: List[set]) -> Dict[str, Dict[str, float]]:
+    result = {}
+    for name, per_query in rankings.items():
+        metrics = {f"recall@{k}": np.mean([recall_at(r, rel, k) for r, rel in zip(per_query, relevant)]) for k in KS}
+        metrics["mrr"] = np.mean([reciprocal_rank(r, rel) for r, rel in zip(per_query, relevant)])
+        metrics.update({f"ndcg@{k}": np.mean([ndcg_at(r, rel, k) for r, rel in zip(per_query, relevant)]) for k in KS})
+        result[name] = {key: round(float(value), 4) for key, value in metrics.items()}
+    return result
+
+
+# --- Instrumentation ---
+class _Timed:
+    """Proxy that records each call of one method of ``target`` as ``stage``; everything else passes through."""
+
+    def __init__(self, target, method: str, stage: str, timings):
+        self._target, self._method, self._stage, self._timings = target, method, stage, timings
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name != self._method:
+            return attr
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                self._timings.record(self._stage, time.perf_counter() - start)
+
+        return timed
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", choices=["auto", "real", "synthetic"], default="auto")
+    parser.add_argument("--models", choices=["auto", "real", "synthetic"], default="auto")
+    parser.add_argument("--index-type", default=None, help="FAISS index type (default: FAISS_INDEX_TYPE)")
+    parser.add_argument("--chunk-size", type=int, default=0, help="re-chunk nephro.txt with ingestion.chunk_text (0: as ingested)")
+    parser.add_argument("--synthetic-chunks", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=5, help="latency passes over the query set")
+    parser.add_argument("--no-expand", action="store_true", help="search the raw query instead of expand_query's output")
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    # hybrid_search lives in the clinical agent module, which builds its LLM client at import time;
+    # no LLM call is made here. Cached embeddings would hide the model's latency.
+    os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+    os.environ["EMBEDDING_CACHE"] = "0"
+    import clinical_agent as ca
+    from bm25_index import BM25Index
+    from inference_backend import INFERENCE_BACKEND
+    from stage_timings import StageTimings
+    from tokenizer import config as tokenizer_config, tokenize
+    from vector_index import FAISS_INDEX_TYPE, build_faiss_index, configure_search, describe
+
+    index_type = args.index_type or FAISS_INDEX_TYPE
+    queries = load_queries(args.queries)
+    base_mb = private_mb()
+    embedder, reranker, models = load_models(args.models)
+    models_mb = private_mb() - base_mb
+    chunks, corpus = load_corpus(args.corpus, queries, args.chunk_size, args.synthetic_chunks)
+
+    start = time.perf_counter()
+    embeddings = np.ascontiguousarray(embedder.encode(chunks, batch_size=64), dtype=np.float32)
+    embed_corpus_s = time.perf_counter() - start
+    index = configure_search(build_faiss_index(embeddings, index_type))
+    bm25 = BM25Index.build((tokenize(c) for c in chunks), tokenizer=tokenizer_config())
+    indexes_mb = private_mb() - base_mb
+    del embeddings
+
+    timings = StageTimings()
+    for name, value in (("chunks", chunks), ("faiss_index", _Timed(index, "search", "faiss", timings)),
+                        ("bm25", _Timed(bm25, "top_n", "bm25", timings)), ("embedder", _Timed(embedder, "encode", "embed", timings)),
+                        ("reranker", _Timed(reranker, "predict", "rerank", timings))):
+        ca.registry.register(name, lambda value=value: value)
+
+    # Quality: one pass over the judged queries (doubles as warm-up)
+    judged, relevant = [], []
+    for q in queries:
+        rel = relevant_positions(chunks, q["relevant"])
+        if rel:
+            judged.append(q["query"] if args.no_expand else ca.expand_query(q["query"]))
+            relevant.append(rel)
+    position = {}
+    for i, chunk in enumerate(chunks):
+        position.setdefault(chunk, i)
+    rankings = {"dense": [], "bm25": [], "fused": [], "final": []}
+    fusion_before = ca.fusion_stats()
+    for query in judged:
+        dense = ca._dense_candidates(embedder.encode([query]))
+        lexical = ca._lexical_candidates(query)
+        rankings["dense"].append(dense)
+        rankings["bm25"].append(lexical)
+        rankings["fused"].append(ca._fuse(dense, lexical))
+        rankings["final"].append([position[c] for c in ca.hybrid_search(query)[0]])
+    fusion = ca.fusion_stats()
+    early_exit_rate = (fusion["early_exits"] - fusion_before["early_exits"]) / max(1, fusion["queries"] - fusion_before["queries"])
+
+    # Latency: the same path the clinical agent takes, stage by stage
+    timings = StageTimings(window=max(1, args.repeats) * len(judged))
+    for name in ("faiss_index", "bm25", "embedder", "reranker"):
+        ca.registry.get(name)._timings = timings
+    timeouts_before = {stage: s["timeouts"] for stage, s in ca.retrieval_timings.stats().items()}
+    for _ in range(args.repeats):
+        for query in judged:
+            start = time.perf_counter()
+            ca.hybrid_search(query)
+            timings.record("hybrid_search", time.perf_counter() - start)
+    timeouts = {stage: s["timeouts"] - timeouts_before.get(stage, 0) for stage, s in ca.retrieval_timings.stats().items()}
+
+    results = {
+        "config": {
+            "commit": git_commit(), "corpus": corpus, "chunks": len(chunks), "chunk_size": args.chunk_size or None,
+            "models": models, "inference_backend": INFERENCE_BACKEND, "index": describe(index), "index_type": index_type,
+            "expand_query": not args.no_expand, "fusion_depth": ca.FUSION_DEPTH, "rrf_k": ca.RRF_K,
+            "rerank_top_m": ca.RERANK_TOP_M, "fusion_early_exit": ca.FUSION_EARLY_EXIT, "repeats": args.repeats,
+        },
+        "queries": {"judged": len(judged), "unjudged": len(queries) - len(judged)},
+        "quality": score_rankings(rankings, relevant),
+        "early_exit_rate": round(early_exit_rate, 4),
+        "latency_ms": timings.stats(),
+        "stage_timeouts": timeouts,
+        "memory_mb": {
+            "models": round(models_mb, 1), "after_indexes": round(indexes_mb, 1),
+            "after_queries": round(private_mb() - base_mb, 1),
+            "faiss_index": round(faiss.serialize_index(index).nbytes / 1e6, 1),
+        },
+        "embed_corpus_s": round(embed_corpus_s, 2),
+    }
+
+    config = results["config"]
+    print(f"commit={config['commit']} corpus={corpus} chunks={len(chunks)} models={models} index={config['index']} "
+          f"judged={len(judged)} unjudged={results['queries']['unjudged']} early_exit_rate={results['early_exit_rate']}")
+    print_table([{"ranking": name, **metrics} for name, metrics in results["quality"].items()],
+                ["ranking", *(f"recall@{k}" for k in KS), "mrr", *(f"ndcg@{k}" for k in KS)])
+    print()
+    print_table([{"stage": stage, **s} for stage, s in results["latency_ms"].items()], ["stage", "calls", "p50_ms", "p95_ms", "p99_ms"])
+    print(f"memory_mb={results['memory_mb']} stage_timeouts={timeouts}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Per-session creation cost in backend_api: the old layout (every session builds
+a ReceptionistAgent plus a ClinicalAgent that compiles its own LangGraph)
+against the current one (receptionist only; the clinical agent is created on
+the first clinical message and shares the process-wide compiled graph).
+
+No models are loaded and no LLM calls are made; a placeholder GROQ_API_KEY is
+enough to construct the agents.
+
+    python -m benchmarks.session_creation --sessions 200
+"""
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault("GROQ_API_KEY", "benchmark-placeholder")
+
+from benchmarks.common import print_table  # noqa: E402
+from clinical_agent import ClinicalAgent, build_graph  # noqa: E402
+from receptionist_agent import ReceptionistAgent  # noqa: E402
+from resources import registry  # noqa: E402
+
+
+def legacy_session():
+    clinical = ClinicalAgent()
+    clinical.__dict__["graph"] = build_graph()  # what ClinicalAgent.__init__ used to do
+    return {"receptionist": ReceptionistAgent(), "clinical": clinical}
+
+
+def lazy_session():
+    return {"receptionist": ReceptionistAgent(), "clinical": None}
+
+
+def clinical_session():
+    return {"receptionist": ReceptionistAgent(), "clinical": ClinicalAgent()}
+
+
+def measure(factory, n):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    sessions = [factory() for _ in range(n)]
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del sessions
+    return {"create_ms": elapsed / n * 1000, "kib_per_session": grown / n / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    args = parser.parse_args()
+
+    # Warm imports and the shared graph so only per-session work is measured
+    registry.get("clinical_graph")
+    legacy_session()
+    lazy_session()
+
+    rows = [
+        {"layout": "before: receptionist + clinical (own graph)", **measure(legacy_session, args.sessions)},
+        {"layout": "after: receptionist, clinical deferred", **measure(lazy_session, args.sessions)},
+        {"layout": "after: receptionist + clinical (shared graph)", **measure(clinical_session, args.sessions)},
+    ]
+    print(f"sessions={args.sessions}")
+    print_table(rows, ["layout", "create_ms", "kib_per_session"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+BM25 tokenization: the previous path (chunks indexed with NLTK
+``word_tokenize(chunk.lower())``, queries split with ``query.lower().split()``)
+against the shared regex tokenizer in tokenizer.py, with and without
+stopwords and stemming.
+
+Queries are written from a source chunk the way a patient would type them:
+a few of its distinctive words, sometimes in another inflection, inside a
+question with punctuation attached ("Is my swelling, or edema, normal?").
+recall@5 is the share of queries whose source chunk BM25 returns in its top 5.
+Inflections only add or drop a plural "s", the commonest mismatch in practice.
+Like PDF-extracted text, a quarter of the synthetic sentences follow the previous
+one without a space ("...is low.Patients with..."); "joined_terms" counts the
+index terms that fuse two words across such a period, which no query matches.
+Tokenization latency is per query.
+
+Uses data/nephro.txt when it exists, otherwise a synthetic clinical corpus.
+If NLTK's punkt data is missing, the previous path is approximated with
+NLTK's Treebank word tokenizer (what ``word_tokenize`` runs per sentence).
+
+    python -m benchmarks.tokenization --queries 500
+"""
+import argparse
+import os
+import random
+import re
+import time
+from collections import Counter
+
+from benchmarks.common import print_table, summarize, time_calls
+from bm25_index import BM25Index
+from tokenizer import STOPWORDS, tokenize
+
+NEPHRO_TXT_PATH = "data/nephro.txt"
+JOINED = re.compile(r"[a-z]\.[a-z0-9]|[0-9]\.[a-z]")  # a word, a period and another word in one token
+
+TERMS = [
+    "kidney", "kidneys", "creatinine", "potassium", "sodium", "phosphorus", "calcium", "albumin", "proteinuria",
+    "hematuria", "dialysis", "hemodialysis", "transplant", "glomerulus", "glomerular", "nephron", "tubule",
+    "filtration", "eGFR", "urine", "bladder", "ureter", "edema", "swelling", "hypertension", "diabetes",
+    "anemia", "fatigue", "nausea", "itching", "cramps", "fluid", "diet", "protein", "medication", "diuretic",
+    "furosemide", "lisinopril", "losartan", "erythropoietin", "biopsy", "ultrasound", "infection", "fever",
+    "catheter", "fistula", "acidosis", "bicarbonate", "cholesterol", "statin", "insulin", "glucose", "weight",
+    "pressure", "headache", "dizziness", "appetite", "exercise", "sleep", "vaccination", "antibiotic", "stones",
+]
+# Compound terms ("nephrosclerosis", "cardiomegalic", ...) widen the vocabulary so a few words identify a chunk
+PREFIXES = ["nephro", "gastro", "cardio", "hepato", "neuro", "osteo", "hemo", "uro", "glomerulo", "pyelo"]
+ROOTS = ["path", "scler", "megal", "troph", "lith", "plast", "cyt", "gen"]
+SUFFIXES = ["y", "ia", "itis", "osis", "ic", "al"]
+TERMS += [p + r + s for p in PREFIXES for r in ROOTS for s in SUFFIXES]
+VERBS = ["increases", "reduces", "affects", "indicates", "requires", "monitoring", "controls", "worsens",
+         "improved", "measured", "caused", "prevents"]
+TEMPLATES = [
+    "The {a} {v} {b}, especially when {c} is low.",
+    "Patients with {a} often report {b} and {c}.",
+    "{A} ({b}) should be checked weekly; {c} levels {v} over time.",
+    "Avoid {a}-rich foods if {b} is elevated.",
+    "Daily {a} monitoring {v} {b} after discharge, and {c} may follow.",
+    "In chronic {a}, {b} {v} the risk of {c}.",
+]
+QUESTIONS = ["What about {words}?", "Is {words} normal?", "{Words}?", "Should I worry about {words}?",
+             "Can you explain {words}, please?", "My doctor mentioned {words}. What does that mean?"]
+
+
+def synthetic_chunks(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    chunks = []
+    for _ in range(n):
+        sentences = []
+        while sum(len(s) + 1 for s in sentences) < 450:
+            a, b, c = rng.sample(TERMS, 3)
+            sentences.append(rng.choice(TEMPLATES).format(a=a, A=a.capitalize(), b=b, c=c, v=rng.choice(VERBS)))
+        chunks.append("".join(s + rng.choice(["", " ", " ", " "]) for s in sentences).strip())
+    return chunks
+
+
+def load_chunks(n_synthetic: int):
+    if os.path.exists(NEPHRO_TXT_PATH):
+        with open(NEPHRO_TXT_PATH, encoding="utf-8") as f:
+            return [c.strip() for c in f.read().split("\n\n") if c.strip()], NEPHRO_TXT_PATH
+    return synthetic_chunks(n_synthetic), "synthetic"
+
+
+def inflect(word: str, rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return word
+    if word.endswith(("ss", "us", "is")):
+        return word + "es"
+    return word[:-1] if word.endswith("s") and len(word) > 4 else word + "s"
+
+
+def make_queries(chunks, n: int, seed: int = 1):
+    """(query, source chunk id) pairs built from each chunk's least common words."""
+    words_of = [[w.strip(".,;:()?!").lower() for w in c.split()] for c in chunks]
+    df = Counter(w for words in words_of for w in set(words))
+    rng = random.Random(seed)
+    queries = []
+    while len(queries) < n:
+        doc_id = rng.randrange(len(chunks))
+        candidates = sorted({w for w in words_of[doc_id] if w.isalpha() and w not in STOPWORDS}, key=lambda w: (df[w], w))
+        if len(candidates) < 2:
+            continue
+        picked = [inflect(w, rng) for w in rng.sample(candidates[:6], min(len(candidates), rng.randint(2, 3)))]
+        words = rng.choice([", ", " and ", " "]).join(picked)
+        queries.append((rng.choice(QUESTIONS).format(words=words, Words=words.capitalize()), doc_id))
+    return queries
+
+
+def previous_tokenizer():
+    """``word_tokenize`` as the old ingestion used it, and the seconds spent importing it."""
+    start = time.perf_counter()
+    from nltk.tokenize import NLTKWordTokenizer, word_tokenize
+    import_s = time.perf_counter() - start
+    try:
+        word_tokenize("probe.")
+        return word_tokenize, import_s, "nltk word_tokenize"
+    except LookupError:
+        return NLTKWordTokenizer().tokenize, import_s, "nltk treebank (punkt data missing)"
+
+
+def evaluate(name, index_tokenize, query_tokenize, chunks, queries, k: int = 5):
+    start = time.perf_counter()
+    tokenized = [index_tokenize(c) for c in chunks]
+    index = BM25Index.build(tokenized)
+    build_s = time.perf_counter() - start
+    joined = sum(1 for term in {t for tokens in tokenized for t in tokens} if JOINED.search(term))
+    hits = sum(doc_id in index.top_n_ids(query_tokenize(q), k) for q, doc_id in queries)
+    latency = summarize(time_calls(query_tokenize, [q for q, _ in queries]))
+    return {"pipeline": name, f"recall@{k}": hits / len(queries), "index_build_s": build_s, "joined_terms": joined,
+            "query_tok_p50_us": latency["p50_ms"] * 1000, "query_tok_p95_us": latency["p95_ms"] * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--synthetic-chunks", type=int, default=2000)
+    args = parser.parse_args()
+
+    chunks, source = load_chunks(args.synthetic_chunks)
+    queries = make_queries(chunks, args.queries)
+    word_tokenize, import_s, previous = previous_tokenizer()
+
+    rows = [
+        evaluate("previous: word_tokenize / split", lambda t: word_tokenize(t.lower()), lambda q: q.lower().split(), chunks, queries),
+        evaluate("word_tokenize on both sides", lambda t: word_tokenize(t.lower()), lambda q: word_tokenize(q.lower()), chunks, queries),
+        evaluate("regex", lambda t: tokenize(t, False, False), lambda q: tokenize(q, False, False), chunks, queries),
+        evaluate("regex + stopwords", lambda t: tokenize(t, True, False), lambda q: tokenize(q, True, False), chunks, queries),
+        evaluate("regex + stopwords + stemming", lambda t: tokenize(t, True, True), lambda q: tokenize(q, True, True), chunks, queries),
+    ]
+    print(f"corpus={source} chunks={len(chunks)} queries={len(queries)} previous={previous} nltk_import_ms={import_s * 1000:.0f}")
+    print("example queries:", *[q for q, _ in queries[:3]], sep="\n  ")
+    print_table(rows, ["pipeline", "recall@5", "joined_terms", "index_build_s", "query_tok_p50_us", "query_tok_p95_us"])
+
+
+if __name__ == "__main__":
+    main()
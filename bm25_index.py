@@ -0,0 +1,253 @@
+import json
+import math
+import os
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+FORMAT_VERSION = 1
+K1 = 1.5
+B = 0.75
+EPSILON = 0.25
+BUILD_BLOCK_DOCS = 65536
+UPPER_BOUND_SLACK = 1e-9  # keeps score upper bounds safe against float summation order
+THRESHOLD_SEED_DOCS = 1024  # per-term cap on documents scored to seed the top_n threshold
+DENSE_CANDIDATE_FRACTION = 0.05  # above this many essential postings per document, top_n accumulates densely
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a persisted inverted index.
+
+    The index is a directory of ``.npy`` arrays (CSR-style postings: per-term
+    offsets into parallel doc-id and term-frequency arrays, plus document
+    lengths, IDF and each term's maximum score contribution) next to a JSON
+    term dictionary. Arrays are opened with ``mmap_mode="r"``, so loading does
+    no tokenization or counting and the OS pages postings in on demand.
+
+    ``top_n`` only reads the postings of the query terms and prunes with
+    MaxScore, so its cost follows those postings rather than corpus size.
+    Scores are computed exactly as ``rank_bm25.BM25Okapi`` computes them
+    (including its epsilon floor for negative IDF); ties go to the lower id.
+    """
+
+    def __init__(self, terms: Dict[str, int], offsets: np.ndarray, doc_ids: np.ndarray, tfs: np.ndarray,
+                 doc_lens: np.ndarray, idf: np.ndarray, k1: float = K1, b: float = B,
+                 max_impact: Optional[np.ndarray] = None, tokenizer: Optional[Dict] = None):
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lens = doc_lens
+        self.idf = idf
+        self.k1 = k1
+        self.b = b
+        self.tokenizer = tokenizer  # settings of the tokenizer the documents went through, if recorded
+        self.n_docs = len(doc_lens)
+        self.avgdl = float(np.sum(doc_lens, dtype=np.float64)) / self.n_docs if self.n_docs else 0.0
+        # Per-document part of the BM25 denominator, shared by every query term
+        self._norm = k1 * (1 - b + b * np.asarray(doc_lens, dtype=np.float64) / (self.avgdl or 1.0))
+        self.max_impact = max_impact if max_impact is not None else self._compute_max_impact()
+
+    # --- Building ---
+    @classmethod
+    def build(cls, tokenized_docs: Iterable[Sequence[str]], k1: float = K1, b: float = B, epsilon: float = EPSILON,
+              tokenizer: Optional[Dict] = None) -> "BM25Index":
+        vocabulary: Dict[str, int] = {}
+        docs = (np.array([vocabulary.setdefault(t, len(vocabulary)) for t in tokens], dtype=np.int64) for tokens in tokenized_docs)
+        # from_token_ids consumes the generator before reading the vocabulary, so it is complete by then
+        return cls.from_token_ids(docs, vocabulary, k1, b, epsilon, tokenizer=tokenizer)
+
+    @classmethod
+    def from_token_ids(cls, docs: Iterable[np.ndarray], vocabulary: Dict[str, int], k1: float = K1, b: float = B,
+                       epsilon: float = EPSILON, tokenizer: Optional[Dict] = None) -> "BM25Index":
+        """Build from per-document arrays of term ids (``vocabulary`` maps term -> id), counting in blocks."""
+        doc_parts, term_parts, tf_parts, len_parts = [], [], [], []
+        block: List[np.ndarray] = []
+        n_docs = 0
+
+        def flush():
+            nonlocal n_docs
+            lens = np.fromiter((len(d) for d in block), dtype=np.int64, count=len(block))
+            owners = np.repeat(np.arange(n_docs, n_docs + len(block), dtype=np.int64), lens)
+            keys = owners * (1 << 32) + np.concatenate(block).astype(np.int64)
+            keys, counts = np.unique(keys, return_counts=True)
+            doc_parts.append((keys >> 32).astype(np.int32))
+            term_parts.append((keys & 0xFFFFFFFF).astype(np.int32))
+            tf_parts.append(counts.astype(np.float32))
+            len_parts.append(lens.astype(np.float32))
+            n_docs += len(block)
+            block.clear()
+
+        for doc in docs:
+            block.append(np.asarray(doc, dtype=np.int64))
+            if len(block) >= BUILD_BLOCK_DOCS:
+                flush()
+        if block:
+            flush()
+
+        n_terms = len(vocabulary)
+        term_ids = np.concatenate(term_parts) if term_parts else np.zeros(0, dtype=np.int32)
+        order = np.argsort(term_ids, kind="stable")  # stable: postings stay in doc-id order
+        doc_ids = np.concatenate(doc_parts)[order] if doc_parts else np.zeros(0, dtype=np.int32)
+        tfs = np.concatenate(tf_parts)[order] if tf_parts else np.zeros(0, dtype=np.float32)
+        doc_lens = np.concatenate(len_parts) if len_parts else np.zeros(0, dtype=np.float32)
+        df = np.bincount(term_ids, minlength=n_terms)
+        offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(df)
+
+        # Same IDF as rank_bm25 (over terms that occur): negative values become epsilon * mean IDF.
+        # The mean is a sequential sum in first-seen term order, as there, so floors match bit for bit.
+        idf = np.array([math.log(n_docs - n + 0.5) - math.log(n + 0.5) for n in df.tolist()], dtype=np.float64)
+        present = df > 0
+        if present.any():
+            idf[present & (idf < 0)] = epsilon * (sum(idf[present].tolist()) / int(present.sum()))
+        return cls(dict(vocabulary), offsets, doc_ids, tfs, doc_lens, idf, k1, b, tokenizer=tokenizer)
+
+    def _compute_max_impact(self) -> np.ndarray:
+        df = np.diff(self.offsets)
+        max_impact = np.zeros(len(df), dtype=np.float64)
+        present = df > 0
+        if present.any():
+            term_of_posting = np.repeat(np.arange(len(df)), df)
+            tf = self.tfs.astype(np.float64)
+            impact = self.idf[term_of_posting] * (tf * (self.k1 + 1) / (tf + self._norm[self.doc_ids]))
+            max_impact[present] = np.maximum.reduceat(impact, self.offsets[:-1][present])
+        return max_impact
+
+    # --- Persistence ---
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        for name in ("offsets", "doc_ids", "tfs", "doc_lens", "idf", "max_impact"):
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        terms = sorted(self.terms, key=self.terms.get)
+        with open(os.path.join(path, "terms.json"), "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False)
+        with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": FORMAT_VERSION, "k1": self.k1, "b": self.b, "n_docs": self.n_docs,
+                       "n_terms": len(terms), "n_postings": int(self.offsets[-1]), "tokenizer": self.tokenizer}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BM25Index":
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported BM25 index version {meta.get('version')} in {path}")
+        with open(os.path.join(path, "terms.json"), encoding="utf-8") as f:
+            terms = {t: i for i, t in enumerate(json.load(f))}
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                  for name in ("offsets", "doc_ids", "tfs", "doc_lens", "idf")}
+        # Indexes written before max_impact was stored get it computed once here
+        max_impact_path = os.path.join(path, "max_impact.npy")
+        if os.path.exists(max_impact_path):
+            arrays["max_impact"] = np.load(max_impact_path, mmap_mode="r" if mmap else None)
+        return cls(terms, k1=meta["k1"], b=meta["b"], tokenizer=meta.get("tokenizer"), **arrays)
+
+    # --- Scoring ---
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        start, end = self.offsets[term_id], self.offsets[term_id + 1]
+        return self.doc_ids[start:end], self.tfs[start:end]
+
+    def _contribution(self, term_id: int, tf: np.ndarray, docs: np.ndarray) -> np.ndarray:
+        # Same expression and evaluation order as rank_bm25, so sums are bit-for-bit identical
+        tf = tf.astype(np.float64)
+        return self.idf[term_id] * (tf * (self.k1 + 1) / (tf + self._norm[docs]))
+
+    def get_scores(self, query_tokens: Sequence[str]) -> np.ndarray:
+        """BM25 score of every document; repeated query tokens count once per occurrence."""
+        scores = np.zeros(self.n_docs, dtype=np.float64)
+        for token in query_tokens:
+            term_id = self.terms.get(token)
+            if term_id is None:
+                continue
+            ids, tf = self._postings(term_id)
+            scores[ids] += self._contribution(term_id, tf, ids)
+        return scores
+
+    def _score_docs(self, docs: np.ndarray, query_term_ids: List[int]) -> np.ndarray:
+        """Exact scores of ``docs`` (sorted, unique), found in each term's postings by binary search."""
+        scores = np.zeros(len(docs), dtype=np.float64)
+        for term_id in query_term_ids:
+            ids, tf = self._postings(term_id)
+            if not len(ids):
+                continue
+            pos = np.minimum(np.searchsorted(ids, docs), len(ids) - 1)
+            hit = ids[pos] == docs
+            scores[hit] += self._contribution(term_id, tf[pos[hit]], docs[hit])
+        return scores
+
+    def top_n(self, query_tokens: Sequence[str], n: int = 5) -> List[Tuple[int, float]]:
+        """
+        ``(doc_id, score)`` for the ``n`` best documents, touching only query-term postings.
+
+        MaxScore: exact scores for the best postings of the rarest query terms give
+        a threshold; terms whose combined upper bounds cannot reach it are
+        "non-essential", so only documents in the remaining terms' postings are
+        scored. If fewer than ``n`` documents match, zero-score documents fill up
+        the result (lowest ids first), as with full-corpus scoring.
+        """
+        n = min(n, self.n_docs)
+        term_ids = [self.terms[t] for t in query_tokens if t in self.terms]
+        if n <= 0:
+            return []
+        if term_ids and (self.idf[term_ids] < 0).any():
+            # MaxScore needs non-negative contributions; tiny corpora can produce negative IDF floors
+            scores = self.get_scores(query_tokens)
+            return [(int(i), float(scores[i])) for i in np.argsort(-scores, kind="stable")[:n]]
+
+        counts = Counter(term_ids)
+        df = {t: int(self.offsets[t + 1] - self.offsets[t]) for t in counts}
+        threshold = 0.0
+        seed_docs = np.zeros(0, dtype=np.int64)
+        for term_id in sorted(counts, key=df.get):
+            ids, tf = self._postings(term_id)
+            if len(ids) > THRESHOLD_SEED_DOCS:
+                # Any n exact scores give a valid threshold; the term's best postings give a tight one
+                impact = self._contribution(term_id, tf, ids)
+                ids = ids[np.argpartition(impact, len(ids) - THRESHOLD_SEED_DOCS)[-THRESHOLD_SEED_DOCS:]]
+            seed_docs = np.union1d(seed_docs, ids)
+            if len(seed_docs) >= n:
+                break
+        if len(seed_docs) >= n:
+            seed_scores = self._score_docs(seed_docs, term_ids)
+            threshold = float(np.partition(seed_scores, len(seed_scores) - n)[len(seed_scores) - n])
+
+        # Documents found only in non-essential terms score at most the sum of their bounds < threshold
+        essential, bound_sum = [], 0.0
+        for term_id in sorted(counts, key=lambda t: counts[t] * self.max_impact[t]):
+            bound_sum += counts[term_id] * float(self.max_impact[term_id]) * (1 + UPPER_BOUND_SLACK)
+            if bound_sum >= threshold:
+                essential.append(term_id)
+        if sum(df[t] for t in essential) > self.n_docs * DENSE_CANDIDATE_FRACTION:
+            # Binary-searching that many candidates costs more than accumulating every query-term posting
+            scores = self.get_scores(query_tokens)
+            docs = np.flatnonzero(scores >= threshold)
+            scores = scores[docs]
+        elif essential:
+            docs = np.unique(np.concatenate([self._postings(t)[0] for t in essential]))
+            scores = self._score_docs(docs, term_ids)
+        else:
+            docs, scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64)
+
+        # Zero scores tie with unmatched documents (a term with df = N/2 has IDF exactly 0), so they go to the filler
+        positive = scores > 0
+        docs, scores = docs[positive], scores[positive]
+        if len(docs) > n:
+            kth = np.partition(scores, len(scores) - n)[len(scores) - n]
+            keep = scores >= kth
+            docs, scores = docs[keep], scores[keep]
+        order = np.lexsort((docs, -scores))[:n]
+        result = [(int(docs[i]), float(scores[i])) for i in order]
+        if len(result) < n:
+            matched = set(docs.tolist())
+            filler = (d for d in range(self.n_docs) if d not in matched)
+            result.extend((next(filler), 0.0) for _ in range(n - len(result)))
+        return result
+
+    def top_n_ids(self, query_tokens: Sequence[str], n: int = 5) -> List[int]:
+        return [doc_id for doc_id, _ in self.top_n(query_tokens, n)]
+
+    def get_top_n(self, query_tokens: Sequence[str], documents: Sequence, n: int = 5) -> list:
+        """Drop-in for ``BM25Okapi.get_top_n``."""
+        return [documents[i] for i in self.top_n_ids(query_tokens, n)]
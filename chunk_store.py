@@ -0,0 +1,153 @@
+import mmap
+import os
+from collections.abc import Sequence
+from typing import Iterable, Optional
+
+import numpy as np
+
+OFFSETS_FILE = "offsets.npy"
+BLOB_FILE = "chunks.bin"
+ENDS_FILE = "ends.i64"  # raw chunk end offsets while a store is being written
+IDS_FILE = "ids.npy"  # optional int64 chunk id per chunk (the ids the FAISS index returns)
+IDS_PARTIAL_FILE = "ids.i64"
+
+
+class ChunkStore(Sequence):
+    """
+    Read-only list of text chunks backed by two files: the UTF-8 chunk texts
+    concatenated into one blob, and an int64 array of ``len + 1`` byte offsets
+    into it. Both are memory-mapped, so opening the store reads nothing, a
+    lookup decodes only the chunk asked for, and every worker process shares
+    the same page cache instead of holding its own copy of the corpus.
+
+    A store written with chunk ids also maps ids back to positions, for
+    indexes that return ids rather than positions.
+    """
+
+    def __init__(self, offsets: np.ndarray, blob, ids: Optional[np.ndarray] = None):
+        self._offsets = offsets
+        self._blob = blob
+        self.ids = ids
+        self._id_order: Optional[np.ndarray] = None
+
+    @staticmethod
+    def write(chunks: Iterable[str], path: str) -> int:
+        """Write ``chunks`` as a store at ``path`` (a directory); returns the number written."""
+        writer = ChunkStoreWriter(path)
+        for chunk in chunks:
+            writer.append(chunk)
+        writer.close()
+        return writer.count
+
+    @classmethod
+    def open(cls, path: str) -> "ChunkStore":
+        offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        blob = b""
+        if offsets[-1] > 0:  # an empty file cannot be mapped
+            with open(os.path.join(path, BLOB_FILE), "rb") as f:
+                blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        ids_path = os.path.join(path, IDS_FILE)
+        ids = np.load(ids_path, mmap_mode="r") if os.path.exists(ids_path) else None
+        return cls(offsets, blob, ids)
+
+    def positions(self, ids) -> np.ndarray:
+        """Positions of the chunks with ``ids``; -1 where no chunk has the id."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.ids is None or not len(self.ids):
+            return np.full(ids.shape, -1, dtype=np.int64)
+        if self._id_order is None:
+            self._id_order = np.argsort(self.ids, kind="stable")
+        sorted_ids = self.ids[self._id_order]
+        found = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+        return np.where(sorted_ids[found] == ids, self._id_order[found], -1)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        return self._blob[int(self._offsets[index]):int(self._offsets[index + 1])].decode("utf-8")
+
+
+class ChunkStoreWriter:
+    """
+    Appends chunks to a store directory. Until ``close()`` writes the offsets
+    array, chunk end offsets go to a raw side file, so a store can be written
+    over several runs: ``count`` reopens it (closed or not) with the first
+    ``count`` chunks kept and anything written after them, e.g. before a
+    crash, truncated. With ``with_ids``, every chunk is appended with its id.
+    A new store (``count`` 0) first removes the files of any earlier store at
+    ``path``, so a rebuild never inherits its offsets or id map.
+    """
+
+    def __init__(self, path: str, count: int = 0, with_ids: bool = False):
+        os.makedirs(path, exist_ok=True)
+        stale = [OFFSETS_FILE, ENDS_FILE, IDS_FILE, IDS_PARTIAL_FILE] if not count else []
+        if not with_ids:
+            stale += [IDS_FILE, IDS_PARTIAL_FILE]
+        for name in dict.fromkeys(stale):
+            try:
+                os.remove(os.path.join(path, name))
+            except FileNotFoundError:
+                pass
+        ends_path = os.path.join(path, ENDS_FILE)
+        offsets_path = os.path.join(path, OFFSETS_FILE)
+        if count and not os.path.exists(ends_path) and os.path.exists(offsets_path):
+            # Reopening a closed store: turn its offsets back into the side file
+            np.load(offsets_path)[1:].tofile(ends_path)
+        ends = np.fromfile(ends_path, dtype=np.int64, count=count) if count else np.zeros(0, dtype=np.int64)
+        if len(ends) != count:
+            raise ValueError(f"Chunk store at {path} holds {len(ends)} chunks, cannot resume at {count}")
+        self.path = path
+        self.count = count
+        self.size = int(ends[-1]) if count else 0
+        self._blob = open(os.path.join(path, BLOB_FILE), "ab")
+        self._blob.truncate(self.size)
+        self._ends = open(ends_path, "ab")
+        self._ends.truncate(count * 8)
+        self._ids = None
+        if with_ids:
+            ids_path = os.path.join(path, IDS_PARTIAL_FILE)
+            if count and not os.path.exists(ids_path):
+                np.load(os.path.join(path, IDS_FILE)).tofile(ids_path)
+            self._ids = open(ids_path, "ab")
+            self._ids.truncate(count * 8)
+
+    def append(self, chunk: str, chunk_id: Optional[int] = None):
+        data = chunk.encode("utf-8")
+        self._blob.write(data)
+        self.size += len(data)
+        self.count += 1
+        self._ends.write(np.int64(self.size).tobytes())
+        if self._ids is not None:
+            self._ids.write(np.int64(chunk_id).tobytes())
+
+    def ids(self) -> np.ndarray:
+        """Ids of the chunks appended so far (flushes them first)."""
+        self._ids.flush()
+        return np.fromfile(os.path.join(self.path, IDS_PARTIAL_FILE), dtype=np.int64, count=self.count)
+
+    def flush(self):
+        """Make everything appended so far durable."""
+        for f in (self._blob, self._ends, self._ids):
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def close(self):
+        self._blob.close()
+        self._ends.close()
+        ends_path = os.path.join(self.path, ENDS_FILE)
+        ends = np.fromfile(ends_path, dtype=np.int64)
+        np.save(os.path.join(self.path, OFFSETS_FILE), np.concatenate([np.zeros(1, dtype=np.int64), ends]))
+        os.remove(ends_path)
+        if self._ids is not None:
+            self._ids.close()
+            ids_path = os.path.join(self.path, IDS_PARTIAL_FILE)
+            np.save(os.path.join(self.path, IDS_FILE), np.fromfile(ids_path, dtype=np.int64))
+            os.remove(ids_path)
@@ -1,21 +1,57 @@
+import asyncio
 import logging
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer, CrossEncoder
-from langchain_groq import ChatGroq
+from llm_provider import get_llm
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_community.tools import DuckDuckGoSearchResults
-from langchain_community.tools.arxiv.tool import ArxivQueryRun
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, START, END
-from typing import TypedDict, List, Dict
-import faiss
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, NamedTuple, TypedDict, List, Dict, Optional
 import numpy as np
-from rank_bm25 import BM25Okapi
-from nltk.tokenize import word_tokenize
+from resources import registry, run_cpu_bound
+from batching import MicroBatcher
+from embedding_cache import get_embedding_cache
+from inference_backend import EMBEDDING_MODEL, RERANKER_MODEL, embedding_model_key
+from response_cache import CLINICAL_RESPONSE_CACHE, ResponseCache
+from stage_timings import StageTimings
+from tokenizer import tokenize, config as tokenizer_config
 
 load_dotenv()
 
+FAISS_INDEX_PATH = "data/nephro_faiss.index"
+NEPHRO_TXT_PATH = "data/nephro.txt"
+CHUNK_STORE_PATH = "data/nephro_chunks"
+BM25_INDEX_PATH = "data/nephro_bm25"
+MANIFEST_PATH = "data/nephro_manifest.json"
+
+# Concurrent queries share model calls: requests arriving within the wait window run as one batch
+# Off by default: batching adds latency per query for a modest throughput gain under load
+QUERY_BATCHING = os.getenv("QUERY_BATCHING", "0") != "0"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))  # queries
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "2"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "64"))  # (query, chunk) pairs
+RERANK_BATCH_WAIT_MS = float(os.getenv("RERANK_BATCH_WAIT_MS", "2"))
+
+# Retrieval stages run concurrently; a stage that overruns its budget is dropped and the others are used
+DENSE_TIMEOUT_MS = float(os.getenv("DENSE_TIMEOUT_MS", "1000"))  # query embedding + FAISS search
+LEXICAL_TIMEOUT_MS = float(os.getenv("LEXICAL_TIMEOUT_MS", "1000"))  # BM25
+RERANK_TIMEOUT_MS = float(os.getenv("RERANK_TIMEOUT_MS", "3000"))  # cross-encoder; on timeout candidates keep retrieval order
+WEB_SEARCH_TIMEOUT_MS = float(os.getenv("WEB_SEARCH_TIMEOUT_MS", "8000"))
+# Start the web search alongside retrieval instead of after it; costs a search per question, saves its latency on misses
+SPECULATIVE_WEB_SEARCH = os.getenv("SPECULATIVE_WEB_SEARCH", "0") != "0"
+
+# Dense and lexical rankings are merged by reciprocal-rank fusion before the (costly) cross-encoder
+FUSION_DEPTH = int(os.getenv("FUSION_DEPTH", "10"))  # candidates taken from each retriever
+RRF_K = int(os.getenv("RRF_K", "60"))
+RERANK_TOP_M = int(os.getenv("RERANK_TOP_M", "8"))  # best fused candidates sent to the cross-encoder
+# Skip the cross-encoder when both retrievers put the same chunks in their top ANSWER_CHUNKS
+FUSION_EARLY_EXIT = os.getenv("FUSION_EARLY_EXIT", "1") != "0"
+ANSWER_CHUNKS = 3
+
 # Enhanced State Schema
 class ClinicalState(TypedDict):
     query: str
@@ -27,18 +63,64 @@ class ClinicalState(TypedDict):
     search_method: str
     chat_history: List[Dict]
 
-# Model Initialization
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-reranker = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
-web_tool = DuckDuckGoSearchResults(output_format="list")
-arxiv_tool = ArxivQueryRun()
-llm = ChatGroq(api_key=os.getenv("GROQ_API_KEY"), model="llama3-8b-8192")
+llm = get_llm()
+
+# Lazily-loaded shared resources (heavy imports happen inside the loaders)
+# INFERENCE_BACKEND selects PyTorch or (int8) ONNX Runtime for both models
+def _load_embedder():
+    from inference_backend import load_embedder
+    return load_embedder(EMBEDDING_MODEL)
+
+def _load_reranker():
+    from inference_backend import load_reranker
+    return load_reranker(RERANKER_MODEL)
+
+def _load_faiss_index():
+    from vector_index import configure_search, describe, read_faiss_index
+    # nprobe / efSearch (FAISS_NPROBE, FAISS_EF_SEARCH) trade recall for latency on IVF and HNSW indexes
+    index = configure_search(read_faiss_index(FAISS_INDEX_PATH))
+    logging.info(f"Loaded FAISS index {describe(index)}")
+    return index
+
+def _load_chunks():
+    from chunk_store import ChunkStore
+    if os.path.exists(CHUNK_STORE_PATH):
+        return ChunkStore.open(CHUNK_STORE_PATH)
+    logging.warning(f"No chunk store at {CHUNK_STORE_PATH}; reading {NEPHRO_TXT_PATH} into memory (run ingestion.py to write one)")
+    with open(NEPHRO_TXT_PATH, encoding="utf-8") as f:
+        return [chunk.strip() for chunk in f.read().split("\n\n") if chunk.strip()]
+
+def _load_bm25():
+    from bm25_index import BM25Index
+    chunks = registry.get("chunks")
+    if os.path.exists(BM25_INDEX_PATH):
+        index = BM25Index.load(BM25_INDEX_PATH)
+        if index.n_docs != len(chunks):
+            logging.warning(f"BM25 index at {BM25_INDEX_PATH} covers {index.n_docs} chunks, corpus has {len(chunks)}; rebuilding in memory")
+        elif index.tokenizer != tokenizer_config():
+            # Queries must be tokenized the way the index was built, or terms silently stop matching
+            logging.warning(f"BM25 index at {BM25_INDEX_PATH} was built with tokenizer {index.tokenizer}, not {tokenizer_config()}; rebuilding in memory")
+        else:
+            return index
+    else:
+        logging.warning(f"No BM25 index at {BM25_INDEX_PATH}; building in memory (run ingestion.py to persist one)")
+    return BM25Index.build((tokenize(doc) for doc in chunks), tokenizer=tokenizer_config())
+
+def _load_web_tool():
+    from langchain_community.tools import DuckDuckGoSearchResults
+    return DuckDuckGoSearchResults(output_format="list")
+
+def _load_arxiv_tool():
+    from langchain_community.tools.arxiv.tool import ArxivQueryRun
+    return ArxivQueryRun()
 
-# Knowledge Base Setup
-faiss_index = faiss.read_index("data/nephro_faiss.index")
-chunks = [chunk.strip() for chunk in open("data/nephro.txt", encoding="utf-8").read().split("\n\n") if chunk.strip()]
-tokenized_corpus = [word_tokenize(doc.lower()) for doc in chunks]
-bm25 = BM25Okapi(tokenized_corpus)
+registry.register("embedder", _load_embedder)
+registry.register("reranker", _load_reranker)
+registry.register("faiss_index", _load_faiss_index)
+registry.register("chunks", _load_chunks)
+registry.register("bm25", _load_bm25)
+registry.register("web_tool", _load_web_tool)
+registry.register("arxiv_tool", _load_arxiv_tool)
 
 # Prompt Template
 prompt = ChatPromptTemplate.from_template("""
@@ -83,42 +165,227 @@ def expand_query(query: str) -> str:
     expanded = [f"{word} {synonyms[word]}" if word in synonyms else word for word in words]
     return " ".join(expanded)
 
+# Batched model calls
+def _encode_batch(texts: List[str]):
+    cache = get_embedding_cache()
+    if cache is None:
+        return registry.get("embedder").encode(texts)
+    # Repeated queries skip the model; the lookup runs off the event loop (batcher or CPU executor
+    # thread) and new vectors are written to disk in the background
+    return cache.encode(embedding_model_key(EMBEDDING_MODEL), texts, registry.get("embedder").encode, background=True)
+
+def _rerank_batch(pairs: List[tuple]):
+    return registry.get("reranker").predict(pairs)
+
+embed_batcher = MicroBatcher(_encode_batch, EMBED_BATCH_SIZE, EMBED_BATCH_WAIT_MS, name="embed", enabled=QUERY_BATCHING)
+rerank_batcher = MicroBatcher(_rerank_batch, RERANK_BATCH_SIZE, RERANK_BATCH_WAIT_MS, name="rerank", enabled=QUERY_BATCHING)
+
+# Answers reused across patients with the same diagnosis, medications and discharge date (CLINICAL_RESPONSE_CACHE=1)
+response_cache = ResponseCache(kb_paths=[FAISS_INDEX_PATH, MANIFEST_PATH]) if CLINICAL_RESPONSE_CACHE else None
+
 # Hybrid Search + Reranking
-def hybrid_search(query: str) -> (List[str], List[Dict]):
-    vec = embedder.encode([query])
-    D, I = faiss_index.search(np.array(vec).astype("float32"), 5)
-    rag_chunks = [chunks[i] for i in I[0] if i < len(chunks)]
-    bm25_results = bm25.get_top_n(query.lower().split(), chunks, n=5)
-    combined = list(set(rag_chunks + bm25_results))
-    scores = reranker.predict([(query, c) for c in combined])
-    reranked = [c for _, c in sorted(zip(scores, combined), reverse=True)][:3]
+retrieval_timings = StageTimings()
+# Runs the stages of the synchronous path; the async path uses the batchers and the CPU executor instead
+_retrieval_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="retrieval")
+
+def _dense_candidates(vec) -> List[int]:
+    """Chunk positions ranked by vector similarity."""
+    chunks = registry.get("chunks")
+    D, I = registry.get("faiss_index").search(np.array(vec).astype("float32"), FUSION_DEPTH)
+    ids = I[0]
+    if getattr(chunks, "ids", None) is not None:
+        ids = chunks.positions(ids)  # the index stores vectors under chunk ids (incremental ingestion)
+    return [int(i) for i in ids if 0 <= i < len(chunks)]  # IVF/HNSW pad short result lists with -1
+
+def _dense_stage(query: str) -> List[int]:
+    return _dense_candidates(embed_batcher([query]))
+
+def _lexical_candidates(query: str) -> List[int]:
+    """Chunk positions ranked by BM25, without the zero-score filler ``top_n`` pads short results with."""
+    return [i for i, score in registry.get("bm25").top_n(tokenize(query), n=FUSION_DEPTH) if score > 0]
+
+def _fuse(dense: Optional[List[int]], lexical: Optional[List[int]]) -> List[int]:
+    """Reciprocal-rank fusion of the two rankings; ties go to the lower position, so the order is deterministic."""
+    scores: Dict[int, float] = {}
+    for ranking in (dense or [], lexical or []):
+        for rank, position in enumerate(ranking[:FUSION_DEPTH]):
+            scores[position] = scores.get(position, 0.0) + 1.0 / (RRF_K + rank + 1)
+    return sorted(scores, key=lambda p: (-scores[p], p))
+
+def _fusion_is_confident(fused: List[int], dense: Optional[List[int]], lexical: Optional[List[int]]) -> bool:
+    if not (FUSION_EARLY_EXIT and dense and lexical and len(fused) >= ANSWER_CHUNKS):
+        return False
+    top = set(fused[:ANSWER_CHUNKS])
+    return top == set(dense[:ANSWER_CHUNKS]) == set(lexical[:ANSWER_CHUNKS])
+
+def _rerank_plan(dense: Optional[List[int]], lexical: Optional[List[int]]) -> (List[str], bool):
+    """Texts of the fused candidates worth reranking, and whether the cross-encoder can be skipped."""
+    fused = _fuse(dense, lexical)
+    confident = _fusion_is_confident(fused, dense, lexical)
+    chunks = registry.get("chunks")
+    with _fusion_lock:
+        _fusion_counters["queries"] += 1
+        _fusion_counters["early_exits"] += int(confident)
+    return [chunks[p] for p in fused[:ANSWER_CHUNKS if confident else RERANK_TOP_M]], confident
+
+def _top_reranked(candidates: List[str], scores) -> (List[str], List[Dict]):
+    if scores is None:
+        reranked = candidates[:ANSWER_CHUNKS]
+    else:
+        # Stable sort: equal scores keep their fused order
+        order = sorted(range(len(candidates)), key=lambda i: -float(scores[i]))
+        reranked = [candidates[i] for i in order[:ANSWER_CHUNKS]]
     sources = [{"type": "knowledge_base", "content_preview": c[:100]} for c in reranked]
     return reranked, sources
 
+_fusion_counters = {"queries": 0, "early_exits": 0}
+_fusion_lock = threading.Lock()
+
+def fusion_stats() -> Dict[str, int]:
+    with _fusion_lock:
+        return dict(_fusion_counters)
+
+class _Timed(NamedTuple):
+    value: Any
+    seconds: float
+
+def _timed(fn, *args) -> _Timed:
+    """Runs a stage and records its own duration, so a stage collected after another is not charged for the wait."""
+    start = time.perf_counter()
+    return _Timed(fn(*args), time.perf_counter() - start)
+
+def _timed_out(stage: str, timeout_ms: float, seconds: float):
+    retrieval_timings.record(stage, seconds, timed_out=True)
+    logging.warning(f"{stage} retrieval exceeded {timeout_ms:.0f} ms; continuing without it")
+    return None
+
+def _wait(stage: str, future, timeout_ms: float, started: float):
+    """
+    Result of a stage submitted at ``started``, or None if it failed or overran its budget.
+    An overrunning stage is left to finish and its result dropped: cancelling a batcher
+    request would pull it out of a batch other queries share.
+    """
+    budget = timeout_ms / 1000
+    try:
+        result = future.result(timeout=max(0.0, budget - (time.perf_counter() - started)))
+    except FutureTimeoutError:
+        return _timed_out(stage, timeout_ms, time.perf_counter() - started)
+    except Exception as e:
+        logging.error(f"{stage} retrieval failed: {e}")
+        return None
+    seconds = time.perf_counter() - started
+    if isinstance(result, _Timed):
+        result, seconds = result
+    if seconds > budget:
+        return _timed_out(stage, timeout_ms, seconds)
+    retrieval_timings.record(stage, seconds)
+    return result
+
+def _uncancelled(awaitable):
+    """Shields a batcher call from its caller's timeout; it finishes in the background and the result is dropped."""
+    task = asyncio.ensure_future(awaitable)
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())  # mark a late failure as retrieved
+    return asyncio.shield(task)
+
+async def _await(stage: str, awaitable, timeout_ms: float):
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(awaitable, timeout_ms / 1000)
+    except asyncio.TimeoutError:
+        return _timed_out(stage, timeout_ms, time.perf_counter() - started)
+    except Exception as e:
+        logging.error(f"{stage} retrieval failed: {e}")
+        return None
+    retrieval_timings.record(stage, time.perf_counter() - started)
+    return result
+
+def hybrid_search(query: str) -> (List[str], List[Dict]):
+    started = time.perf_counter()
+    dense = _retrieval_executor.submit(_timed, _dense_stage, query)
+    lexical = _retrieval_executor.submit(_timed, _lexical_candidates, query)
+    candidates, confident = _rerank_plan(_wait("dense", dense, DENSE_TIMEOUT_MS, started),
+                                         _wait("lexical", lexical, LEXICAL_TIMEOUT_MS, started))
+    if confident:
+        return _top_reranked(candidates, None)
+    rerank_started = time.perf_counter()
+    scores = _wait("rerank", rerank_batcher.submit([(query, c) for c in candidates]), RERANK_TIMEOUT_MS, rerank_started)
+    return _top_reranked(candidates, scores)
+
+async def _adense_stage(query: str) -> List[int]:
+    vec = await _uncancelled(embed_batcher.acall([query]))
+    return await run_cpu_bound(_dense_candidates, vec)
+
+async def ahybrid_search(query: str) -> (List[str], List[Dict]):
+    # Model calls wait on the batchers without holding a thread; index search runs on the CPU executor
+    dense, lexical = await asyncio.gather(
+        _await("dense", _adense_stage(query), DENSE_TIMEOUT_MS),
+        _await("lexical", run_cpu_bound(_lexical_candidates, query), LEXICAL_TIMEOUT_MS),
+    )
+    candidates, confident = _rerank_plan(dense, lexical)
+    if confident:
+        return _top_reranked(candidates, None)
+    scores = await _await("rerank", _uncancelled(rerank_batcher.acall([(query, c) for c in candidates])), RERANK_TIMEOUT_MS)
+    return _top_reranked(candidates, scores)
+
 # Context Lookup
+def _has_kb_context(chunks: List[str]) -> bool:
+    return bool(chunks) and len(" ".join(chunks)) > 100
+
+def _apply_web_results(state: ClinicalState, web_results: Optional[List[Dict]]):
+    if not web_results:
+        state.update(context="No relevant information found.", context_sources=[], search_method="None")
+        return
+    web_context = [f"{r['title']}: {r['snippet']} (Source: {r['link']})" for r in web_results[:3]]
+    state.update(context="\n\n".join(web_context), context_sources=web_results, search_method="Web Search")
+
+def _web_search(query: str) -> List[Dict]:
+    return registry.get("web_tool").invoke(query)
+
+async def _aweb_search(query: str) -> List[Dict]:
+    web_tool = await asyncio.to_thread(registry.get, "web_tool")
+    return await web_tool.ainvoke(query)
+
 def run_context_lookup(state: ClinicalState) -> ClinicalState:
+    started = time.perf_counter()
     query = state["query"]
     state["expanded_query"] = expand_query(query)
+    web = _retrieval_executor.submit(_web_search, state["expanded_query"]) if SPECULATIVE_WEB_SEARCH else None
     chunks, sources = hybrid_search(state["expanded_query"])
-    if chunks and len(" ".join(chunks)) > 100:
+    if _has_kb_context(chunks):
+        if web is not None:
+            web.cancel()
+        state.update(context="\n\n".join(chunks), context_sources=sources, search_method="Hybrid RAG")
+    else:
+        web_started = started if web is not None else time.perf_counter()
+        web = web or _retrieval_executor.submit(_web_search, state["expanded_query"])
+        _apply_web_results(state, _wait("web", web, WEB_SEARCH_TIMEOUT_MS, web_started))
+    retrieval_timings.record("context_lookup", time.perf_counter() - started)
+    return state
+
+async def arun_context_lookup(state: ClinicalState) -> ClinicalState:
+    started = time.perf_counter()
+    query = state["query"]
+    state["expanded_query"] = expand_query(query)
+    web = None
+    if SPECULATIVE_WEB_SEARCH:
+        web = asyncio.create_task(_await("web", _aweb_search(state["expanded_query"]), WEB_SEARCH_TIMEOUT_MS))
+    chunks, sources = await ahybrid_search(state["expanded_query"])
+    if _has_kb_context(chunks):
+        if web is not None:
+            web.cancel()
         state.update(context="\n\n".join(chunks), context_sources=sources, search_method="Hybrid RAG")
     else:
-        try:
-            web_results = web_tool.invoke(state["expanded_query"])
-            web_context = [f"{r['title']}: {r['snippet']} (Source: {r['link']})" for r in web_results[:3]]
-            state.update(context="\n\n".join(web_context), context_sources=web_results, search_method="Web Search")
-        except Exception as e:
-            logging.error(f"Web search failed: {e}")
-            state.update(context="No relevant information found.", context_sources=[], search_method="None")
+        web_results = await web if web is not None else await _await("web", _aweb_search(state["expanded_query"]), WEB_SEARCH_TIMEOUT_MS)
+        _apply_web_results(state, web_results)
+    retrieval_timings.record("context_lookup", time.perf_counter() - started)
     return state
 
 # Answer Generation
-def run_answer(state: ClinicalState) -> ClinicalState:
+def _answer_inputs(state: ClinicalState) -> dict:
     rpt = state["patient_report"]
     # Format chat history for prompt (most recent to oldest)
     chat_history_str = "\n".join([f"User: {h['query']}\nAssistant: {h['response']}" for h in state["chat_history"][::-1][-5:]])
-    chain = prompt | llm | StrOutputParser()
-    final_answer = chain.invoke({
+    return {
         "patient_name": rpt.get("patient_name", "Patient"),
         "diagnosis": rpt.get("primary_diagnosis", ""),
         "medications": ", ".join(rpt.get("medications", [])),
@@ -127,33 +394,68 @@ def run_answer(state: ClinicalState) -> ClinicalState:
         "query": state["query"],
         "search_method": state["search_method"],
         "chat_history": chat_history_str
-    }).strip()
-    citations = "\nSources: " + ", ".join([s.get("type", "Unknown") for s in state["context_sources"]])
-    state["response"] = final_answer + citations
+    }
+
+def _citations(state: ClinicalState) -> str:
+    return "\nSources: " + ", ".join([s.get("type", "Unknown") for s in state["context_sources"]])
+
+def run_answer(state: ClinicalState) -> ClinicalState:
+    chain = prompt | llm | StrOutputParser()
+    final_answer = chain.invoke(_answer_inputs(state)).strip()
+    state["response"] = final_answer + _citations(state)
+    return state
+
+async def arun_answer(state: ClinicalState) -> ClinicalState:
+    chain = prompt | llm | StrOutputParser()
+    final_answer = (await chain.ainvoke(_answer_inputs(state))).strip()
+    state["response"] = final_answer + _citations(state)
     return state
 
 # Multi-step Reasoning
 def build_graph():
+    # Each node has a sync and an async implementation: graph.invoke() runs the former,
+    # graph.ainvoke() the latter, so the same compiled graph serves both call styles.
     g = StateGraph(ClinicalState)
-    g.add_node("ContextLookup", run_context_lookup)
-    g.add_node("Answer", run_answer)
+    g.add_node("ContextLookup", RunnableLambda(run_context_lookup, afunc=arun_context_lookup))
+    g.add_node("Answer", RunnableLambda(run_answer, afunc=arun_answer))
     g.add_edge(START, "ContextLookup")
     g.add_edge("ContextLookup", "Answer")
     g.add_edge("Answer", END)
     return g.compile()
 
+# The compiled graph is stateless, so one instance is shared by every agent in the process
+registry.register("clinical_graph", build_graph)
+
+# Resources worth loading ahead of the first clinical question
+WARMUP_RESOURCES = ["clinical_graph", "chunks", "faiss_index", "embedder", "reranker", "bm25"]
+
 # Clinical Agent Class
 class ClinicalAgent:
+    """Per-session clinical conversation state; the graph and models are process-wide."""
+
     def __init__(self):
-        self.graph = build_graph()
         self.conversation_history = []
         self.patient_report = {}
 
+    @property
+    def graph(self):
+        return registry.get("clinical_graph")
+
     def set_patient_report(self, report: dict):
         self.patient_report = report
 
-    def interact(self, query: str) -> str:
-        state = ClinicalState(
+    def to_state(self) -> dict:
+        return {"conversation_history": self.conversation_history, "patient_report": self.patient_report}
+
+    @classmethod
+    def from_state(cls, data: dict) -> "ClinicalAgent":
+        agent = cls()
+        agent.conversation_history = list(data.get("conversation_history", []))
+        agent.patient_report = data.get("patient_report") or {}
+        return agent
+
+    def _initial_state(self, query: str) -> ClinicalState:
+        return ClinicalState(
             query=query,
             expanded_query="",
             context="",
@@ -163,8 +465,75 @@ class ClinicalAgent:
             search_method="",
             chat_history=self.conversation_history
         )
-        final_state = self.graph.invoke(state)
-        self.conversation_history.append({"query": query, "response": final_state["response"]})
+
+    def _record_turn(self, query: str, response: str):
+        self.conversation_history.append({"query": query, "response": response})
         if len(self.conversation_history) > 5:
             self.conversation_history = self.conversation_history[-5:]
-        return final_state["response"]
\ No newline at end of file
+
+    def _uses_response_cache(self) -> bool:
+        # Follow-up turns are answered in light of the chat history, so only a session's first question is shared
+        return response_cache is not None and not self.conversation_history
+
+    def _store_response(self, query_vector, final_state: ClinicalState, started: float):
+        if query_vector is not None and final_state["search_method"] != "None":
+            response_cache.put(self.patient_report, query_vector, final_state["response"], time.perf_counter() - started)
+
+    def interact(self, query: str) -> str:
+        query_vector = None
+        if self._uses_response_cache():
+            query_vector = embed_batcher([query])
+            cached = response_cache.get(self.patient_report, query_vector)
+            if cached is not None:
+                self._record_turn(query, cached)
+                return cached
+        started = time.perf_counter()
+        final_state = self.graph.invoke(self._initial_state(query))
+        self._store_response(query_vector, final_state, started)
+        self._record_turn(query, final_state["response"])
+        return final_state["response"]
+
+    async def _acached_response(self, query: str):
+        """``(query_vector, cached response or None)``; the vector is None when the cache does not apply."""
+        if not self._uses_response_cache():
+            return None, None
+        query_vector = await embed_batcher.acall([query])
+        return query_vector, response_cache.get(self.patient_report, query_vector)
+
+    async def ainteract(self, query: str) -> str:
+        """Async ``interact``: LLM calls are awaited and model work runs on the CPU executor."""
+        query_vector, cached = await self._acached_response(query)
+        if cached is not None:
+            self._record_turn(query, cached)
+            return cached
+        started = time.perf_counter()
+        final_state = await self.graph.ainvoke(self._initial_state(query))
+        self._store_response(query_vector, final_state, started)
+        self._record_turn(query, final_state["response"])
+        return final_state["response"]
+
+    async def astream(self, query: str):
+        """
+        Async generator over one turn: ``("token", text)`` for each answer token as
+        the LLM produces it (retrieval has finished by then), followed by
+        ``("done", response)`` with the full response including source citations.
+        A cached response arrives as a single token.
+        """
+        query_vector, cached = await self._acached_response(query)
+        if cached is not None:
+            self._record_turn(query, cached)
+            yield "token", cached
+            yield "done", cached
+            return
+        started = time.perf_counter()
+        final_state = None
+        async for mode, payload in self.graph.astream(self._initial_state(query), stream_mode=["messages", "values"]):
+            if mode == "messages":
+                chunk, metadata = payload
+                if metadata.get("langgraph_node") == "Answer" and chunk.content:
+                    yield "token", chunk.content
+            else:
+                final_state = payload
+        self._store_response(query_vector, final_state, started)
+        self._record_turn(query, final_state["response"])
+        yield "done", final_state["response"]
@@ -1,18 +1,15 @@
-import json
 import logging
 from typing import Tuple, Dict, Any
+from patient_store import PATIENT_FUZZY_MATCHING, get_patient_store
+
+# Fuzzy fallback for typos such as "Jon Smth"
+FUZZY_MATCHING_ENABLED = PATIENT_FUZZY_MATCHING
+FUZZY_ACCEPT_SCORE = 0.75  # minimum blended similarity to consider a candidate
+FUZZY_MIN_MARGIN = 0.08  # best candidate must beat the runner-up by this much
 
 def load_patient_data():
-    """Load patient data from JSON file."""
-    try:
-        with open('data/patients.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        logging.error("patients.json not found")
-        return []
-    except json.JSONDecodeError as e:
-        logging.error(f"Error parsing patients.json: {e}")
-        return []
+    """Return all patient records from the shared, cached patient store."""
+    return get_patient_store().all()
 
 def get_patient_report(patient_name: str) -> Tuple[Dict[str, Any], str]:
     """
@@ -21,10 +18,10 @@ def get_patient_report(patient_name: str) -> Tuple[Dict[str, Any], str]:
     Status: 'found', 'not_found', 'multiple_found'
     """
     try:
-        patients = load_patient_data()
+        store = get_patient_store()
         
         # Find exact matches (case insensitive)
-        exact_matches = [p for p in patients if p['patient_name'].lower() == patient_name.lower()]
+        exact_matches = store.find_exact(patient_name)
         
         if len(exact_matches) == 1:
             logging.info(f"Patient found: {patient_name}")
@@ -34,7 +31,7 @@ def get_patient_report(patient_name: str) -> Tuple[Dict[str, Any], str]:
             return {}, 'multiple_found'
         
         # Try partial matches
-        partial_matches = [p for p in patients if patient_name.lower() in p['patient_name'].lower()]
+        partial_matches = store.find_partial(patient_name)
         
         if len(partial_matches) == 1:
             logging.info(f"Patient found (partial match): {patient_name}")
@@ -43,6 +40,17 @@ def get_patient_report(patient_name: str) -> Tuple[Dict[str, Any], str]:
             logging.warning(f"Multiple partial matches for: {patient_name}")
             return {}, 'multiple_found'
         
+        if FUZZY_MATCHING_ENABLED:
+            candidates = store.find_fuzzy(patient_name, limit=2, min_score=FUZZY_ACCEPT_SCORE)
+            if candidates:
+                best_score, best_records = candidates[0]
+                runner_up = candidates[1][0] if len(candidates) > 1 else 0.0
+                if len(best_records) == 1 and best_score - runner_up >= FUZZY_MIN_MARGIN:
+                    logging.info(f"Patient found (fuzzy match {best_score:.2f}): {patient_name} -> {best_records[0]['patient_name']}")
+                    return best_records[0], 'found'
+                logging.warning(f"Ambiguous fuzzy matches for: {patient_name}")
+                return {}, 'multiple_found'
+
         logging.warning(f"Patient not found: {patient_name}")
         return {}, 'not_found'
         
@@ -0,0 +1,228 @@
+import hashlib
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "1") != "0"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join("data", "embedding_cache.db"))
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "4096"))
+EVICT_FRACTION = 0.1  # share of entries dropped, least recently used first, when the file outgrows its budget
+SQL_BATCH = 500  # keys per statement, below SQLite's default bound-variable limit
+WRITE_QUEUE_SIZE = 1024  # pending background writes before new ones are dropped
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC with whitespace runs collapsed; the model tokenizes both forms identically."""
+    return unicodedata.normalize("NFC", " ".join(text.split()))
+
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by SHA-256 of (model name, normalized text), in a SQLite
+    file shared by every process on the host (API workers and ingestion),
+    behind a per-process LRU of the most recently used vectors.
+
+    When the file's used pages exceed ``max_bytes``, the least recently used
+    tenth of the entries is deleted. Recency on disk is refreshed when an
+    entry is read from disk, not on in-memory hits, so it is approximate.
+
+    ``encode(..., background=True)`` (query time) keeps SQLite writes off the
+    caller's path: new vectors go to memory at once and to disk on a writer
+    thread, and writes are dropped rather than queued without bound.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_bytes: int = EMBEDDING_CACHE_MAX_BYTES,
+                 memory_items: int = EMBEDDING_CACHE_MEMORY_ITEMS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self._memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evicted": 0, "dropped_writes": 0}
+        self._writes: "queue.Queue[Callable[[], None]]" = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key BLOB PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(model_name: str, text: str) -> bytes:
+        return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+    @staticmethod
+    def _batches(items: Sequence) -> List[Sequence]:
+        return [items[i:i + SQL_BATCH] for i in range(0, len(items), SQL_BATCH)]
+
+    # --- Writes ---
+    def _write(self, fn: Callable[[], None], background: bool):
+        if not background:
+            fn()
+            return
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="embedding-cache-writer", daemon=True)
+                    self._writer.start()
+        try:
+            self._writes.put_nowait(fn)
+        except queue.Full:
+            with self._lock:
+                self._counters["dropped_writes"] += 1
+
+    def _write_loop(self):
+        while True:
+            fn = self._writes.get()
+            try:
+                fn()
+            except Exception as e:
+                logging.warning(f"Embedding cache write failed: {e}")
+            finally:
+                self._writes.task_done()
+
+    def flush(self):
+        """Wait for queued background writes to reach the file."""
+        self._writes.join()
+
+    def _touch(self, keys: List[bytes]):
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            for batch in self._batches(keys):
+                conn.execute(f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(batch))})", [now, *batch])
+
+    def _store(self, entries: Dict[bytes, np.ndarray]):
+        conn = self._conn()
+        now = time.time()
+        rows = [(k, len(v), v.tobytes(), now) for k, v in entries.items()]
+        for batch in self._batches(rows):
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO embeddings (key, dim, vector, last_used) VALUES (?, ?, ?, ?)", batch)
+        self._enforce_budget(conn)
+
+    # --- Lookups ---
+    def get_many(self, model_name: str, texts: Sequence[str], background: bool = False) -> List[Optional[np.ndarray]]:
+        """Cached vector of each text, or None where it has not been embedded yet."""
+        keys = [self.key(model_name, t) for t in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        with self._lock:
+            for k in keys:
+                vector = self._memory.get(k)
+                if vector is not None:
+                    self._memory.move_to_end(k)
+                    found[k] = vector
+        memory_hits = sum(1 for k in keys if k in found)
+        from_disk: Dict[bytes, np.ndarray] = {}
+        on_disk = [k for k in dict.fromkeys(keys) if k not in found]
+        if on_disk:
+            conn = self._conn()
+            for batch in self._batches(on_disk):
+                rows = conn.execute(f"SELECT key, dim, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                                    batch).fetchall()
+                from_disk.update((bytes(k), np.frombuffer(v, dtype=np.float32, count=dim)) for k, dim, v in rows)
+            if from_disk:
+                self._write(lambda keys=list(from_disk): self._touch(keys), background)
+                self._remember(from_disk)
+                found.update(from_disk)
+        result = [found.get(k) for k in keys]
+        with self._lock:
+            self._counters["memory_hits"] += memory_hits
+            self._counters["disk_hits"] += sum(1 for k in keys if k in from_disk)
+            self._counters["misses"] += sum(1 for v in result if v is None)
+        return result
+
+    def put_many(self, model_name: str, texts: Sequence[str], vectors: np.ndarray, background: bool = False):
+        entries = {self.key(model_name, t): np.ascontiguousarray(v, dtype=np.float32) for t, v in zip(texts, vectors)}
+        if not entries:
+            return
+        self._remember(entries)
+        self._write(lambda: self._store(entries), background)
+
+    def encode(self, model_name: str, texts: Sequence[str], encode: Callable[[List[str]], np.ndarray],
+               background: bool = False) -> np.ndarray:
+        """
+        Vectors for ``texts`` in order; texts not in the cache are normalized,
+        de-duplicated and passed to ``encode`` in one call, and their vectors stored.
+        """
+        cached = self.get_many(model_name, texts, background)
+        missing = list(dict.fromkeys(normalize_text(t) for t, v in zip(texts, cached) if v is None))
+        if missing:
+            computed = np.asarray(encode(missing), dtype=np.float32)
+            self.put_many(model_name, missing, computed, background)
+            by_text = dict(zip(missing, computed))
+            cached = [v if v is not None else by_text[normalize_text(t)] for t, v in zip(texts, cached)]
+        return np.stack(cached) if cached else np.zeros((0, 0), dtype=np.float32)
+
+    # --- Bounds ---
+    def _remember(self, entries: Dict[bytes, np.ndarray]):
+        with self._lock:
+            for k, v in entries.items():
+                self._memory[k] = v
+                self._memory.move_to_end(k)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _used_bytes(self, conn: sqlite3.Connection) -> int:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0] - conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return pages * page_size
+
+    def _enforce_budget(self, conn: sqlite3.Connection):
+        if self._used_bytes(conn) <= self.max_bytes:
+            return
+        count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        drop = max(1, int(count * EVICT_FRACTION))
+        with conn:
+            conn.execute("DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (drop,))
+        with self._lock:
+            self._counters["evicted"] += drop
+        logging.info(f"Embedding cache over {self.max_bytes} bytes; evicted {drop} of {count} entries")
+
+    # --- Metrics ---
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            counters = dict(self._counters)
+            memory_items = len(self._memory)
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        return {**counters, "lookups": lookups, "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_items": memory_items, "path": self.path}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """The process-wide cache, created on first use; None when ``EMBEDDING_CACHE=0``."""
+    global _default_cache
+    if not EMBEDDING_CACHE:
+        return None
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = EmbeddingCache()
+    return _default_cache
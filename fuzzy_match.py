@@ -0,0 +1,193 @@
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+NGRAM_SIZE = 3
+MAX_POSTINGS_TOUCHED = 50000  # per query token, while generating similar vocabulary tokens
+TOKEN_CANDIDATES = 8  # vocabulary tokens re-scored per query token (by n-gram overlap)
+PHONETIC_CANDIDATES = 3  # extra vocabulary tokens taken from the Soundex bucket
+MAX_CANDIDATE_NAMES = 200  # names scored per query
+MIN_TOKEN_SCORE = 0.5
+DRIVER_SCORE_SLACK = 0.15  # driver-token matches this far below its best match are not expanded
+EDIT_WEIGHT = 0.8
+PHONETIC_WEIGHT = 0.2
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+
+@lru_cache(maxsize=65536)
+def soundex(token: str) -> str:
+    """American Soundex code of a single (lowercase) word, e.g. ``smith`` -> ``s530``."""
+    letters = [c for c in token if c.isalpha()]
+    if not letters:
+        return ""
+    first = letters[0]
+    code = first
+    prev = _SOUNDEX_CODES.get(first, "")
+    for c in letters[1:]:
+        digit = _SOUNDEX_CODES.get(c, "")
+        if digit and digit != prev:
+            code += digit
+            if len(code) == 4:
+                break
+        if c not in "hw":
+            prev = digit
+    return code.ljust(4, "0")
+
+
+def padded_ngrams(token: str) -> List[str]:
+    """Distinct character n-grams of ``token`` with boundary padding, so short tokens still produce grams."""
+    padded = f" {token} "
+    return list({padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)})
+
+
+def edit_distance(a: str, b: str) -> int:
+    """
+    Optimal-string-alignment distance (Levenshtein plus adjacent transpositions),
+    using Hyyrö's bit-parallel algorithm: one pass of integer ops per character.
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    if not a:
+        return len(b)
+    peq: Dict[str, int] = {}
+    for i, c in enumerate(a):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    full = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    vp, vn, d0, prev_eq, score = full, 0, 0, 0, len(a)
+    for c in b:
+        eq = peq.get(c, 0)
+        transposed = ((~d0 & eq) << 1) & prev_eq
+        d0 = ((((eq & vp) + vp) ^ vp) | eq | vn | transposed) & full
+        hp = vn | (~(d0 | vp) & full)
+        hn = d0 & vp
+        if hp & last:
+            score += 1
+        elif hn & last:
+            score -= 1
+        x = ((hp << 1) | 1) & full
+        vn = x & d0
+        vp = ((hn << 1) & full) | (~(x | d0) & full)
+        prev_eq = eq
+    return score
+
+
+def token_similarity(query: str, token: str) -> float:
+    """Blend of normalized edit similarity and Soundex agreement, in [0, 1]."""
+    longest = max(len(query), len(token)) or 1
+    edit_sim = max(0.0, 1 - edit_distance(query, token) / longest)
+    return EDIT_WEIGHT * edit_sim + PHONETIC_WEIGHT * (soundex(query) == soundex(token))
+
+
+class FuzzyNameMatcher:
+    """
+    Ranked approximate lookup over a fixed set of normalized patient names.
+
+    Names are split into tokens and matching happens against the (much smaller)
+    vocabulary of distinct tokens: each query token is expanded to its closest
+    vocabulary tokens via a padded trigram index and a Soundex index, and those
+    are scored with edit distance. Candidate names are then drawn from the most
+    selective query token only, capped at ``MAX_CANDIDATE_NAMES``, so query cost
+    stays bounded however many patients share a common first name.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names: List[str] = sorted(set(n for n in names if n))
+        self.tokens: List[str] = []
+        token_ids: Dict[str, int] = {}
+        token_names: List[List[int]] = []
+        self._name_tokens: List[Tuple[int, ...]] = []
+        for name_id, name in enumerate(self.names):
+            ids = []
+            for token in name.split():
+                if token not in token_ids:
+                    token_ids[token] = len(self.tokens)
+                    self.tokens.append(token)
+                    token_names.append([])
+                token_id = token_ids[token]
+                if not token_names[token_id] or token_names[token_id][-1] != name_id:
+                    token_names[token_id].append(name_id)
+                ids.append(token_id)
+            self._name_tokens.append(tuple(ids))
+        self._token_names = [array("I", ids) for ids in token_names]
+
+        postings: Dict[str, List[int]] = {}
+        phonetic: Dict[str, List[int]] = {}
+        gram_counts = []
+        for token_id, token in enumerate(self.tokens):
+            grams = padded_ngrams(token)
+            gram_counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(token_id)
+            phonetic.setdefault(soundex(token), []).append(token_id)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._token_gram_counts = np.array(gram_counts, dtype=np.float32)
+        self._phonetic = {code: array("I", ids) for code, ids in phonetic.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _similar_tokens(self, query: str) -> Dict[int, float]:
+        """Vocabulary token id -> similarity for the tokens closest to ``query``."""
+        grams = padded_ngrams(query)
+        lists = []
+        touched = 0
+        for ids in sorted((self._postings[g] for g in grams if g in self._postings), key=len):
+            if touched and touched + len(ids) > MAX_POSTINGS_TOUCHED:
+                break
+            lists.append(ids)
+            touched += len(ids)
+        candidates: List[int] = []
+        if lists:
+            counts = np.bincount(np.concatenate(lists))
+            hit = np.flatnonzero(counts)
+            # Dice coefficient over shared grams picks which tokens are worth an edit-distance check
+            dice = counts[hit] / (len(grams) + self._token_gram_counts[hit])
+            if len(hit) > TOKEN_CANDIDATES:
+                top = np.argpartition(-dice, TOKEN_CANDIDATES)[:TOKEN_CANDIDATES]
+                hit, dice = hit[top], dice[top]
+            candidates = hit[np.argsort(-dice, kind="stable")].tolist()
+        candidates.extend(self._phonetic.get(soundex(query), ())[:PHONETIC_CANDIDATES])
+        scored = {token_id: token_similarity(query, self.tokens[token_id]) for token_id in candidates}
+        return {token_id: score for token_id, score in scored.items() if score >= MIN_TOKEN_SCORE}
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[str, float]]:
+        """Return up to ``limit`` ``(name, score)`` pairs, best first. ``query`` must be normalized."""
+        query_tokens = list(dict.fromkeys(query.split()))
+        if not query_tokens:
+            return []
+        matches = [self._similar_tokens(token) for token in query_tokens]
+
+        # Drive candidate generation from the query token whose matches cover the fewest names
+        driver = min((m for m in matches if m), key=lambda m: sum(len(self._token_names[t]) for t in m), default={})
+        candidates: List[int] = []
+        floor = max(driver.values(), default=0.0) - DRIVER_SCORE_SLACK
+        for token_id, token_score in sorted(driver.items(), key=lambda item: (-item[1], item[0])):
+            if token_score < floor:
+                break
+            candidates.extend(self._token_names[token_id][:MAX_CANDIDATE_NAMES - len(candidates)])
+            if len(candidates) >= MAX_CANDIDATE_NAMES:
+                break
+
+        scored = []
+        n_query = len(query_tokens)
+        for name_id in dict.fromkeys(candidates):
+            name_tokens = self._name_tokens[name_id]
+            total = 0.0
+            for m in matches:
+                total += max([m.get(t, 0.0) for t in name_tokens])
+            score = total / max(n_query, len(name_tokens))
+            if score >= min_score:
+                scored.append((self.names[name_id], score))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
@@ -0,0 +1,265 @@
+"""
+Loaders for the embedding model and the cross-encoder with a selectable inference backend.
+
+``INFERENCE_BACKEND=torch`` (default) uses sentence-transformers as before.
+``INFERENCE_BACKEND=onnx`` runs the same models with ONNX Runtime, exported
+once to ``ONNX_MODEL_DIR`` and, with ``ONNX_QUANTIZE=1``, int8 dynamically
+quantized. The first load exports the model if it is missing, which needs
+torch and sentence-transformers; export ahead of time on a build host with
+
+    python inference_backend.py --export
+
+so serving hosts only need onnxruntime and transformers (tokenizers). Both
+backends expose ``encode(texts)`` / ``predict(pairs)`` like the
+sentence-transformers classes.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")  # "torch" or "onnx"
+INFERENCE_THREADS = int(os.getenv("INFERENCE_THREADS", "0"))  # intra-op threads per model; 0 keeps the library default
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", os.path.join("data", "onnx_models"))
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "1") != "0"
+ONNX_OPSET = 14
+EXPORT_FILE = "export.json"
+EXPORT_VERSION = 1
+EXPORT_SAMPLE = ["How much fluid can I drink each day?", "Swelling in the legs after discharge"]
+
+
+def embedding_model_key(model_name: str, backend: str = INFERENCE_BACKEND, quantize: bool = ONNX_QUANTIZE) -> str:
+    """
+    Name under which vectors from ``model_name`` are cached and recorded in the
+    ingestion manifest: int8 vectors differ slightly from fp32 ones, so the
+    backend is part of it.
+    """
+    if backend != "onnx":
+        return model_name
+    return f"{model_name}@onnx-int8" if quantize else f"{model_name}@onnx"
+
+
+def onnx_model_path(model_name: str) -> str:
+    return os.path.join(ONNX_MODEL_DIR, model_name.replace("/", "__"))
+
+
+# --- Export ---
+def _export(hf_model, tokenizer, out_dir: str, output_name: str, meta: dict, quantize: bool):
+    import torch
+
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids")
+                   if n in tokenizer(EXPORT_SAMPLE[0], return_tensors="pt")]
+    sample = tokenizer(*([EXPORT_SAMPLE] if meta["kind"] == "embedder" else [EXPORT_SAMPLE, EXPORT_SAMPLE[::-1]]),
+                       padding=True, return_tensors="pt")
+
+    class _FirstOutput(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs)))[0]
+
+    # Stage in a sibling directory and rename, so concurrent workers never load a half-written export
+    staging = f"{out_dir}.tmp{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    tokenizer.save_pretrained(staging)
+    dynamic_axes = {n: {0: "batch", 1: "sequence"} for n in input_names}
+    dynamic_axes[output_name] = {0: "batch", 1: "sequence"} if meta["kind"] == "embedder" else {0: "batch"}
+    with torch.no_grad():
+        torch.onnx.export(_FirstOutput(hf_model.eval()), tuple(sample[n] for n in input_names),
+                          os.path.join(staging, "model.onnx"), input_names=input_names, output_names=[output_name],
+                          dynamic_axes=dynamic_axes, opset_version=ONNX_OPSET)
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(os.path.join(staging, "model.onnx"), os.path.join(staging, "model_int8.onnx"),
+                         weight_type=QuantType.QInt8)
+    with open(os.path.join(staging, EXPORT_FILE), "w", encoding="utf-8") as f:
+        json.dump({**meta, "version": EXPORT_VERSION, "quantized": quantize}, f, indent=2)
+    _publish(staging, out_dir, quantize)
+
+
+def _publish(staging: str, out_dir: str, quantize: bool):
+    """Rename a finished export from ``staging`` to ``out_dir``, replacing a stale one."""
+    if _is_current(out_dir, quantize):
+        shutil.rmtree(staging, ignore_errors=True)  # another worker finished first
+        return
+    # Move a stale export aside rather than deleting it in place, so a worker loading it
+    # never sees a half-deleted directory; only one worker's rename of each directory wins
+    stale = f"{out_dir}.stale{os.getpid()}"
+    try:
+        os.replace(out_dir, stale)
+    except OSError:
+        pass  # missing, or already moved by another worker
+    try:
+        os.replace(staging, out_dir)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)  # another worker's fresh export is in place
+    shutil.rmtree(stale, ignore_errors=True)
+
+
+def export_embedder(model_name: str, out_dir: str, quantize: bool = ONNX_QUANTIZE):
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    model = SentenceTransformer(model_name, device="cpu")
+    pooling = next(m for m in model if isinstance(m, Pooling))
+    meta = {"kind": "embedder", "model": model_name, "max_length": model.max_seq_length,
+            "pooling": pooling.get_pooling_mode_str(), "normalize": any(isinstance(m, Normalize) for m in model)}
+    _export(model[0].auto_model, model.tokenizer, out_dir, "token_embeddings", meta, quantize)
+
+
+def export_reranker(model_name: str, out_dir: str, quantize: bool = ONNX_QUANTIZE):
+    from sentence_transformers import CrossEncoder
+
+    model = CrossEncoder(model_name, device="cpu")
+    meta = {"kind": "reranker", "model": model_name, "max_length": model.max_length or model.tokenizer.model_max_length,
+            "num_labels": model.config.num_labels}
+    _export(model.model, model.tokenizer, out_dir, "logits", meta, quantize)
+
+
+def _is_current(out_dir: str, quantize: bool) -> bool:
+    try:
+        with open(os.path.join(out_dir, EXPORT_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return meta.get("version") == EXPORT_VERSION and meta.get("quantized") == quantize
+
+
+def ensure_onnx_model(model_name: str, kind: str, quantize: bool = ONNX_QUANTIZE) -> str:
+    """
+    Directory of the ONNX export of ``model_name``, exporting it first if it is
+    missing or stale. A stale export stays in place until the new one replaces it.
+    """
+    out_dir = onnx_model_path(model_name)
+    if _is_current(out_dir, quantize):
+        return out_dir
+    if os.path.exists(out_dir):
+        logging.info(f"ONNX export of {model_name} is stale; exporting again")
+    logging.info(f"Exporting {model_name} to ONNX at {out_dir} (int8: {quantize})")
+    (export_embedder if kind == "embedder" else export_reranker)(model_name, out_dir, quantize)
+    return out_dir
+
+
+# --- ONNX Runtime models ---
+class _OnnxModel:
+    def __init__(self, path: str, threads: int = INFERENCE_THREADS):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(path, EXPORT_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        model_file = "model_int8.onnx" if self.meta["quantized"] else "model.onnx"
+        self.session = ort.InferenceSession(os.path.join(path, model_file), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.max_length = self.meta["max_length"]
+
+    def _run(self, *texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        encoded = self.tokenizer(*texts, padding=True, truncation=True, max_length=self.max_length, return_tensors="np")
+        feeds = {name: value.astype(np.int64) for name, value in encoded.items() if name in self.input_names}
+        return self.session.run(None, feeds)[0], encoded["attention_mask"]
+
+    @staticmethod
+    def _batches(lengths: Sequence[int], batch_size: int):
+        # Similar lengths share a batch, so little of each batch is padding
+        order = np.argsort(lengths, kind="stable")
+        for start in range(0, len(order), batch_size):
+            yield order[start:start + batch_size]
+
+
+class OnnxEmbedder(_OnnxModel):
+    """ONNX Runtime counterpart of ``SentenceTransformer.encode`` for the exported pooling and normalization."""
+
+    def encode(self, texts, batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        out = np.zeros((len(texts), 0), dtype=np.float32)
+        for batch in self._batches([len(t) for t in texts], batch_size):
+            tokens, mask = self._run([texts[i] for i in batch])
+            pooled = self._pool(tokens, mask)
+            if out.shape[1] == 0:
+                out = np.zeros((len(texts), pooled.shape[1]), dtype=np.float32)
+            out[batch] = pooled
+        return out[0] if single else out
+
+    def _pool(self, tokens: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        if self.meta["pooling"] == "cls":
+            pooled = tokens[:, 0]
+        elif self.meta["pooling"] == "max":
+            pooled = np.where(mask[..., None] > 0, tokens, -1e9).max(axis=1)
+        else:
+            weights = mask[..., None].astype(np.float32)
+            pooled = (tokens * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        if self.meta["normalize"]:
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
+
+
+class OnnxCrossEncoder(_OnnxModel):
+    """ONNX Runtime counterpart of ``CrossEncoder.predict``: sigmoid scores for single-label models, else logits."""
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        pairs = list(pairs)
+        scores = None
+        for batch in self._batches([len(q) + len(p) for q, p in pairs], batch_size):
+            logits, _ = self._run([pairs[i][0] for i in batch], [pairs[i][1] for i in batch])
+            if self.meta["num_labels"] == 1:
+                logits = 1 / (1 + np.exp(-logits[:, 0]))
+            if scores is None:
+                scores = np.zeros((len(pairs),) + logits.shape[1:], dtype=np.float32)
+            scores[batch] = logits
+        return scores if scores is not None else np.zeros(0, dtype=np.float32)
+
+
+# --- Loaders ---
+def _set_torch_threads(threads: int):
+    if threads > 0:
+        import torch
+        torch.set_num_threads(threads)
+
+
+def load_embedder(model_name: str, backend: str = INFERENCE_BACKEND, threads: int = INFERENCE_THREADS):
+    if backend == "onnx":
+        return OnnxEmbedder(ensure_onnx_model(model_name, "embedder"), threads)
+    from sentence_transformers import SentenceTransformer
+    _set_torch_threads(threads)
+    return SentenceTransformer(model_name)
+
+
+def load_reranker(model_name: str, backend: str = INFERENCE_BACKEND, threads: int = INFERENCE_THREADS):
+    if backend == "onnx":
+        return OnnxCrossEncoder(ensure_onnx_model(model_name, "reranker"), threads)
+    from sentence_transformers import CrossEncoder
+    _set_torch_threads(threads)
+    return CrossEncoder(model_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the embedding model and cross-encoder to ONNX")
+    parser.add_argument("--export", action="store_true", help="export both models to ONNX_MODEL_DIR")
+    parser.add_argument("--no-quantize", action="store_true", help="keep fp32 weights")
+    args = parser.parse_args()
+    if not args.export:
+        parser.print_help()
+        return
+    logging.basicConfig(level=logging.INFO)
+    for model_name, kind in ((EMBEDDING_MODEL, "embedder"), (RERANKER_MODEL, "reranker")):
+        print(f"{model_name}: {ensure_onnx_model(model_name, kind, quantize=not args.no_quantize)}")
+
+
+if __name__ == "__main__":
+    main()
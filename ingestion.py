@@ -1,60 +1,513 @@
-from langchain_community.document_loaders import WebBaseLoader
-from sentence_transformers import SentenceTransformer
+import argparse
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, List, Optional, Tuple
+
 import faiss
 import numpy as np
-import os
-import requests
+from bm25_index import BM25Index
+from tokenizer import tokenize, config as tokenizer_config
+from vector_index import FAISS_INDEX_TYPE, build_faiss_index, describe, read_faiss_index, update_faiss_index
+from chunk_store import ChunkStore, ChunkStoreWriter
+from embedding_cache import get_embedding_cache
+from inference_backend import EMBEDDING_MODEL, embedding_model_key
 
 # Parameters
 URL = 'https://nephros.gr/images/books/Brenner_and_Rectors_The_Kidney_11th_Edition-0001-0235-s.pdf'  # Use as a web page
 CHUNK_SIZE = 500  # characters per chunk
-EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
 NEPHRO_TXT_PATH = 'data/nephro.txt'
 FAISS_INDEX_PATH = 'data/nephro_faiss.index'
+BM25_INDEX_PATH = 'data/nephro_bm25'
+CHUNK_STORE_PATH = 'data/nephro_chunks'
+MANIFEST_PATH = 'data/nephro_manifest.json'  # per-source file hashes and chunk ids of the live knowledge base
+MANIFEST_VERSION = 1
+
+# Streaming pipeline: loader/chunker -> batched embedder -> incremental writer
+INGEST_WORK_DIR = os.getenv('INGEST_WORK_DIR', 'data/ingest_work')  # staging files and checkpoint until a run completes
+INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', str(min(4, os.cpu_count() or 1))))  # processes parsing local files; 0 parses inline
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '256'))  # chunks embedded, written and checkpointed together
+INGEST_QUEUE_BATCHES = int(os.getenv('INGEST_QUEUE_BATCHES', '4'))  # batches buffered between stages
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt', '.md')
+CHECKPOINT_VERSION = 2
+
+def is_url(source):
+    return source.startswith(('http://', 'https://'))
 
-# 1. Load text from the web (always as HTML)
+# 1. Load text from the web (always as HTML) or from local files, piece by piece
 def load_text(url):
+    from langchain_community.document_loaders import WebBaseLoader
     loader = WebBaseLoader(url)
     docs = loader.load()
     text = '\n'.join([doc.page_content for doc in docs])
     return text
 
+def iter_file_text(path):
+    """Text of a local file in pieces (PDF pages, DOCX paragraphs, text blocks) that concatenate to the whole."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.pdf':
+        from pypdf import PdfReader
+        for page in PdfReader(path).pages:
+            yield (page.extract_text() or '') + '\n'
+    elif ext == '.docx':
+        import docx
+        for paragraph in docx.Document(path).paragraphs:
+            yield paragraph.text + '\n'
+    elif ext in ('.txt', '.md'):
+        with open(path, encoding='utf-8', errors='replace') as f:
+            while block := f.read(1 << 20):
+                yield block
+    else:
+        raise ValueError(f"Unsupported file type: {path}")
+
+def expand_sources(sources):
+    """URLs and files as given; directories become the supported files under them, in sorted order."""
+    expanded = []
+    for source in sources:
+        if is_url(source):
+            expanded.append(source)
+        elif os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                expanded.extend(os.path.join(root, f) for f in sorted(files) if f.lower().endswith(SUPPORTED_EXTENSIONS))
+        elif source.lower().endswith(SUPPORTED_EXTENSIONS) and os.path.isfile(source):
+            expanded.append(source)
+        else:
+            raise ValueError(f"Not a URL, directory or supported file ({', '.join(SUPPORTED_EXTENSIONS)}): {source}")
+    return expanded
+
 # 2. Chunk text
+def _clean_chunk(chunk):
+    # Blank lines separate chunks in nephro.txt, so they must not occur inside one;
+    # otherwise chunks read back by the clinical agent no longer line up with the indexes
+    return re.sub(r'\n\s*\n', '\n', chunk).strip()
+
+def iter_chunks(pieces, chunk_size=CHUNK_SIZE):
+    """Same chunks as chunk_text(''.join(pieces)), holding at most one piece plus one chunk of text."""
+    buffer = ''
+    for piece in pieces:
+        buffer += piece
+        start = 0
+        while len(buffer) - start >= chunk_size:
+            chunk = _clean_chunk(buffer[start:start + chunk_size])
+            start += chunk_size
+            if chunk:
+                yield chunk
+        buffer = buffer[start:]
+    chunk = _clean_chunk(buffer)
+    if chunk:
+        yield chunk
+
 def chunk_text(text, chunk_size=CHUNK_SIZE):
-    chunks = []
-    for i in range(0, len(text), chunk_size):
-        chunk = text[i:i+chunk_size].strip()
-        if chunk:
-            chunks.append(chunk)
-    return chunks
+    return list(iter_chunks([text], chunk_size))
+
+def chunk_file(path, chunk_size=CHUNK_SIZE):
+    """Parse and chunk one local file (runs in the parsing process pool)."""
+    return list(iter_chunks(iter_file_text(path), chunk_size))
 
 # 3. Generate embeddings
 def embed_chunks(chunks, model_name=EMBEDDING_MODEL):
-    model = SentenceTransformer(model_name)
+    from inference_backend import load_embedder
+    model = load_embedder(model_name)
+    cache = get_embedding_cache()
+    if cache is not None:
+        return cache.encode(embedding_model_key(model_name), chunks, lambda texts: model.encode(texts, show_progress_bar=True))
     embeddings = model.encode(chunks, show_progress_bar=True)
     return np.array(embeddings)
 
-# 4. Store embeddings in FAISS
-def save_faiss_index(embeddings, path):
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings)
+# 4. Store embeddings in FAISS (FAISS_INDEX_TYPE: exact "flat", or "ivf_flat" / "ivf_pq" / "hnsw" for large corpora)
+def save_faiss_index(embeddings, path, index_type=FAISS_INDEX_TYPE):
+    index = build_faiss_index(embeddings, index_type)
     faiss.write_index(index, path)
+    return index
+
+# 5. Build and save the BM25 inverted index (loaded memory-mapped by the clinical agent)
+def save_bm25_index(chunks, path):
+    index = BM25Index.build((tokenize(chunk) for chunk in chunks), tokenizer=tokenizer_config())
+    index.save(path)
+    return index
 
-# 5. Save text chunks
-def save_chunks(chunks, path):
+# 6. Save text chunks: readable nephro.txt, plus the memory-mapped store the clinical agent reads
+def save_chunks(chunks, path, store_path=CHUNK_STORE_PATH):
     with open(path, 'w', encoding='utf-8') as f:
         for chunk in chunks:
             f.write(chunk + '\n\n')
+    ChunkStore.write(chunks, store_path)
+
+# 7. Content-addressed chunks: the id of a chunk is a hash of its text, so identical chunks are stored and embedded once
+def chunk_id(text):
+    return int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little') & 0x7FFF_FFFF_FFFF_FFFF
+
+def file_fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while block := f.read(1 << 20):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+# 8. Streaming pipeline with checkpoints
+@dataclass
+class _Batch:
+    items: List[Tuple[str, int, str, int]] = field(default_factory=list)  # (source, chunk number within source, text, chunk id)
+    finished: List[Tuple[str, Optional[str]]] = field(default_factory=list)  # (source, fingerprint) of sources complete by this batch
+    new_ids: List[int] = field(default_factory=list)  # chunks in this batch without a vector yet, embedded in this order
+    embeddings: Optional[np.ndarray] = None
+
+@dataclass
+class _Failure:
+    error: BaseException
+
+class IngestionPipeline:
+    """
+    Streaming ingestion: a loader/chunker thread (local files parsed in a
+    process pool) feeds a batched embedder thread, which feeds the writer on
+    the calling thread. Stages are joined by bounded queues, so memory stays
+    at a few batches plus the files being parsed, whatever the corpus size.
+
+    The writer appends each batch to staging files in ``work_dir`` (chunk
+    store, raw float32 embeddings, nephro.txt), fsyncs them and then records
+    progress in ``checkpoint.json``. ``run(resume=True)`` truncates anything
+    written after the last checkpoint, skips finished sources and chunks
+    already embedded, and carries on. Once every source is in, the FAISS and
+    BM25 indexes are built from the staged data and all outputs replace the
+    live files.
+
+    Runs are incremental against the live knowledge base described by
+    ``manifest_path`` (per-source file hashes and chunk ids): unchanged files
+    are not parsed again, only chunks whose id has no vector yet are
+    embedded, and the FAISS index, which stores vectors under chunk ids, is
+    updated in place by removing the chunks no source produces any more and
+    adding the new ones. BM25 statistics are corpus-wide, so that index is
+    rebuilt from the new chunk store (tokenizing only, no model calls).
+    """
+
+    def __init__(self, sources: List[str], work_dir: str = INGEST_WORK_DIR, workers: int = INGEST_WORKERS,
+                 batch_size: int = INGEST_BATCH_SIZE, queue_batches: int = INGEST_QUEUE_BATCHES,
+                 chunk_size: int = CHUNK_SIZE, model_name: str = EMBEDDING_MODEL,
+                 encode: Optional[Callable[[List[str]], np.ndarray]] = None, index_type: str = FAISS_INDEX_TYPE,
+                 manifest_path: str = MANIFEST_PATH, rebuild: bool = False):
+        self.sources = sources
+        self.work_dir = work_dir
+        self.workers = workers
+        self.batch_size = batch_size
+        self.queue_batches = queue_batches
+        self.chunk_size = chunk_size
+        self.model_name = model_name
+        self.encode = encode
+        self.index_type = index_type
+        self.manifest_path = manifest_path
+        self.rebuild = rebuild
+        self.checkpoint_path = os.path.join(work_dir, 'checkpoint.json')
+        self._stop = threading.Event()
+        self._base = None  # live manifest, chunk store and chunk ids an incremental run starts from
+        self._known = set()  # chunk ids that have a vector, live or embedded in this run
+
+    # --- Checkpoint ---
+    def _config(self):
+        # A different inference backend yields (slightly) different vectors, so it forces a rebuild too
+        return {'chunk_size': self.chunk_size, 'embedding_model': embedding_model_key(self.model_name)}
+
+    def _load_checkpoint(self, resume):
+        if resume and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+            if checkpoint.get('version') != CHECKPOINT_VERSION or checkpoint['config'] != self._config():
+                raise ValueError(f"Checkpoint in {self.work_dir} was written with {checkpoint.get('config')}, "
+                                 f"not {self._config()}; run without --resume to start over")
+            if checkpoint['incremental'] != (self._base is not None):
+                raise ValueError(f"Checkpoint in {self.work_dir} was written against a different knowledge base; "
+                                 f"run without --resume to start over")
+            return checkpoint
+        if os.path.exists(self.work_dir):
+            shutil.rmtree(self.work_dir)
+        os.makedirs(self.work_dir)
+        return {'version': CHECKPOINT_VERSION, 'config': self._config(), 'incremental': self._base is not None,
+                'sources': {}, 'chunks': 0, 'items': 0, 'embedded': 0, 'txt_bytes': 0, 'dim': None, 'complete': False}
+
+    def _save_checkpoint(self, checkpoint):
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    # --- Live knowledge base ---
+    def _load_base(self):
+        """The live knowledge base to update, or None (with the reason logged) when everything must be rebuilt."""
+        if self.rebuild:
+            return None
+        manifest = load_manifest(self.manifest_path)
+        if manifest is None:
+            print(f"No manifest at {self.manifest_path}; building the knowledge base from scratch")
+            return None
+        config = {**self._config(), 'index_type': self.index_type}
+        if manifest.get('version') != MANIFEST_VERSION or manifest.get('config') != config:
+            print(f"Knowledge base was built with {manifest.get('config')}, not {config}; rebuilding from scratch")
+            return None
+        ids = {i for entry in manifest['sources'].values() for i in entry['chunk_ids']}
+        try:
+            store = ChunkStore.open(CHUNK_STORE_PATH)
+            ntotal = read_faiss_index(FAISS_INDEX_PATH).ntotal
+        except (OSError, RuntimeError) as e:
+            print(f"Cannot open the live knowledge base ({e}); rebuilding from scratch")
+            return None
+        if store.ids is None or ntotal != len(ids) or set(store.ids.tolist()) != ids:
+            print(f"Live chunk store and FAISS index do not match {self.manifest_path}; rebuilding from scratch")
+            return None
+        return {'manifest': manifest, 'store': store, 'ids': ids}
+
+    def _reusable_chunks(self, source, fingerprint):
+        """Chunks of an unchanged source, read back from the live chunk store; None if it has to be parsed."""
+        entry = self._base['manifest']['sources'].get(source) if self._base else None
+        if fingerprint is None or entry is None or entry['fingerprint'] != fingerprint:
+            return None
+        store = self._base['store']
+        positions = store.positions(entry['chunk_ids'])
+        if (positions < 0).any():
+            return None
+        return [store[int(p)] for p in positions]
+
+    # --- Stages ---
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _iter_source_chunks(self, sources) -> Iterator[Tuple[str, Optional[str], List[str]]]:
+        """
+        (source, fingerprint, chunks) in source order; local files are parsed ahead in the process pool,
+        a bounded number at a time, unless they are unchanged since the live knowledge base was built.
+        """
+        pool = None
+        if self.workers > 0 and any(not is_url(s) for s in sources):
+            # spawn: forking a process that already runs the embedder's threads can deadlock
+            pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        try:
+            todo, pending = iter(sources), deque()
+
+            def fill():
+                while len(pending) < max(1, 2 * self.workers):
+                    source = next(todo, None)
+                    if source is None:
+                        return
+                    fingerprint = None if is_url(source) else file_fingerprint(source)
+                    reused = self._reusable_chunks(source, fingerprint)
+                    parse_ahead = reused is None and pool is not None and not is_url(source)
+                    future = pool.submit(chunk_file, source, self.chunk_size) if parse_ahead else None
+                    pending.append((source, fingerprint, reused, future))
+
+            fill()
+            while pending and not self._stop.is_set():
+                source, fingerprint, chunks, future = pending.popleft()
+                if future is not None:
+                    chunks = future.result()
+                elif chunks is None and is_url(source):
+                    print(f"Loading {source} ...")
+                    chunks = chunk_text(load_text(source), self.chunk_size)
+                elif chunks is None:
+                    chunks = chunk_file(source, self.chunk_size)
+                fill()
+                yield source, fingerprint, chunks
+        finally:
+            if pool:
+                pool.shutdown(cancel_futures=True)
+
+    def _produce(self, out_q, checkpoint):
+        try:
+            progress = checkpoint['sources']
+            sources = [s for s in self.sources if not progress.get(s, {}).get('done')]
+            batch = _Batch()
+            for source, fingerprint, chunks in self._iter_source_chunks(sources):
+                for number in range(progress.get(source, {}).get('chunks', 0), len(chunks)):
+                    batch.items.append((source, number, chunks[number], chunk_id(chunks[number])))
+                    if len(batch.items) >= self.batch_size:
+                        self._put(out_q, batch)
+                        batch = _Batch()
+                batch.finished.append((source, fingerprint))
+            if batch.items or batch.finished:
+                self._put(out_q, batch)
+            self._put(out_q, None)
+        except BaseException as e:
+            self._put(out_q, _Failure(e))
+
+    def _embed(self, in_q, out_q):
+        try:
+            encode = self.encode
+            if encode is None:
+                # Same backend as the query side, so stored and query vectors come from the same model weights
+                from inference_backend import load_embedder
+                model = load_embedder(self.model_name)
+                encode = lambda texts: model.encode(texts, batch_size=64)  # noqa: E731
+                cache = get_embedding_cache()
+                if cache is not None:
+                    # A --rebuild, or chunks that come back after an edit, reuse their earlier vectors
+                    encode = functools.partial(cache.encode, embedding_model_key(self.model_name), encode=encode)
+            while (batch := in_q.get()) is not None and not isinstance(batch, _Failure):
+                new = {}
+                for _, _, text, cid in batch.items:
+                    if cid not in self._known:
+                        new.setdefault(cid, text)
+                if new:
+                    batch.new_ids = list(new)
+                    batch.embeddings = np.ascontiguousarray(encode(list(new.values())), dtype=np.float32)
+                    self._known.update(new)
+                self._put(out_q, batch)
+            self._put(out_q, batch)
+        except BaseException as e:
+            self._put(out_q, _Failure(e))
+
+    def _write(self, in_q, checkpoint):
+        store = ChunkStoreWriter(os.path.join(self.work_dir, 'chunks'), checkpoint['chunks'], with_ids=True)
+        stored = set(store.ids().tolist())
+        with open(os.path.join(self.work_dir, 'embeddings.f32'), 'ab') as emb, \
+                open(os.path.join(self.work_dir, 'embedding_ids.i64'), 'ab') as emb_ids, \
+                open(os.path.join(self.work_dir, 'source_ids.i64'), 'ab') as source_ids, \
+                open(os.path.join(self.work_dir, 'nephro.txt'), 'ab') as txt:
+            # Drop whatever a crashed run wrote after its last checkpoint
+            emb.truncate(checkpoint['embedded'] * (checkpoint['dim'] or 0) * 4)
+            emb_ids.truncate(checkpoint['embedded'] * 8)
+            source_ids.truncate(checkpoint['items'] * 8)
+            txt.truncate(checkpoint['txt_bytes'])
+            while (batch := in_q.get()) is not None:
+                if isinstance(batch, _Failure):
+                    raise batch.error
+                progress = checkpoint['sources']
+                for source, number, text, cid in batch.items:
+                    if cid not in stored:
+                        store.append(text, cid)
+                        txt.write((text + '\n\n').encode('utf-8'))
+                        stored.add(cid)
+                    source_ids.write(np.int64(cid).tobytes())
+                    progress.setdefault(source, {'chunks': 0, 'done': False})['chunks'] = number + 1
+                if batch.new_ids:
+                    checkpoint['dim'] = int(batch.embeddings.shape[1])
+                    emb.write(batch.embeddings.tobytes())
+                    emb_ids.write(np.array(batch.new_ids, dtype=np.int64).tobytes())
+                for source, fingerprint in batch.finished:
+                    progress.setdefault(source, {'chunks': 0, 'done': False}).update(done=True, fingerprint=fingerprint)
+                for f in (emb, emb_ids, source_ids, txt):
+                    f.flush()
+                    os.fsync(f.fileno())
+                store.flush()
+                checkpoint['chunks'] = store.count
+                checkpoint['items'] += len(batch.items)
+                checkpoint['embedded'] += len(batch.new_ids)
+                checkpoint['txt_bytes'] = txt.tell()
+                self._save_checkpoint(checkpoint)
+                print(f"{store.count} chunks stored, {checkpoint['embedded']} embedded; "
+                      f"{sum(s['done'] for s in progress.values())}/{len(self.sources)} sources done")
+        store.close()
+        checkpoint['complete'] = True
+        self._save_checkpoint(checkpoint)
+
+    # --- Finish ---
+    def _manifest(self, checkpoint, dim):
+        source_ids = np.fromfile(os.path.join(self.work_dir, 'source_ids.i64'), dtype=np.int64, count=checkpoint['items'])
+        sources, start = {}, 0
+        for source, entry in checkpoint['sources'].items():
+            sources[source] = {'fingerprint': entry.get('fingerprint'),
+                               'chunk_ids': source_ids[start:start + entry['chunks']].tolist()}
+            start += entry['chunks']
+        return {'version': MANIFEST_VERSION, 'config': {**self._config(), 'index_type': self.index_type},
+                'dim': dim, 'sources': sources}
+
+    def _finalize(self, checkpoint):
+        if not checkpoint['chunks']:
+            raise ValueError("No text found in the sources; nothing to index")
+        chunks = ChunkStore.open(os.path.join(self.work_dir, 'chunks'))
+        new_ids = np.fromfile(os.path.join(self.work_dir, 'embedding_ids.i64'), dtype=np.int64, count=checkpoint['embedded'])
+        embeddings = np.zeros((0, checkpoint['dim'] or 0), dtype=np.float32)
+        if checkpoint['embedded']:
+            embeddings = np.memmap(os.path.join(self.work_dir, 'embeddings.f32'), dtype=np.float32, mode='r',
+                                   shape=(checkpoint['embedded'], checkpoint['dim']))
+        removed = np.zeros(0, dtype=np.int64)
+        unchanged = False
+        if checkpoint['incremental']:
+            live_ids = np.fromiter(self._base['ids'], dtype=np.int64, count=len(self._base['ids']))
+            removed = np.setdiff1d(live_ids, np.asarray(chunks.ids))
+            unchanged = not len(new_ids) and not len(removed) and np.array_equal(chunks.ids, self._base['store'].ids)
+        stats = {'chunks': len(chunks), 'sources': len(checkpoint['sources']), 'embedded': len(new_ids),
+                 'removed': len(removed)}
+        staged = [('nephro_manifest.json', self.manifest_path)]
+        if not unchanged:
+            if checkpoint['incremental']:
+                # A heap copy to modify; servers keep using the mapped live file until they reload
+                faiss_index = update_faiss_index(faiss.read_index(FAISS_INDEX_PATH), removed, embeddings, new_ids)
+            else:
+                faiss_index = build_faiss_index(embeddings, self.index_type, ids=new_ids)
+            faiss.write_index(faiss_index, os.path.join(self.work_dir, 'nephro_faiss.index'))
+            print(f"FAISS index {describe(faiss_index)}: {len(new_ids)} chunks embedded, {len(removed)} removed")
+            bm25 = save_bm25_index(chunks, os.path.join(self.work_dir, 'nephro_bm25'))
+            print(f"Built BM25 index ({len(bm25.terms)} terms)")
+            dim = faiss_index.d
+            del faiss_index, bm25
+            # The manifest goes last, so it never describes indexes that were not published
+            staged = [('nephro.txt', NEPHRO_TXT_PATH), ('chunks', CHUNK_STORE_PATH),
+                      ('nephro_faiss.index', FAISS_INDEX_PATH), ('nephro_bm25', BM25_INDEX_PATH)] + staged
+        else:
+            print("Knowledge base is up to date")
+            dim = self._base['manifest']['dim']
+        with open(os.path.join(self.work_dir, 'nephro_manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(self._manifest(checkpoint, dim), f)
+        del chunks, embeddings
+        self._base = None  # releases the mapped live store before it is replaced
+        # Renames leave files that running servers still have mapped intact until they reload
+        for staged_name, live in staged:
+            if os.path.isdir(live):
+                shutil.rmtree(live)
+            os.makedirs(os.path.dirname(live) or '.', exist_ok=True)
+            os.replace(os.path.join(self.work_dir, staged_name), live)
+        shutil.rmtree(self.work_dir)
+        return stats
+
+    def run(self, resume: bool = False) -> dict:
+        self._base = self._load_base()
+        checkpoint = self._load_checkpoint(resume)
+        self._known = set(self._base['ids']) if self._base else set()
+        embedded = os.path.join(self.work_dir, 'embedding_ids.i64')
+        if checkpoint['embedded']:
+            self._known.update(np.fromfile(embedded, dtype=np.int64, count=checkpoint['embedded']).tolist())
+        if not checkpoint['complete']:
+            chunk_q = queue.Queue(maxsize=self.queue_batches)
+            embed_q = queue.Queue(maxsize=self.queue_batches)
+            threads = [threading.Thread(target=self._produce, args=(chunk_q, checkpoint), name='ingest-chunker', daemon=True),
+                       threading.Thread(target=self._embed, args=(chunk_q, embed_q), name='ingest-embedder', daemon=True)]
+            for t in threads:
+                t.start()
+            try:
+                self._write(embed_q, checkpoint)
+            finally:
+                self._stop.set()
+                for t in threads:
+                    t.join()
+        return self._finalize(checkpoint)
 
 if __name__ == '__main__':
-    print(f"Loading {URL} ...")
-    text = load_text(URL)
-    print(f"Text length: {len(text)} characters")
-    chunks = chunk_text(text)
-    print(f"Number of chunks: {len(chunks)}")
-    save_chunks(chunks, NEPHRO_TXT_PATH)
-    print(f"Saved chunks to {NEPHRO_TXT_PATH}")
-    embeddings = embed_chunks(chunks)
-    save_faiss_index(embeddings, FAISS_INDEX_PATH)
-    print(f"Saved FAISS index to {FAISS_INDEX_PATH}") 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build or update the knowledge base (chunk store, FAISS and BM25 indexes) from URLs and local files.")
+    parser.add_argument('sources', nargs='*', default=[URL], help=f"URLs, files ({', '.join(SUPPORTED_EXTENSIONS)}) or directories; defaults to the nephrology textbook")
+    parser.add_argument('--resume', action='store_true', help=f"continue an interrupted run from its checkpoint in {INGEST_WORK_DIR}")
+    parser.add_argument('--rebuild', action='store_true', help="re-embed every chunk and rebuild the indexes instead of updating the live knowledge base")
+    args = parser.parse_args()
+    stats = IngestionPipeline(expand_sources(args.sources), rebuild=args.rebuild).run(resume=args.resume)
+    print(f"Indexed {stats['chunks']} chunks from {stats['sources']} sources into {CHUNK_STORE_PATH}, {FAISS_INDEX_PATH} "
+          f"and {BM25_INDEX_PATH} ({stats['embedded']} embedded, {stats['removed']} removed)")
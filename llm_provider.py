@@ -0,0 +1,117 @@
+"""
+Chat model used by the receptionist and clinical agents, selected by ``LLM_PROVIDER``.
+
+``groq`` (default) is the hosted Groq model. ``fake`` is a deterministic local
+stand-in with configurable latency and token rate, so the agents, the API and
+the load tests run without network access or an API key.
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from dotenv import load_dotenv
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+load_dotenv()
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "groq")  # "groq" or "fake"
+LLM_MODEL = os.getenv("LLM_MODEL", "llama3-8b-8192")
+FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "300"))  # wait before the first token
+FAKE_LLM_TOKENS_PER_S = float(os.getenv("FAKE_LLM_TOKENS_PER_S", "200"))  # 0 returns the whole reply at once
+
+_GREETING = re.compile(r"^\s*(hi|hello|hey)?[,!.\s]*(i am|i'm|my name is|this is|it's)?\s*", re.IGNORECASE)
+_REPLIES = [
+    "Thank you for checking in. Keep taking your medications exactly as prescribed and follow your dietary "
+    "restrictions. If you notice swelling, shortness of breath or less urine than usual, contact your care team.",
+    "That is a common question after discharge. Monitor your blood pressure and weight daily, limit salt and fluids "
+    "as instructed, and bring your readings to your follow-up appointment.",
+    "I understand your concern. Mild tiredness can be expected while you recover, but new or worsening symptoms "
+    "should be reviewed by your nephrologist. Please call the clinic if it does not improve.",
+]
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic local stand-in for the Groq chat model, for load tests and offline runs.
+
+    Replies depend only on the prompt. Name-extraction prompts get the JSON the
+    receptionist's parser expects, with the name taken from the user input;
+    everything else gets one of a few canned answers. Each call waits
+    ``latency_ms`` before the first token and then emits whitespace-delimited
+    tokens at ``tokens_per_s``, in both blocking and streaming calls.
+    """
+
+    latency_ms: float = FAKE_LLM_LATENCY_MS
+    tokens_per_s: float = FAKE_LLM_TOKENS_PER_S
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def reply(self, messages: List[BaseMessage]) -> str:
+        prompt = str(messages[-1].content)
+        if "extracting patient names" in prompt and "User Input:" in prompt:
+            user_input = prompt.split("User Input:", 1)[1].split("\n", 1)[0]
+            name = _GREETING.sub("", user_input).strip(" .!,") or "NOT_FOUND"
+            return json.dumps({"patient_name": name, "confidence": "High", "reasoning": "fake model"})
+        return _REPLIES[zlib.crc32(prompt.encode("utf-8")) % len(_REPLIES)]
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        return re.findall(r"\S+\s*", self.reply(messages))
+
+    def _token_delay(self) -> float:
+        return 1 / self.tokens_per_s if self.tokens_per_s > 0 else 0.0
+
+    def _result(self, tokens: List[str]) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.latency_ms / 1000 + len(tokens) * self._token_delay())
+        return self._result(tokens)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.latency_ms / 1000 + len(tokens) * self._token_delay())
+        return self._result(tokens)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_ms / 1000)
+        for token in self._tokens(messages):
+            time.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency_ms / 1000)
+        for token in self._tokens(messages):
+            await asyncio.sleep(self._token_delay())
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+_llms = {}
+_llms_lock = threading.Lock()
+
+
+def get_llm(provider: str = LLM_PROVIDER) -> BaseChatModel:
+    """
+    Process-wide chat model for ``provider`` (``LLM_PROVIDER``): ``groq`` calls
+    ``LLM_MODEL`` on Groq with ``GROQ_API_KEY``; ``fake`` is ``FakeChatModel``,
+    paced by ``FAKE_LLM_LATENCY_MS`` and ``FAKE_LLM_TOKENS_PER_S``.
+    """
+    with _llms_lock:
+        if provider not in _llms:
+            if provider == "fake":
+                _llms[provider] = FakeChatModel()
+            elif provider == "groq":
+                from langchain_groq import ChatGroq
+                _llms[provider] = ChatGroq(api_key=os.getenv("GROQ_API_KEY"), model=LLM_MODEL)
+            else:
+                raise ValueError(f"Unknown LLM_PROVIDER {provider!r}; expected 'groq' or 'fake'")
+        return _llms[provider]
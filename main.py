@@ -1,5 +1,6 @@
 from receptionist_agent import ReceptionistAgent
-from clinical_agent import ClinicalAgent
+from clinical_agent import ClinicalAgent, WARMUP_RESOURCES
+from resources import registry
 import logging
 from datetime import datetime
 import os
@@ -154,6 +155,8 @@ def main():
         
         try:
             clinical = ClinicalAgent()
+            # Load retrieval models in the background while the receptionist identifies the patient
+            registry.warm_up(WARMUP_RESOURCES, background=True)
             logger.info("Clinical Agent initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Clinical Agent: {e}")
@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fuzzy_match import FuzzyNameMatcher
+from patient_store import PATIENTS_JSON_PATH, NGRAM_SIZE, normalize_name
+
+PATIENTS_DB_PATH = os.path.join("data", "patients.db")
+POOL_SIZE = 8
+CACHE_SIZE_KIB = 8192  # per-connection page cache budget
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    id INTEGER PRIMARY KEY,
+    patient_id TEXT,
+    patient_name TEXT NOT NULL,
+    name_norm TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_patients_name_norm ON patients(name_norm);
+CREATE INDEX IF NOT EXISTS idx_patients_patient_id ON patients(patient_id);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS patients_fts USING fts5(
+    name_norm, content='patients', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS patients_ai AFTER INSERT ON patients BEGIN
+    INSERT INTO patients_fts(rowid, name_norm) VALUES (new.id, new.name_norm);
+END;
+CREATE TRIGGER IF NOT EXISTS patients_ad AFTER DELETE ON patients BEGIN
+    INSERT INTO patients_fts(patients_fts, rowid, name_norm) VALUES ('delete', old.id, old.name_norm);
+END;
+CREATE TRIGGER IF NOT EXISTS patients_au AFTER UPDATE ON patients BEGIN
+    INSERT INTO patients_fts(patients_fts, rowid, name_norm) VALUES ('delete', old.id, old.name_norm);
+    INSERT INTO patients_fts(rowid, name_norm) VALUES (new.id, new.name_norm);
+END;
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    return conn
+
+
+def _create_schema(conn: sqlite3.Connection) -> bool:
+    """Create tables, indexes and FTS sync triggers. Returns whether the FTS5 trigram table is available."""
+    conn.executescript(SCHEMA)
+    had_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'patients_fts'").fetchone() is not None
+    try:
+        conn.executescript(FTS_SCHEMA)
+        if not had_fts:
+            # Populate the index for databases created before FTS was available
+            with conn:
+                conn.execute("INSERT INTO patients_fts(patients_fts) VALUES ('rebuild')")
+        return True
+    except sqlite3.OperationalError as e:
+        # FTS5 trigram tokenizer needs SQLite >= 3.34; fall back to instr() scans
+        logging.warning(f"FTS5 trigram index unavailable ({e}); partial matches will scan name_norm")
+        return False
+
+
+def import_patients_json(json_path: str = PATIENTS_JSON_PATH, db_path: str = PATIENTS_DB_PATH) -> int:
+    """Replace the contents of the SQLite patient database with the records in ``json_path``."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        patients = json.load(f)
+
+    conn = _connect(db_path)
+    try:
+        # Recreate the tables rather than only emptying them, so databases created with the
+        # old UNIQUE patient_id column accept duplicate ids like the JSON store does
+        conn.executescript("DROP TABLE IF EXISTS patients_fts; DROP TABLE IF EXISTS patients;")
+        has_fts = _create_schema(conn)
+        with conn:
+            conn.execute("DELETE FROM patients")
+            conn.executemany(
+                "INSERT INTO patients (patient_id, patient_name, name_norm, record) VALUES (?, ?, ?, ?)",
+                (
+                    (p.get("patient_id"), p["patient_name"], normalize_name(p["patient_name"]), json.dumps(p))
+                    for p in patients if "patient_name" in p
+                ),
+            )
+            if has_fts:
+                conn.execute("INSERT INTO patients_fts(patients_fts) VALUES ('rebuild')")
+        count = conn.execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+        conn.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+    logging.info(f"Imported {count} patient records from {json_path} into {db_path}")
+    return count
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shareable across FastAPI's worker threads."""
+
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=size)
+        for _ in range(size):
+            conn = _connect(path)
+            conn.execute("PRAGMA query_only=ON")
+            self._pool.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+class SQLitePatientStore:
+    """
+    Patient registry stored in a local SQLite file.
+
+    Exposes the same lookup methods as ``PatientStore`` so ``db.get_patient_report``
+    and the API do not care which backend is active. Exact lookups use the
+    ``name_norm`` index; partial lookups use the FTS5 trigram table.
+    """
+
+    def __init__(self, path: str = PATIENTS_DB_PATH, pool_size: int = POOL_SIZE):
+        self.path = path
+        if not os.path.exists(path):
+            logging.info(f"{path} not found, importing from {PATIENTS_JSON_PATH}")
+            import_patients_json(PATIENTS_JSON_PATH, path)
+        else:
+            conn = _connect(path)
+            try:
+                _create_schema(conn)
+            finally:
+                conn.close()
+        self.pool = ConnectionPool(path, pool_size)
+        self.pool_size = pool_size
+        with self.pool.connection() as conn:
+            self.has_fts = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'patients_fts'"
+            ).fetchone() is not None
+        self._matcher: Optional[FuzzyNameMatcher] = None
+        self._matcher_version = None
+        self._matcher_lock = threading.Lock()
+
+    @staticmethod
+    def _records(rows) -> List[Dict[str, Any]]:
+        return [json.loads(row[0]) for row in rows]
+
+    def reload(self):
+        """No-op: SQLite reads always see the latest committed data."""
+
+    def all(self) -> List[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            return self._records(conn.execute("SELECT record FROM patients ORDER BY id"))
+
+    def __len__(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+
+    def names(self) -> List[str]:
+        with self.pool.connection() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT name_norm FROM patients")]
+
+    def find_by_id(self, patient_id: str) -> Optional[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            # Duplicate ids resolve to the first record, as in the JSON store
+            row = conn.execute(
+                "SELECT record FROM patients WHERE patient_id = ? ORDER BY id LIMIT 1", (patient_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_exact(self, name: str) -> List[Dict[str, Any]]:
+        with self.pool.connection() as conn:
+            return self._records(conn.execute(
+                "SELECT record FROM patients WHERE name_norm = ? ORDER BY id", (normalize_name(name),)
+            ))
+
+    def find_partial(self, name: str) -> List[Dict[str, Any]]:
+        query = normalize_name(name)
+        with self.pool.connection() as conn:
+            if self.has_fts and len(query) >= NGRAM_SIZE:
+                phrase = '"' + query.replace('"', '""') + '"'
+                rows = conn.execute(
+                    "SELECT p.record, p.name_norm FROM patients_fts f JOIN patients p ON p.id = f.rowid "
+                    "WHERE patients_fts MATCH ? ORDER BY p.id",
+                    (phrase,),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT record, name_norm FROM patients WHERE instr(name_norm, ?) > 0 ORDER BY id", (query,)
+                ).fetchall()
+        # The trigram tokenizer folds case/diacritics, so re-check plain substring semantics
+        return [json.loads(record) for record, name_norm in rows if query in name_norm]
+
+    def _data_version(self):
+        wal = self.path + "-wal"
+        return os.path.getmtime(self.path), os.path.getmtime(wal) if os.path.exists(wal) else None
+
+    def find_fuzzy(self, name: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[float, List[Dict[str, Any]]]]:
+        """Ranked ``(score, records)`` for names close to ``name``; the matcher is rebuilt when the file changes."""
+        with self._matcher_lock:
+            version = self._data_version()
+            if self._matcher is None or version != self._matcher_version:
+                self._matcher = FuzzyNameMatcher(self.names())
+                self._matcher_version = version
+            matcher = self._matcher
+        return [(score, self.find_exact(n)) for n, score in matcher.search(normalize_name(name), limit=limit, min_score=min_score)]
+
+    def memory_usage(self) -> int:
+        """Upper bound on the page cache held by the pool's connections."""
+        return self.pool_size * CACHE_SIZE_KIB * 1024
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "records": len(self),
+            "fts_enabled": self.has_fts,
+            "db_bytes": os.path.getsize(self.path),
+            "memory_bytes": self.memory_usage(),
+        }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    src = sys.argv[1] if len(sys.argv) > 1 else PATIENTS_JSON_PATH
+    dst = sys.argv[2] if len(sys.argv) > 2 else PATIENTS_DB_PATH
+    print(f"Imported {import_patients_json(src, dst)} records into {dst}")
@@ -0,0 +1,305 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from fuzzy_match import FuzzyNameMatcher
+
+PATIENTS_JSON_PATH = os.path.join("data", "patients.json")
+RELOAD_CHECK_INTERVAL = 1.0  # seconds between mtime checks
+PATIENT_STORE_BACKEND = os.getenv("PATIENT_STORE_BACKEND", "json")  # "json" or "sqlite"
+# Typo-tolerant name fallback; when on, the fuzzy matcher is rebuilt as soon as the file changes
+PATIENT_FUZZY_MATCHING = os.getenv("PATIENT_FUZZY_MATCHING", "1") != "0"
+NGRAM_SIZE = 3
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase a patient name and collapse internal whitespace."""
+    return " ".join(str(name).lower().split())
+
+
+def name_trigrams(name: str) -> Set[str]:
+    """Return the set of character trigrams of an already-normalized name."""
+    return {name[i:i + NGRAM_SIZE] for i in range(len(name) - NGRAM_SIZE + 1)}
+
+
+def deep_sizeof(obj: Any) -> int:
+    """Approximate the memory held by ``obj`` and everything it references."""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return total
+
+
+def _record_keys(data: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Key records for diffing between reloads: by patient_id, or by normalized
+    name for records without one, plus an occurrence counter so records that
+    share an id or name are all kept. Inserting or removing a record only
+    changes the keys of records sharing its id or name.
+    """
+    keyed = {}
+    seen: Dict[str, int] = {}
+    for record in data:
+        if "patient_name" not in record:
+            continue
+        patient_id = record.get("patient_id")
+        base = f"id:{patient_id}" if patient_id else f"name:{normalize_name(record['patient_name'])}"
+        occurrence = seen.get(base, 0)
+        seen[base] = occurrence + 1
+        keyed[f"{base}#{occurrence}"] = record
+    duplicates = sorted(base[3:] for base, count in seen.items() if count > 1 and base.startswith("id:"))
+    if duplicates:
+        logging.warning(f"{len(duplicates)} patient ids appear more than once: {', '.join(duplicates[:10])}")
+    return keyed
+
+
+class PatientStore:
+    """
+    In-memory patient registry backed by ``data/patients.json``.
+
+    The file is parsed once and kept behind three indexes:
+    - normalized name -> records (exact lookups)
+    - patient_id -> record
+    - trigram -> normalized names (partial/substring lookups)
+
+    Each lookup stats the file at most once per ``check_interval`` seconds and,
+    if its mtime changed, re-parses it and patches only the index entries of
+    records that were added, removed or modified. The fuzzy name matcher is
+    then rebuilt outside the lock and swapped in, so other lookups never wait
+    for it; fuzzy lookups keep using the previous matcher until it is ready.
+    """
+
+    def __init__(self, path: str = PATIENTS_JSON_PATH, check_interval: float = RELOAD_CHECK_INTERVAL,
+                 fuzzy_matching: bool = PATIENT_FUZZY_MATCHING):
+        self.path = path
+        self.check_interval = check_interval
+        self.fuzzy_matching = fuzzy_matching
+        self._lock = threading.RLock()
+        self._mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._by_name: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._trigrams: Dict[str, Set[str]] = {}
+        self._memory_bytes: Optional[int] = None
+        self._matcher: Optional[FuzzyNameMatcher] = None
+        self._generation = 0  # bumped whenever the set of records changes
+        self._matcher_generation = -1
+
+    # --- Loading ---
+    def _read_file(self) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            logging.error(f"{self.path} not found")
+        except json.JSONDecodeError as e:
+            logging.error(f"Error parsing {self.path}: {e}")
+        return None
+
+    def _refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and self._mtime is not None and now - self._last_check < self.check_interval:
+            return
+        if self._reload_file(now, force) and self.fuzzy_matching:
+            self._rebuild_matcher()
+
+    def _reload_file(self, now: float, force: bool) -> bool:
+        """Re-read the file if it changed; returns whether any record changed."""
+        with self._lock:
+            self._last_check = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                if self._mtime is None:
+                    logging.error(f"{self.path} not found")
+                    self._mtime = 0.0
+                return False
+            if not force and mtime == self._mtime:
+                return False
+            data = self._read_file()
+            if data is None:
+                # Keep serving the last good snapshot if the file is mid-write or broken
+                return False
+            changed = self._apply(data)
+            self._mtime = mtime
+            return changed
+
+    def _apply(self, data: List[Dict[str, Any]]) -> bool:
+        incoming = _record_keys(data)
+        removed = [k for k in self._records if k not in incoming]
+        changed = [k for k, p in incoming.items() if self._records.get(k) != p]
+
+        touched_ids = set()
+        for key in removed:
+            record = self._records.pop(key)
+            touched_ids.add(record.get("patient_id"))
+            self._unindex(record)
+        for key in changed:
+            if key in self._records:
+                touched_ids.add(self._records[key].get("patient_id"))
+                self._unindex(self._records[key])
+            self._records[key] = incoming[key]
+            touched_ids.add(incoming[key].get("patient_id"))
+            self._index(incoming[key])
+        # A shared id resolves to its first record in the file
+        for patient_id in touched_ids - {None, ""}:
+            record = self._records.get(f"id:{patient_id}#0")
+            if record is None:
+                self._by_id.pop(patient_id, None)
+            else:
+                self._by_id[patient_id] = record
+
+        if removed or changed:
+            self._memory_bytes = None
+            self._generation += 1
+            logging.info(
+                f"Patient store refreshed from {self.path}: {len(self._records)} records "
+                f"({len(changed)} added/changed, {len(removed)} removed)"
+            )
+            return True
+        return False
+
+    def _index(self, record: Dict[str, Any]):
+        name = normalize_name(record["patient_name"])
+        bucket = self._by_name.setdefault(name, [])
+        if not bucket:
+            for gram in name_trigrams(name):
+                self._trigrams.setdefault(gram, set()).add(name)
+        bucket.append(record)
+
+    def _unindex(self, record: Dict[str, Any]):
+        name = normalize_name(record["patient_name"])
+        bucket = self._by_name.get(name, [])
+        bucket[:] = [r for r in bucket if r is not record]
+        if not bucket:
+            self._by_name.pop(name, None)
+            for gram in name_trigrams(name):
+                names = self._trigrams.get(gram)
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del self._trigrams[gram]
+
+    def _rebuild_matcher(self) -> FuzzyNameMatcher:
+        with self._lock:
+            generation = self._generation
+            names = list(self._by_name)
+        # Building takes seconds at hundreds of thousands of names; do it without holding the lock
+        matcher = FuzzyNameMatcher(names)
+        with self._lock:
+            if self._generation == generation:
+                self._matcher = matcher
+                self._matcher_generation = generation
+        return matcher
+
+    def reload(self):
+        """Force a re-read of the backing file."""
+        self._refresh(force=True)
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the records and indexes (cached until the next change)."""
+        self._refresh()
+        with self._lock:
+            if self._memory_bytes is None:
+                self._memory_bytes = deep_sizeof([self._records, self._by_name, self._by_id, self._trigrams])
+            return self._memory_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        self._refresh()
+        with self._lock:
+            return {
+                "backend": "json",
+                "path": self.path,
+                "records": len(self._records),
+                "distinct_names": len(self._by_name),
+                "trigrams": len(self._trigrams),
+                "memory_bytes": self.memory_usage(),
+            }
+
+    # --- Lookups ---
+    def all(self) -> List[Dict[str, Any]]:
+        self._refresh()
+        with self._lock:
+            return list(self._records.values())
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self._records)
+
+    def find_by_id(self, patient_id: str) -> Optional[Dict[str, Any]]:
+        self._refresh()
+        return self._by_id.get(patient_id)
+
+    def find_exact(self, name: str) -> List[Dict[str, Any]]:
+        """Records whose normalized name equals ``name`` (case insensitive)."""
+        self._refresh()
+        with self._lock:
+            return list(self._by_name.get(normalize_name(name), []))
+
+    def find_partial(self, name: str) -> List[Dict[str, Any]]:
+        """Records whose normalized name contains ``name`` as a substring."""
+        self._refresh()
+        query = normalize_name(name)
+        with self._lock:
+            if len(query) < NGRAM_SIZE:
+                # Too short to use the trigram index; scan distinct names instead
+                candidates = self._by_name.keys()
+            else:
+                postings = sorted((self._trigrams.get(g, set()) for g in name_trigrams(query)), key=len)
+                if not postings or not postings[0]:
+                    return []
+                candidates = set(postings[0]).intersection(*postings[1:])
+            return [r for n in candidates if query in n for r in self._by_name[n]]
+
+    def find_fuzzy(self, name: str, limit: int = 5, min_score: float = 0.0) -> List[Tuple[float, List[Dict[str, Any]]]]:
+        """Ranked ``(score, records)`` for names close to ``name``."""
+        self._refresh()
+        matcher = self._matcher
+        # With fuzzy_matching on, reloads rebuild the matcher themselves; otherwise it is built on demand
+        if matcher is None or (not self.fuzzy_matching and self._matcher_generation != self._generation):
+            matcher = self._rebuild_matcher()
+        matches = matcher.search(normalize_name(name), limit=limit, min_score=min_score)
+        with self._lock:
+            # The matcher may predate the last reload; drop names that have since gone
+            results = [(score, list(self._by_name.get(n, []))) for n, score in matches]
+        return [(score, records) for score, records in results if records]
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_patient_store():
+    """
+    Return the process-wide patient store, creating it on first use.
+
+    The receptionist (via ``db.get_patient_report``) and the ``/patients`` API
+    both go through this object so they always see the same snapshot.
+    Set ``PATIENT_STORE_BACKEND=sqlite`` to serve lookups from ``data/patients.db``.
+    """
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                if PATIENT_STORE_BACKEND == "sqlite":
+                    from patient_sqlite import PATIENTS_DB_PATH, SQLitePatientStore
+                    _default_store = SQLitePatientStore(os.getenv("PATIENT_DB_PATH", PATIENTS_DB_PATH))
+                else:
+                    _default_store = PatientStore()
+    return _default_store
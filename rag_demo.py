@@ -1,33 +1,31 @@
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from langchain_groq import ChatGroq  # Make sure you have the groq package installed
-import os
+from llm_provider import get_llm
 from dotenv import load_dotenv
+from chunk_store import ChunkStore
+from inference_backend import load_embedder
 
 load_dotenv()
 # Paths
 FAISS_INDEX_PATH = "data/nephro_faiss.index"
-NEPHRO_TXT_PATH = "data/nephro.txt"
-GROQ_API_KEY=os.getenv("GROQ_API_KEY")
+CHUNK_STORE_PATH = "data/nephro_chunks"
 
-# Load text chunks
-with open(NEPHRO_TXT_PATH, "r", encoding="utf-8") as f:
-    chunks = [chunk.strip() for chunk in f.read().split("\n\n") if chunk.strip()]
+# Load text chunks (the FAISS index returns chunk ids, which the chunk store maps to chunks)
+chunks = ChunkStore.open(CHUNK_STORE_PATH)
 
 # Load FAISS index
 index = faiss.read_index(FAISS_INDEX_PATH)
 
-# Load embedding model
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# Load embedding model (INFERENCE_BACKEND=onnx must match what ingestion used)
+model = load_embedder("all-MiniLM-L6-v2")
 
-# Set up Groq LLM
-llm = ChatGroq(api_key=GROQ_API_KEY, model="llama3-8b-8192")  # Replace with your key and model
+# Set up the LLM (Groq by default; LLM_PROVIDER=fake runs offline)
+llm = get_llm()
 
 def retrieve(query, k=5):
     query_vec = model.encode([query])
     D, I = index.search(np.array(query_vec).astype("float32"), k)
-    return [chunks[i] for i in I[0]]
+    return [chunks[int(i)] for i in chunks.positions(I[0]) if i >= 0]
 
 def rag_answer(question):
     context_chunks = retrieve(question, k=5)
@@ -1,20 +1,21 @@
+import asyncio
 import logging
-from langchain_groq import ChatGroq
+from llm_provider import get_llm
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.chat_history import InMemoryChatMessageHistory
+from langchain_core.messages import messages_from_dict, messages_to_dict
 from pydantic import BaseModel, Field
 from langchain_core.output_parsers import PydanticOutputParser
-import os
 from dotenv import load_dotenv
 from db import get_patient_report
 
 load_dotenv()
 
-# Initialize Groq LLM
-llm = ChatGroq(api_key=os.getenv("GROQ_API_KEY"), model="llama3-8b-8192")
+# Initialize the LLM (Groq, or the local fake with LLM_PROVIDER=fake)
+llm = get_llm()
 
 # Pydantic model for structured name extraction
 class NameExtraction(BaseModel):
@@ -108,69 +109,110 @@ class ReceptionistAgent:
         self.topics_covered = set()  # Track what we've already discussed
         logging.info("Receptionist agent state reset for new conversation")
 
+    def to_state(self) -> dict:
+        """JSON-serializable conversation state, for storing the session outside this process"""
+        return {
+            "patient_name": self.patient_name,
+            "patient_report": self.patient_report,
+            "state": self.state,
+            "conversation_stage": self.conversation_stage,
+            "topics_covered": sorted(self.topics_covered),
+            "chat_history": messages_to_dict(self.chat_history.messages),
+        }
+
+    @classmethod
+    def from_state(cls, data: dict) -> "ReceptionistAgent":
+        """Rebuild an agent from ``to_state()`` output"""
+        agent = cls()
+        agent.patient_name = data.get("patient_name")
+        agent.patient_report = data.get("patient_report")
+        agent.state = data.get("state", "ask_name")
+        agent.conversation_stage = data.get("conversation_stage", "initial")
+        agent.topics_covered = set(data.get("topics_covered", []))
+        agent.chat_history.add_messages(messages_from_dict(data.get("chat_history", [])))
+        return agent
+
+    def _name_extraction_inputs(self, user_input):
+        return {
+            "user_input": user_input,
+            "format_instructions": name_extraction_parser.get_format_instructions()
+        }
+
+    def _name_from_extraction(self, result, user_input):
+        """Turn the structured extraction result into a patient name"""
+        logging.info(f"Name extraction result: {result.patient_name}, Confidence: {result.confidence}, Reasoning: {result.reasoning}")
+        
+        # Handle case where LLM returns a list instead of string
+        patient_name = result.patient_name
+        if isinstance(patient_name, list) and len(patient_name) > 0:
+            patient_name = patient_name[0]
+        
+        # If high or medium confidence and name found, return it
+        if result.confidence in ["High", "Medium"] and patient_name != "NOT_FOUND":
+            return str(patient_name).strip().title()
+        
+        # If low confidence or not found, check if it's just a plain name
+        elif patient_name == "NOT_FOUND":
+            # Fallback to basic regex for simple name patterns
+            import re
+            # Remove common greeting words and check if remaining text looks like a name
+            cleaned_input = re.sub(r'\b(hi|hello|hey|good|morning|afternoon|evening|i|am|my|name|is|this)\b', '', user_input.lower(), flags=re.IGNORECASE).strip()
+            
+            # Check if remaining text contains probable name pattern (2-4 words, mostly letters)
+            name_pattern = re.match(r'^[a-zA-Z\s]{2,50}$', cleaned_input.strip())
+            if name_pattern and len(cleaned_input.strip().split()) <= 4:
+                extracted_name = cleaned_input.strip().title()
+                logging.info(f"Fallback extraction found: {extracted_name}")
+                return extracted_name
+            
+            # If still no luck, return the original input cleaned up
+            return user_input.strip().title()
+        
+        else:
+            return str(patient_name).strip().title()
+
+    def _regex_fallback_name(self, user_input):
+        """Extract a name with regular expressions when the structured extraction fails"""
+        # Fallback to improved regex method
+        import re
+        
+        # Try common patterns first
+        patterns = [
+            r"(?:hi|hello|hey),?\s+(?:i\s+am|i'm|my\s+name\s+is|this\s+is)\s+([a-zA-Z\s]+)",
+            r"(?:my\s+name\s+is|i\s+am|i'm)\s+([a-zA-Z\s]+)",
+            r"^([a-zA-Z\s]+)$"  # Just a plain name
+        ]
+        
+        for pattern in patterns:
+            match = re.search(pattern, user_input.lower())
+            if match:
+                extracted_name = match.group(1).strip().title()
+                # Validate it looks like a reasonable name (not too long, not common words)
+                if len(extracted_name.split()) <= 4 and not any(word in extracted_name.lower() for word in ['help', 'info', 'discharge', 'need']):
+                    logging.info(f"Regex fallback extraction: {extracted_name}")
+                    return extracted_name
+        
+        # Final fallback
+        return user_input.strip().title()
+
     def extract_name(self, user_input):
         """Extract patient name using structured output with LangChain"""
         try:
             # Use the structured output chain to extract name
-            result = self.name_extraction_chain.invoke({
-                "user_input": user_input,
-                "format_instructions": name_extraction_parser.get_format_instructions()
-            })
-            
-            logging.info(f"Name extraction result: {result.patient_name}, Confidence: {result.confidence}, Reasoning: {result.reasoning}")
-            
-            # Handle case where LLM returns a list instead of string
-            patient_name = result.patient_name
-            if isinstance(patient_name, list) and len(patient_name) > 0:
-                patient_name = patient_name[0]
-            
-            # If high or medium confidence and name found, return it
-            if result.confidence in ["High", "Medium"] and patient_name != "NOT_FOUND":
-                return str(patient_name).strip().title()
-            
-            # If low confidence or not found, check if it's just a plain name
-            elif patient_name == "NOT_FOUND":
-                # Fallback to basic regex for simple name patterns
-                import re
-                # Remove common greeting words and check if remaining text looks like a name
-                cleaned_input = re.sub(r'\b(hi|hello|hey|good|morning|afternoon|evening|i|am|my|name|is|this)\b', '', user_input.lower(), flags=re.IGNORECASE).strip()
-                
-                # Check if remaining text contains probable name pattern (2-4 words, mostly letters)
-                name_pattern = re.match(r'^[a-zA-Z\s]{2,50}$', cleaned_input.strip())
-                if name_pattern and len(cleaned_input.strip().split()) <= 4:
-                    extracted_name = cleaned_input.strip().title()
-                    logging.info(f"Fallback extraction found: {extracted_name}")
-                    return extracted_name
-                
-                # If still no luck, return the original input cleaned up
-                return user_input.strip().title()
-            
-            else:
-                return str(patient_name).strip().title()
-                
+            result = self.name_extraction_chain.invoke(self._name_extraction_inputs(user_input))
+            return self._name_from_extraction(result, user_input)
         except Exception as e:
             logging.error(f"Error in structured name extraction: {e}")
-            # Fallback to improved regex method
-            import re
-            
-            # Try common patterns first
-            patterns = [
-                r"(?:hi|hello|hey),?\s+(?:i\s+am|i'm|my\s+name\s+is|this\s+is)\s+([a-zA-Z\s]+)",
-                r"(?:my\s+name\s+is|i\s+am|i'm)\s+([a-zA-Z\s]+)",
-                r"^([a-zA-Z\s]+)$"  # Just a plain name
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, user_input.lower())
-                if match:
-                    extracted_name = match.group(1).strip().title()
-                    # Validate it looks like a reasonable name (not too long, not common words)
-                    if len(extracted_name.split()) <= 4 and not any(word in extracted_name.lower() for word in ['help', 'info', 'discharge', 'need']):
-                        logging.info(f"Regex fallback extraction: {extracted_name}")
-                        return extracted_name
-            
-            # Final fallback
-            return user_input.strip().title()
+            return self._regex_fallback_name(user_input)
+
+    async def aextract_name(self, user_input):
+        """Async ``extract_name``"""
+        try:
+            result = await self.name_extraction_chain.ainvoke(self._name_extraction_inputs(user_input))
+            return self._name_from_extraction(result, user_input)
+        except Exception as e:
+            logging.error(f"Error in structured name extraction: {e}")
+            return self._regex_fallback_name(user_input)
 
     def analyze_user_input(self, user_input):
         """Analyze user input to determine intent and response type needed"""
@@ -251,7 +293,8 @@ class ReceptionistAgent:
         """Handle the end of conversation and provide closing response"""
         return "Thank you for using our service! Take care and don't hesitate to reach out if you have any questions. Goodbye!"
 
-    def interact(self, user_input, session_id="user-session"):
+    def _start_turn(self, user_input):
+        """Handle conversation endings and restarts; returns a reply when the turn is already complete"""
         logging.info(f"Receptionist - State: {self.state}, Stage: {self.conversation_stage}, Input: {user_input}")
 
         # Check if user is ending the conversation
@@ -264,70 +307,130 @@ class ReceptionistAgent:
         if self.state != 'ask_name' and self.is_new_conversation_start(user_input):
             logging.info("Detected new conversation start while in follow_up state - resetting")
             self.reset_state()
+        return None
+
+    def _handle_patient_lookup(self, user_input, report, status):
+        if status == 'not_found':
+            logging.warning(f"Patient not found: {self.patient_name}")
+            # Check if user provided a greeting without clear name
+            if self.has_greeting_with_name(user_input) or any(word in user_input.lower() for word in ['hello', 'hi', 'hey']):
+                return "Hello! I'd be happy to help you with your discharge information. I couldn't find your record in our system. Could you please provide your full name as it appears in your medical records?", False
+            else:
+                return "I'm sorry, I couldn't find your record in our system. Could you please double-check the spelling of your name?", False
+        elif status == 'multiple_found':
+            return "I found multiple patients with that name. Could you please provide your full name or date of birth to help me locate the correct record?", False
+        else:
+            self.patient_report = report
+            self.state = 'follow_up'
+            self.conversation_stage = 'post_greeting'
+            
+            # Create more natural greeting based on how user introduced themselves
+            if self.has_greeting_with_name(user_input):
+                # User said something like "Hi, I am John Smith"
+                greeting = f"Hello {self.patient_name}! Nice to meet you. I have your discharge information from {report['discharge_date']} for {report['primary_diagnosis']}. How are you feeling today?"
+            else:
+                # User just provided name
+                greeting = f"Hi {self.patient_name}! I have your discharge information from {report['discharge_date']} for {report['primary_diagnosis']}. How are you feeling today?"
+            
+            return greeting, True
+
+    def _prepare_follow_up(self, user_input):
+        """Returns (reply, None) when no LLM call is needed, otherwise (None, contextual chain inputs)"""
+        user_analysis = self.analyze_user_input(user_input)
+        
+        # Route to clinical if medical concerns detected
+        if user_analysis['has_medical_concern']:
+            self.state = 'route_clinical'
+            return ("I understand you have some medical concerns. Let me connect you with our Clinical AI Agent who can better assist you with those symptoms.", 'route_clinical'), None
+
+        if not self.patient_report:
+            return ("I'm having trouble accessing your medical records. Could you please confirm your name again?", False), None
+
+        # Update conversation stage
+        if self.conversation_stage == 'post_greeting':
+            self.conversation_stage = 'ongoing'
+        
+        # Get contextual guidance
+        guidance = self.get_contextual_response_guidance(user_analysis)
+        
+        inputs = {
+            "patient_name": self.patient_report.get("patient_name", "Patient"),
+            "diagnosis": self.patient_report.get("primary_diagnosis", "N/A"),
+            "discharge_date": self.patient_report.get("discharge_date", "N/A"),
+            "medications": ", ".join(self.patient_report.get("medications", [])),
+            "diet": self.patient_report.get("dietary_restrictions", "N/A"),
+            "follow_up": self.patient_report.get("follow_up", "N/A"),
+            "warning_signs": self.patient_report.get("warning_signs", "N/A"),
+            "instructions": self.patient_report.get("discharge_instructions", "N/A"),
+            "user_input": user_input + (f"\n\nContext Guidance: {guidance}" if guidance else "")
+        }
+        return None, inputs
+
+    def _fallback_reply(self):
+        if self.state == 'route_clinical':
+            return "[Clinical Agent takes over]", 'handoff'
+        return "I'm not sure how to help with that. Could you please rephrase your question?", False
+
+    def interact(self, user_input, session_id="user-session"):
+        reply = self._start_turn(user_input)
+        if reply is not None:
+            return reply
 
         if self.state == 'ask_name':
             self.patient_name = self.extract_name(user_input)
             report, status = get_patient_report(self.patient_name)
-
-            if status == 'not_found':
-                logging.warning(f"Patient not found: {self.patient_name}")
-                # Check if user provided a greeting without clear name
-                if self.has_greeting_with_name(user_input) or any(word in user_input.lower() for word in ['hello', 'hi', 'hey']):
-                    return "Hello! I'd be happy to help you with your discharge information. I couldn't find your record in our system. Could you please provide your full name as it appears in your medical records?", False
-                else:
-                    return "I'm sorry, I couldn't find your record in our system. Could you please double-check the spelling of your name?", False
-            elif status == 'multiple_found':
-                return "I found multiple patients with that name. Could you please provide your full name or date of birth to help me locate the correct record?", False
-            else:
-                self.patient_report = report
-                self.state = 'follow_up'
-                self.conversation_stage = 'post_greeting'
-                
-                # Create more natural greeting based on how user introduced themselves
-                if self.has_greeting_with_name(user_input):
-                    # User said something like "Hi, I am John Smith"
-                    greeting = f"Hello {self.patient_name}! Nice to meet you. I have your discharge information from {report['discharge_date']} for {report['primary_diagnosis']}. How are you feeling today?"
-                else:
-                    # User just provided name
-                    greeting = f"Hi {self.patient_name}! I have your discharge information from {report['discharge_date']} for {report['primary_diagnosis']}. How are you feeling today?"
-                
-                return greeting, True
+            return self._handle_patient_lookup(user_input, report, status)
 
         elif self.state == 'follow_up':
-            user_analysis = self.analyze_user_input(user_input)
-            
-            # Route to clinical if medical concerns detected
-            if user_analysis['has_medical_concern']:
-                self.state = 'route_clinical'
-                return "I understand you have some medical concerns. Let me connect you with our Clinical AI Agent who can better assist you with those symptoms.", 'route_clinical'
-
-            if self.patient_report:
-                # Update conversation stage
-                if self.conversation_stage == 'post_greeting':
-                    self.conversation_stage = 'ongoing'
-                
-                # Get contextual guidance
-                guidance = self.get_contextual_response_guidance(user_analysis)
-                
-                inputs = {
-                    "patient_name": self.patient_report.get("patient_name", "Patient"),
-                    "diagnosis": self.patient_report.get("primary_diagnosis", "N/A"),
-                    "discharge_date": self.patient_report.get("discharge_date", "N/A"),
-                    "medications": ", ".join(self.patient_report.get("medications", [])),
-                    "diet": self.patient_report.get("dietary_restrictions", "N/A"),
-                    "follow_up": self.patient_report.get("follow_up", "N/A"),
-                    "warning_signs": self.patient_report.get("warning_signs", "N/A"),
-                    "instructions": self.patient_report.get("discharge_instructions", "N/A"),
-                    "user_input": user_input + (f"\n\nContext Guidance: {guidance}" if guidance else "")
-                }
-                
-                result = self.contextual_chain.invoke(inputs, config={"configurable": {"session_id": session_id}})
-                return result.strip(), True
-            else:
-                return "I'm having trouble accessing your medical records. Could you please confirm your name again?", False
+            reply, inputs = self._prepare_follow_up(user_input)
+            if reply is not None:
+                return reply
+            result = self.contextual_chain.invoke(inputs, config={"configurable": {"session_id": session_id}})
+            return result.strip(), True
 
-        elif self.state == 'route_clinical':
-            return "[Clinical Agent takes over]", 'handoff'
+        return self._fallback_reply()
 
-        else:
-            return "I'm not sure how to help with that. Could you please rephrase your question?", False
+    async def _aidentify_patient(self, user_input):
+        self.patient_name = await self.aextract_name(user_input)
+        report, status = await asyncio.to_thread(get_patient_report, self.patient_name)
+        return self._handle_patient_lookup(user_input, report, status)
+
+    async def ainteract(self, user_input, session_id="user-session"):
+        """Async ``interact``: the LLM calls are awaited and the patient lookup runs in a worker thread"""
+        reply = self._start_turn(user_input)
+        if reply is not None:
+            return reply
+
+        if self.state == 'ask_name':
+            return await self._aidentify_patient(user_input)
+
+        elif self.state == 'follow_up':
+            reply, inputs = self._prepare_follow_up(user_input)
+            if reply is not None:
+                return reply
+            result = await self.contextual_chain.ainvoke(inputs, config={"configurable": {"session_id": session_id}})
+            return result.strip(), True
+
+        return self._fallback_reply()
+
+    async def astream(self, user_input, session_id="user-session"):
+        """
+        Async generator over one turn: ``("token", text)`` while the contextual
+        chain generates, then ``("done", (response, status))``. Turns answered
+        without the LLM produce only the final event.
+        """
+        reply = self._start_turn(user_input)
+        if reply is None and self.state == 'follow_up':
+            reply, inputs = self._prepare_follow_up(user_input)
+            if reply is None:
+                parts = []
+                async for token in self.contextual_chain.astream(inputs, config={"configurable": {"session_id": session_id}}):
+                    parts.append(token)
+                    yield "token", token
+                reply = ("".join(parts).strip(), True)
+        elif reply is None and self.state == 'ask_name':
+            # Name lookup replies are short templates; only the LLM answers are worth streaming
+            reply = await self._aidentify_patient(user_input)
+        elif reply is None:
+            reply = self._fallback_reply()
+        yield "done", reply
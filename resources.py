@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Threads for CPU-bound model work (embedding, reranking, index search) on the async request path.
+# Torch, numpy and FAISS release the GIL, so a few threads keep the cores busy without oversubscribing them.
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+class ResourceRegistry:
+    """
+    Process-wide registry of expensive shared objects (models, indexes, corpora).
+
+    Each resource is registered with a zero-argument loader and is built on the
+    first ``get()``. Loads are guarded by a per-resource lock, so concurrent
+    callers wait for a single load instead of racing, and the wall-clock cost of
+    every load is kept for ``status()``.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._values: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._load_seconds: Dict[str, float] = {}
+        self._errors: Dict[str, str] = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        with self._registry_lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str) -> Any:
+        if name in self._values:
+            return self._values[name]
+        if name not in self._loaders:
+            raise KeyError(f"Unknown resource: {name}")
+        with self._locks[name]:
+            if name not in self._values:
+                start = time.perf_counter()
+                try:
+                    value = self._loaders[name]()
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    logging.error(f"Failed to load resource {name}: {e}")
+                    raise
+                self._load_seconds[name] = time.perf_counter() - start
+                self._errors.pop(name, None)
+                self._values[name] = value
+                logging.info(f"Loaded resource {name} in {self._load_seconds[name]:.2f}s")
+        return self._values[name]
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._values
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+        """Load ``names`` (default: everything registered), optionally on a daemon thread."""
+        names = list(names) if names is not None else list(self._loaders)
+
+        def _load_all():
+            start = time.perf_counter()
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    pass  # already logged; the request path will retry and surface the error
+            logging.info(f"Resource warm-up finished in {time.perf_counter() - start:.2f}s")
+
+        if not background:
+            _load_all()
+            return None
+        thread = threading.Thread(target=_load_all, name="resource-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "loaded": name in self._values,
+                "load_seconds": round(self._load_seconds[name], 3) if name in self._load_seconds else None,
+                "error": self._errors.get(name),
+            }
+            for name in self._loaders
+        }
+
+
+registry = ResourceRegistry()
+
+_cpu_executor: Optional[ThreadPoolExecutor] = None
+_cpu_executor_lock = threading.Lock()
+
+
+def get_cpu_executor() -> ThreadPoolExecutor:
+    """Dedicated executor for CPU-bound work, kept apart from the event loop's default I/O threadpool."""
+    global _cpu_executor
+    if _cpu_executor is None:
+        with _cpu_executor_lock:
+            if _cpu_executor is None:
+                _cpu_executor = ThreadPoolExecutor(max_workers=CPU_EXECUTOR_WORKERS, thread_name_prefix="cpu-worker")
+    return _cpu_executor
+
+
+async def run_cpu_bound(func: Callable, *args, **kwargs) -> Any:
+    """Run ``func(*args, **kwargs)`` on the CPU executor without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), partial(func, *args, **kwargs))
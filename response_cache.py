@@ -0,0 +1,175 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Optional, Sequence, Tuple
+
+import numpy as np
+
+CLINICAL_RESPONSE_CACHE = os.getenv("CLINICAL_RESPONSE_CACHE", "0") != "0"
+CLINICAL_RESPONSE_CACHE_THRESHOLD = float(os.getenv("CLINICAL_RESPONSE_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+CLINICAL_RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("CLINICAL_RESPONSE_CACHE_TTL_SECONDS", "86400"))
+CLINICAL_RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("CLINICAL_RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+KB_CHECK_INTERVAL = 1.0  # seconds between mtime checks of the knowledge base files
+NAME_PLACEHOLDERS = ("\x00patient_name\x00", "\x00patient_first_name\x00")  # full name, first name
+
+ContextKey = Tuple[str, FrozenSet[str], str]
+
+
+def context_key(patient_report: dict) -> ContextKey:
+    """
+    Patient context an answer depends on: the diagnosis, the set of medications
+    (both case-insensitively) and the discharge date, which the prompt includes
+    and answers may refer to.
+    """
+    diagnosis = " ".join(str(patient_report.get("primary_diagnosis", "")).lower().split())
+    medications = frozenset(" ".join(str(m).lower().split()) for m in patient_report.get("medications", []))
+    return diagnosis, medications, str(patient_report.get("discharge_date", "")).strip()
+
+
+def _name_forms(patient_report: dict) -> Tuple[str, str]:
+    """Full name and first name, matching ``NAME_PLACEHOLDERS``."""
+    name = " ".join(str(patient_report.get("patient_name", "")).split())
+    return name, name.split()[0] if name else ""
+
+
+def _template_names(response: str, patient_report: dict) -> str:
+    # Whole, case-sensitive words only, so a first name like "Ann" leaves "Annual" alone;
+    # the full name goes first so its first word is not replaced on its own
+    for form, placeholder in zip(_name_forms(patient_report), NAME_PLACEHOLDERS):
+        if len(form) > 1:
+            response = re.sub(rf"(?<!\w){re.escape(form)}(?!\w)", placeholder, response)
+    return response
+
+
+class _Entry:
+    __slots__ = ("key", "vector", "response", "created_at", "compute_seconds")
+
+    def __init__(self, key: ContextKey, vector: np.ndarray, response: str, compute_seconds: float):
+        self.key = key
+        self.vector = vector
+        self.response = response
+        self.created_at = time.monotonic()
+        self.compute_seconds = compute_seconds
+
+
+class ResponseCache:
+    """
+    Clinical answers reused across patients with the same diagnosis, medications
+    and discharge date.
+
+    A lookup hits when a stored query for the same context key has an embedding
+    within ``threshold`` cosine similarity of the new one and is younger than
+    ``ttl``. The patient's full and first name are stored as placeholders and
+    filled in with the current patient's on a hit. The cache is emptied when any of
+    ``kb_paths`` (the FAISS index and ingestion manifest) changes on disk, so
+    a re-ingested knowledge base is never answered from the old one. Entries
+    beyond ``max_entries`` are dropped oldest first.
+    """
+
+    def __init__(self, kb_paths: Sequence[str], threshold: float = CLINICAL_RESPONSE_CACHE_THRESHOLD,
+                 ttl: float = CLINICAL_RESPONSE_CACHE_TTL_SECONDS, max_entries: int = CLINICAL_RESPONSE_CACHE_MAX_ENTRIES):
+        self.kb_paths = list(kb_paths)
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._by_key: Dict[ContextKey, Dict[int, _Entry]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._kb_version = self._read_kb_version()
+        self._last_kb_check = time.monotonic()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "expired": 0, "invalidations": 0}
+        self._latency_saved = 0.0
+
+    # --- Knowledge base version ---
+    def _read_kb_version(self) -> Tuple[int, ...]:
+        version = []
+        for path in self.kb_paths:
+            try:
+                version.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                version.append(0)
+        return tuple(version)
+
+    def _check_kb(self):
+        now = time.monotonic()
+        if now - self._last_kb_check < KB_CHECK_INTERVAL:
+            return
+        self._last_kb_check = now
+        version = self._read_kb_version()
+        if version != self._kb_version:
+            self._kb_version = version
+            if self._entries:
+                logging.info(f"Knowledge base changed; dropped {len(self._entries)} cached clinical responses")
+            self._entries.clear()
+            self._by_key.clear()
+            self._counters["invalidations"] += 1
+
+    # --- Access ---
+    def get(self, patient_report: dict, query_vector) -> Optional[str]:
+        vector = self._unit(query_vector)
+        key = context_key(patient_report)
+        with self._lock:
+            self._check_kb()
+            now = time.monotonic()
+            candidates = self._by_key.get(key, {})
+            for entry_id in [i for i, e in candidates.items() if now - e.created_at > self.ttl]:
+                self._drop(entry_id)
+                self._counters["expired"] += 1
+            best, best_score = None, self.threshold
+            for entry in candidates.values():
+                score = float(np.dot(entry.vector, vector))
+                if score >= best_score:
+                    best, best_score = entry, score
+            if best is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["hits"] += 1
+            self._latency_saved += best.compute_seconds
+            response = best.response
+        for form, placeholder in zip(_name_forms(patient_report), NAME_PLACEHOLDERS):
+            response = response.replace(placeholder, form)
+        return response
+
+    def put(self, patient_report: dict, query_vector, response: str, compute_seconds: float):
+        response = _template_names(response, patient_report)
+        key = context_key(patient_report)
+        with self._lock:
+            self._check_kb()
+            entry_id = self._next_id
+            self._next_id += 1
+            entry = _Entry(key, self._unit(query_vector), response, compute_seconds)
+            self._entries[entry_id] = entry
+            self._by_key.setdefault(key, {})[entry_id] = entry
+            self._counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        bucket = self._by_key[entry.key]
+        del bucket[entry_id]
+        if not bucket:
+            del self._by_key[entry.key]
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    # --- Metrics ---
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "latency_saved_seconds": round(self._latency_saved, 3),
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl,
+            }
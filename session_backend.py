@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "local")  # "local", "memory" or "sqlite"
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join("data", "sessions.db"))
+
+
+class SessionConflictError(RuntimeError):
+    """A save lost the race: the stored session is no longer at the version the caller started from."""
+
+    def __init__(self, session_id: str, expected_version: int):
+        super().__init__(f"Session {session_id} changed since version {expected_version}")
+        self.session_id = session_id
+        self.expected_version = expected_version
+
+
+class SessionBackend(ABC):
+    """
+    Shared store for serialized session state, so any worker can rehydrate a session.
+
+    Every save bumps a per-session version; workers compare it with the version
+    they last saw to detect that another process has advanced the conversation.
+    Saves are conditional on that version, so of two workers finishing a turn
+    on the same session concurrently only the first one's state is kept.
+    """
+
+    @abstractmethod
+    def load(self, session_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        ...
+
+    @abstractmethod
+    def version(self, session_id: str) -> Optional[int]:
+        ...
+
+    @abstractmethod
+    def save(self, session_id: str, state: Dict[str, Any], expected_version: int) -> int:
+        """
+        Persist ``state`` if the stored version is still ``expected_version`` (0: the
+        session must not exist yet) and return its new version; otherwise raise
+        ``SessionConflictError``.
+        """
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def keys(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def purge_idle(self, idle_ttl: float) -> int:
+        """Remove sessions not saved for ``idle_ttl`` seconds. Returns how many were removed."""
+
+
+class InMemorySessionBackend(SessionBackend):
+    """Process-local backend that still round-trips state through JSON; intended for tests and single workers."""
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[int, str, float]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        with self._lock:
+            row = self._data.get(session_id)
+        return (row[0], json.loads(row[1])) if row else None
+
+    def version(self, session_id: str) -> Optional[int]:
+        row = self._data.get(session_id)
+        return row[0] if row else None
+
+    def save(self, session_id: str, state: Dict[str, Any], expected_version: int) -> int:
+        payload = json.dumps(state)
+        with self._lock:
+            current = self._data[session_id][0] if session_id in self._data else 0
+            if current != expected_version:
+                raise SessionConflictError(session_id, expected_version)
+            self._data[session_id] = (current + 1, payload, time.time())
+        return current + 1
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._data.pop(session_id, None) is not None
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._data)
+
+    def count(self) -> int:
+        return len(self._data)
+
+    def purge_idle(self, idle_ttl: float) -> int:
+        cutoff = time.time() - idle_ttl
+        with self._lock:
+            expired = [sid for sid, row in self._data.items() if row[2] < cutoff]
+            for session_id in expired:
+                del self._data[session_id]
+        return len(expired)
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Session state in a local SQLite file shared by every uvicorn worker on the host."""
+
+    def __init__(self, path: str = SESSION_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, version INTEGER NOT NULL, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions(updated_at)")
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, session_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        row = self._conn().execute("SELECT version, state FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def version(self, session_id: str) -> Optional[int]:
+        row = self._conn().execute("SELECT version FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return row[0] if row else None
+
+    def save(self, session_id: str, state: Dict[str, Any], expected_version: int) -> int:
+        conn = self._conn()
+        payload = json.dumps(state)
+        with conn:
+            if expected_version == 0:
+                row = conn.execute(
+                    "INSERT INTO sessions (session_id, version, state, updated_at) VALUES (?, 1, ?, ?) "
+                    "ON CONFLICT(session_id) DO NOTHING RETURNING version",
+                    (session_id, payload, time.time()),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "UPDATE sessions SET version = version + 1, state = ?, updated_at = ? "
+                    "WHERE session_id = ? AND version = ? RETURNING version",
+                    (payload, time.time(), session_id, expected_version),
+                ).fetchone()
+        if row is None:
+            raise SessionConflictError(session_id, expected_version)
+        return row[0]
+
+    def delete(self, session_id: str) -> bool:
+        conn = self._conn()
+        with conn:
+            return conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,)).rowcount > 0
+
+    def keys(self) -> List[str]:
+        return [row[0] for row in self._conn().execute("SELECT session_id FROM sessions ORDER BY updated_at")]
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def purge_idle(self, idle_ttl: float) -> int:
+        conn = self._conn()
+        with conn:
+            return conn.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - idle_ttl,)).rowcount
+
+
+def get_session_backend() -> Optional[SessionBackend]:
+    """Backend selected by ``SESSION_BACKEND``; ``local`` keeps sessions only in this process."""
+    if SESSION_BACKEND == "sqlite":
+        logging.info(f"Using SQLite session backend at {SESSION_DB_PATH}")
+        return SQLiteSessionBackend(SESSION_DB_PATH)
+    if SESSION_BACKEND == "memory":
+        return InMemorySessionBackend()
+    return None
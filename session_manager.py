@@ -0,0 +1,274 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from session_backend import SessionBackend, SessionConflictError
+
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "1000"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(256 * 1024 * 1024)))
+SESSION_IDLE_TTL_SECONDS = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "1800"))
+SESSION_SWEEP_INTERVAL_SECONDS = float(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "60"))
+SESSION_BASE_BYTES = 16 * 1024  # measured fixed cost of an idle session's agent objects
+
+
+def estimate_session_bytes(session: Dict[str, Any]) -> int:
+    """
+    Approximate the memory a session owns: the fixed agent overhead plus its
+    chat histories and patient report. Shared objects (LLM clients, chains,
+    models) are deliberately not counted.
+    """
+    total = SESSION_BASE_BYTES
+    receptionist = session.get("receptionist")
+    if receptionist is not None:
+        for message in getattr(receptionist.chat_history, "messages", []):
+            total += sys.getsizeof(message.content) + 256
+        total += sys.getsizeof(str(receptionist.patient_report or ""))
+    clinical = session.get("clinical")
+    if clinical is not None:
+        for turn in clinical.conversation_history:
+            total += sys.getsizeof(turn.get("query", "")) + sys.getsizeof(turn.get("response", ""))
+        total += sys.getsizeof(str(clinical.patient_report or ""))
+    return total
+
+
+class _Entry:
+    __slots__ = ("value", "created_at", "last_access", "size", "version")
+
+    def __init__(self, value: Dict[str, Any], size: int, version: int = 0):
+        self.value = value
+        self.created_at = self.last_access = time.monotonic()
+        self.size = size
+        self.version = version
+
+
+class SessionManager:
+    """
+    Bounded, thread-safe store of per-session agents.
+
+    Sessions are kept in LRU order and evicted when they have been idle longer
+    than ``idle_ttl``, when there are more than ``max_sessions``, or when their
+    estimated total size exceeds ``max_bytes``. Sizes are re-estimated on
+    ``touch()``, which callers invoke after each turn. A daemon thread sweeps
+    idle sessions every ``sweep_interval`` seconds.
+
+    With a ``backend``, the in-process entries become a cache: ``touch()``
+    writes the serialized session through to the backend, and ``get()``
+    rehydrates a session that is missing locally or was advanced by another
+    worker (its stored version is newer than the cached one). Evicting a
+    cached session then only frees memory; the backend copy expires by TTL.
+    A write-through only succeeds if the stored version is still the one this
+    worker loaded or last wrote; otherwise ``touch()`` drops the stale local
+    copy and raises ``SessionConflictError``, and the turn should be retried
+    against the rehydrated session.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Dict[str, Any]],
+        max_sessions: int = SESSION_MAX_COUNT,
+        max_bytes: int = SESSION_MAX_BYTES,
+        idle_ttl: float = SESSION_IDLE_TTL_SECONDS,
+        sweep_interval: float = SESSION_SWEEP_INTERVAL_SECONDS,
+        sizer: Callable[[Dict[str, Any]], int] = estimate_session_bytes,
+        backend: Optional[SessionBackend] = None,
+        serialize: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+        restore: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    ):
+        if backend is not None and (serialize is None or restore is None):
+            raise ValueError("A session backend requires serialize and restore callables")
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self.sizer = sizer
+        self.backend = backend
+        self.serialize = serialize
+        self.restore = restore
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._total_bytes = 0
+        self._counters = {
+            "created": 0, "hits": 0, "rehydrated": 0, "conflicts": 0,
+            "evicted_ttl": 0, "evicted_lru": 0, "evicted_bytes": 0, "deleted": 0,
+        }
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+
+    # --- Access ---
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and self._expired(entry, time.monotonic()):
+                self._evict(session_id, "evicted_ttl")
+                if self.backend is not None and self.backend.version(session_id) in (None, entry.version):
+                    # Not advanced by another worker since it went idle here, so it is idle
+                    # everywhere: expire the shared copy too instead of reloading it
+                    self.backend.delete(session_id)
+                    return None
+                entry = None
+            if self.backend is not None:
+                entry = self._sync_from_backend(session_id, entry)
+            if entry is None:
+                return None
+            entry.last_access = time.monotonic()
+            self._entries.move_to_end(session_id)
+            self._counters["hits"] += 1
+            return entry.value
+
+    def get_or_create(self, session_id: str) -> Dict[str, Any]:
+        with self._lock:
+            value = self.get(session_id)
+            if value is not None:
+                return value
+            value = self.factory()
+            entry = _Entry(value, self.sizer(value))
+            self._entries[session_id] = entry
+            self._total_bytes += entry.size
+            self._counters["created"] += 1
+            self._enforce_limits(keep=session_id)
+            return value
+
+    def _sync_from_backend(self, session_id: str, entry: Optional[_Entry]) -> Optional[_Entry]:
+        """Return the cached entry, replacing it from the backend if the stored copy is newer."""
+        stored_version = self.backend.version(session_id)
+        if stored_version is None:
+            if entry is not None and entry.version > 0:
+                # Deleted or expired in the shared store by another worker
+                self._evict(session_id, "deleted")
+                return None
+            return entry
+        if entry is not None and entry.version >= stored_version:
+            return entry
+        loaded = self.backend.load(session_id)
+        if loaded is None:
+            return entry
+        version, state = loaded
+        value = self.restore(state)
+        if entry is not None:
+            self._total_bytes -= entry.size
+        entry = _Entry(value, self.sizer(value), version)
+        self._entries[session_id] = entry
+        self._total_bytes += entry.size
+        self._counters["rehydrated"] += 1
+        self._enforce_limits(keep=session_id)
+        return entry
+
+    def touch(self, session_id: str):
+        """Refresh recency, re-estimate size and (with a backend) persist a session after it has been used."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+            if self.backend is not None:
+                try:
+                    entry.version = self.backend.save(session_id, self.serialize(entry.value), entry.version)
+                except SessionConflictError:
+                    # Another worker saved first; the next get() rehydrates its state
+                    self._evict(session_id, "conflicts")
+                    logging.warning(f"Session {session_id} was updated by another worker; discarded this turn's state")
+                    raise
+            entry.last_access = time.monotonic()
+            self._entries.move_to_end(session_id)
+            size = self.sizer(entry.value)
+            self._total_bytes += size - entry.size
+            entry.size = size
+            self._enforce_limits(keep=session_id)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            removed = self.backend.delete(session_id) if self.backend is not None else False
+            if session_id in self._entries:
+                self._evict(session_id, "deleted")
+                removed = True
+            return removed
+
+    def __contains__(self, session_id: str) -> bool:
+        with self._lock:
+            if self.backend is not None:
+                return self.backend.version(session_id) is not None or session_id in self._entries
+            return session_id in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self.backend is not None:
+                # Counted in the backend, plus local sessions not written through yet;
+                # avoids listing every stored session on each /health request
+                return self.backend.count() + sum(1 for entry in self._entries.values() if entry.version == 0)
+            return len(self._entries)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            if self.backend is not None:
+                return list(dict.fromkeys(self.backend.keys() + list(self._entries)))
+            return list(self._entries)
+
+    # --- Eviction ---
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return self.idle_ttl > 0 and now - entry.last_access > self.idle_ttl
+
+    def _evict(self, session_id: str, reason: str):
+        entry = self._entries.pop(session_id)
+        self._total_bytes -= entry.size
+        self._counters[reason] += 1
+        if reason != "deleted":
+            logging.info(f"Evicted session {session_id} ({reason}, {entry.size} bytes)")
+
+    def _enforce_limits(self, keep: Optional[str] = None):
+        # Oldest first; never evict the session that is being served right now
+        for session_id in list(self._entries):
+            if len(self._entries) <= self.max_sessions and self._total_bytes <= self.max_bytes:
+                break
+            if session_id == keep:
+                continue
+            reason = "evicted_lru" if len(self._entries) > self.max_sessions else "evicted_bytes"
+            self._evict(session_id, reason)
+
+    def sweep(self) -> int:
+        """Evict every idle-expired session. Returns how many were removed."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [sid for sid, entry in self._entries.items() if self._expired(entry, now)]
+            for session_id in expired:
+                self._evict(session_id, "evicted_ttl")
+            if self.backend is not None and self.idle_ttl > 0:
+                return len(expired) + self.backend.purge_idle(self.idle_ttl)
+        return len(expired)
+
+    def start_sweeper(self):
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.wait(self.sweep_interval):
+                try:
+                    removed = self.sweep()
+                    if removed:
+                        logging.info(f"Session sweeper evicted {removed} idle sessions")
+                except Exception as e:
+                    logging.error(f"Session sweeper failed: {e}")
+
+        self._sweeper = threading.Thread(target=_run, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+
+    # --- Metrics ---
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__ if self.backend is not None else "local",
+                "active_sessions": len(self),
+                "cached_sessions": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": self.max_bytes,
+                "idle_ttl_seconds": self.idle_ttl,
+                **self._counters,
+            }
@@ -0,0 +1,36 @@
+import threading
+from collections import deque
+from typing import Any, Dict
+
+import numpy as np
+
+STAGE_TIMINGS_WINDOW = 2048  # most recent samples kept per stage for percentiles
+
+
+class StageTimings:
+    """Rolling per-stage latency samples (milliseconds) with timeout counts, for ``/health``."""
+
+    def __init__(self, window: int = STAGE_TIMINGS_WINDOW):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if stage not in self._samples:
+                self._samples[stage] = deque(maxlen=self.window)
+                self._counters[stage] = {"calls": 0, "timeouts": 0}
+            self._samples[stage].append(seconds * 1000)
+            self._counters[stage]["calls"] += 1
+            self._counters[stage]["timeouts"] += int(timed_out)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            snapshot = {stage: (np.array(samples), dict(self._counters[stage])) for stage, samples in self._samples.items()}
+        result = {}
+        for stage, (samples, counters) in snapshot.items():
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99]) if len(samples) else (0.0, 0.0, 0.0)
+            result[stage] = {**counters, "p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2),
+                             "p99_ms": round(float(p99), 2)}
+        return result
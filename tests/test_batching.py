@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+from batching import MicroBatcher
+
+
+def blocking_batcher():
+    release = threading.Event()
+    started = threading.Event()
+
+    def batch_fn(items):
+        started.set()
+        release.wait(5)
+        return [item * 2 for item in items]
+
+    return MicroBatcher(batch_fn, max_wait_ms=0, name="test"), started, release
+
+
+def test_cancelled_queued_future_does_not_kill_worker():
+    batcher, started, release = blocking_batcher()
+    running = batcher.submit([1])
+    assert started.wait(5)
+    queued = batcher.submit([2])
+    assert queued.cancel()
+    release.set()
+    assert running.result(timeout=5) == [2]
+    assert batcher.submit([3]).result(timeout=5) == [6]
+    assert batcher._worker.is_alive()
+
+
+def test_async_timeout_does_not_kill_worker():
+    batcher, started, release = blocking_batcher()
+
+    async def scenario():
+        blocker = asyncio.ensure_future(batcher.acall([1]))
+        await asyncio.to_thread(started.wait, 5)
+        try:
+            await asyncio.wait_for(batcher.acall([2]), timeout=0.01)
+        except asyncio.TimeoutError:
+            pass
+        release.set()
+        assert await blocker == [2]
+        return await asyncio.wait_for(batcher.acall([3]), timeout=5)
+
+    assert asyncio.run(scenario()) == [6]
+    assert batcher._worker.is_alive()
+
+
+def test_disabled_batcher_calls_directly():
+    calls = []
+    batcher = MicroBatcher(lambda items: calls.append(list(items)) or items, enabled=False)
+    assert batcher([1, 2]) == [1, 2]
+    assert asyncio.run(batcher.acall([3])) == [3]
+    assert calls == [[1, 2], [3]]
+    assert batcher._worker is None
@@ -0,0 +1,16 @@
+from response_cache import ResponseCache
+
+ANN = {"patient_name": "Ann Lee", "primary_diagnosis": "CKD stage 3", "medications": ["Lisinopril"], "discharge_date": "2024-01-01"}
+MARK = {"patient_name": "Mark Stone", "primary_diagnosis": "ckd  stage 3", "medications": ["lisinopril"], "discharge_date": "2024-01-01"}
+
+
+def test_names_are_replaced_as_whole_words_only():
+    cache = ResponseCache(kb_paths=[])
+    cache.put(ANN, [1.0, 0.0], "Ann Lee, book your Annual review. Ann's dose is unchanged.", compute_seconds=1.0)
+    assert cache.get(MARK, [1.0, 0.0]) == "Mark Stone, book your Annual review. Mark's dose is unchanged."
+
+
+def test_discharge_date_is_part_of_the_key():
+    cache = ResponseCache(kb_paths=[])
+    cache.put(ANN, [1.0, 0.0], "You were discharged on 2024-01-01.", compute_seconds=1.0)
+    assert cache.get(dict(MARK, discharge_date="2024-03-05"), [1.0, 0.0]) is None
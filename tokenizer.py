@@ -0,0 +1,69 @@
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List
+
+# One tokenizer for both sides of BM25: ingestion indexes chunks with it and the clinical agent
+# tokenizes queries with it, so a query term matches whatever the index holds for the same word.
+BM25_STOPWORDS = os.getenv("BM25_STOPWORDS", "1") != "0"
+BM25_STEMMING = os.getenv("BM25_STEMMING", "1") != "0"
+
+# Lowercase runs of letters/digits; keeps apostrophes inside words ("patient's") and decimals ("1.5"),
+# but splits words at a period, since PDF-extracted text often drops the space after one ("failure.Patients")
+TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)+|[a-z0-9]+(?:'[a-z0-9]+)*")
+
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers
+herself him himself his how i if in into is it its itself just me more most my myself no nor not now of off on
+once only or other our ours ourselves out over own same she should so some such than that the their theirs them
+themselves then there these they this those through to too under until up very was we were what when where which
+while who whom why will with would you your yours yourself yourselves
+""".split())
+
+# (suffix, replacement, minimum stem length left behind), tried in order; first match wins
+_SUFFIXES = (
+    ("ies", "y", 3),
+    ("sses", "ss", 2),
+    ("ness", "", 4),
+    ("ing", "", 4),
+    ("ed", "", 4),
+    ("ly", "", 4),
+    ("s", "", 3),
+)
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """
+    Light suffix stripping (plurals, -ing, -ed, -ly, -ness, possessives), enough
+    to join word forms for keyword search. A final "e" is dropped afterwards so
+    "disease"/"diseases" and "increase"/"increased" share a stem.
+    """
+    if token.endswith("'s"):
+        token = token[:-2]
+    if not token.isalpha():
+        return token
+    for suffix, replacement, min_stem in _SUFFIXES:
+        if suffix == "s" and token.endswith(("ss", "us", "is")):
+            break
+        if token.endswith(suffix) and len(token) - len(suffix) >= min_stem:
+            token = token[: len(token) - len(suffix)] + replacement
+            break
+    if token.endswith("e") and len(token) >= 5:
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str, stopwords: bool = BM25_STOPWORDS, stemming: bool = BM25_STEMMING) -> List[str]:
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if stopwords:
+        tokens = [t for t in tokens if t not in STOPWORDS]
+    if stemming:
+        tokens = [stem(t) for t in tokens]
+    return tokens
+
+
+def config(stopwords: bool = BM25_STOPWORDS, stemming: bool = BM25_STEMMING) -> Dict:
+    """Settings stored with a BM25 index, so queries can be tokenized the way the index was built."""
+    return {"name": "regex", "version": 2, "stopwords": stopwords, "stemming": stemming}
@@ -0,0 +1,148 @@
+import logging
+import math
+import os
+from typing import Optional
+
+import faiss
+import numpy as np
+
+# Index type written by ingestion: "flat" (exact), "ivf_flat", "ivf_pq" or "hnsw"
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "0"))  # IVF lists; 0 picks ~4 * sqrt(vectors)
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "0"))  # PQ sub-quantizers; 0 picks one per 8 dimensions
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))  # HNSW graph neighbours per node
+FAISS_TRAIN_SAMPLE = int(os.getenv("FAISS_TRAIN_SAMPLE", "100000"))  # most vectors used to train IVF/PQ
+
+# Query-time accuracy/speed knobs, applied when the index is loaded
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))  # IVF lists scanned per query
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))  # HNSW candidate list size per query
+# Map the index file instead of reading it onto the heap, so worker processes share one copy in the page cache
+FAISS_MMAP = os.getenv("FAISS_MMAP", "1") != "0"
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+PQ_MIN_TRAIN = 39 * 16  # enough to train 4-bit PQ codebooks
+
+
+def default_nlist(n_vectors: int) -> int:
+    # Faiss wants >= 39 training vectors per list; small corpora get fewer lists
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def pq_nbits(n_train: int) -> int:
+    # 8-bit codebooks want 39 * 256 training vectors; smaller corpora get coarser codes instead of undertrained ones
+    return max(4, min(8, int(math.log2(max(1, n_train // 39)))))
+
+
+def default_pq_m(dim: int) -> int:
+    m = max(1, dim // 8)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def factory_string(index_type: str, n_vectors: int, dim: int, nlist: int = 0, pq_m: int = 0, hnsw_m: int = FAISS_HNSW_M,
+                   train_sample: int = FAISS_TRAIN_SAMPLE) -> str:
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type '{index_type}' (expected one of {', '.join(INDEX_TYPES)})")
+    nlist = nlist or default_nlist(n_vectors)
+    if index_type == "ivf_pq" and n_vectors < PQ_MIN_TRAIN:
+        logging.warning(f"{n_vectors} vectors are too few to train PQ codebooks; building ivf_flat instead")
+        index_type = "ivf_flat"
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+    if index_type == "ivf_pq":
+        return f"IVF{nlist},PQ{pq_m or default_pq_m(dim)}x{pq_nbits(min(n_vectors, train_sample))}"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m},Flat"
+    return "Flat"
+
+
+def build_faiss_index(embeddings: np.ndarray, index_type: str = FAISS_INDEX_TYPE, nlist: int = FAISS_NLIST,
+                      pq_m: int = FAISS_PQ_M, hnsw_m: int = FAISS_HNSW_M, train_sample: int = FAISS_TRAIN_SAMPLE,
+                      seed: int = 0, ids: Optional[np.ndarray] = None) -> faiss.Index:
+    """
+    L2 index of ``index_type`` over ``embeddings``, trained on a random sample when the type needs training.
+    With ``ids``, searches return those int64 ids instead of row numbers and ``update_faiss_index`` can
+    add and remove vectors by id (IVF indexes store ids natively; flat and HNSW are wrapped in an IDMap2).
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    n, dim = embeddings.shape
+    factory = factory_string(index_type, n, dim, nlist, pq_m, hnsw_m, train_sample)
+    if ids is not None and not factory.startswith("IVF"):
+        factory = "IDMap2," + factory
+    index = faiss.index_factory(dim, factory, faiss.METRIC_L2)
+    if not index.is_trained:
+        sample = embeddings
+        if n > train_sample:
+            sample = embeddings[np.sort(np.random.default_rng(seed).choice(n, train_sample, replace=False))]
+        index.train(sample)
+    if ids is None:
+        index.add(embeddings)
+    else:
+        index.add_with_ids(embeddings, np.ascontiguousarray(ids, dtype=np.int64))
+    return index
+
+
+def _base_index(index: faiss.Index) -> faiss.Index:
+    """The index an IDMap wraps, or ``index`` itself. The caller must keep ``index`` alive while using the result."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return faiss.downcast_index(index.index)
+    return index
+
+
+def update_faiss_index(index: faiss.Index, remove_ids: np.ndarray, embeddings: np.ndarray, ids: np.ndarray) -> faiss.Index:
+    """
+    Remove the vectors stored under ``remove_ids`` and add ``embeddings`` under ``ids``, in an index built
+    with ids. IVF centroids and PQ codebooks are kept as trained. HNSW graphs cannot drop nodes, so an
+    HNSW index losing vectors is rebuilt from the vectors it keeps; the returned index replaces ``index``.
+    """
+    remove_ids = np.ascontiguousarray(remove_ids, dtype=np.int64)
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    ids = np.ascontiguousarray(ids, dtype=np.int64)
+    if len(remove_ids) and isinstance(_base_index(index), faiss.IndexHNSW):
+        id_map = faiss.downcast_index(index)
+        kept = faiss.vector_to_array(id_map.id_map)
+        kept = kept[~np.isin(kept, remove_ids)]
+        hnsw_m = _base_index(index).hnsw.nb_neighbors(1)
+        logging.info(f"Rebuilding HNSW index without {len(remove_ids)} removed vectors ({len(kept)} kept)")
+        vectors = id_map.reconstruct_batch(kept) if len(kept) else np.zeros((0, index.d), dtype=np.float32)
+        return build_faiss_index(np.vstack([vectors, embeddings]), "hnsw", hnsw_m=hnsw_m, ids=np.concatenate([kept, ids]))
+    if len(remove_ids):
+        index.remove_ids(remove_ids)
+    if len(ids):
+        index.add_with_ids(embeddings, ids)
+    return index
+
+
+def read_faiss_index(path: str, mmap: bool = FAISS_MMAP) -> faiss.Index:
+    """Load a read-only index for searching; memory-mapped unless ``mmap`` is off."""
+    flags = 0
+    if mmap:
+        # IO_FLAG_MMAP maps IVF inverted lists only; newer faiss can also map flat vector storage (flat, HNSW, IVF)
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    return faiss.read_index(path, flags)
+
+
+def configure_search(index: faiss.Index, nprobe: int = FAISS_NPROBE, ef_search: int = FAISS_EF_SEARCH) -> faiss.Index:
+    """Apply the query-time knobs that exist for this index type; flat indexes are left as they are."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    hnsw = _base_index(index)
+    if isinstance(hnsw, faiss.IndexHNSW):
+        hnsw.hnsw.efSearch = ef_search
+    return index
+
+
+def describe(index: faiss.Index) -> str:
+    wrapper = faiss.downcast_index(index)
+    if isinstance(wrapper, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+        return f"{type(wrapper).__name__}({describe(wrapper.index)})"
+    index = wrapper
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return f"{type(index).__name__}(nlist={ivf.nlist}, nprobe={ivf.nprobe}, ntotal={index.ntotal})"
+    if isinstance(index, faiss.IndexHNSW):
+        return f"{type(index).__name__}(efSearch={index.hnsw.efSearch}, ntotal={index.ntotal})"
+    return f"{type(index).__name__}(ntotal={index.ntotal})"